@@ -18,14 +18,18 @@ import sys
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 import pbr.version
 
 from placement import conf
 from placement import context
 from placement.db.sqlalchemy import migration
 from placement import db_api
+from placement.objects import change as change_obj
 from placement.objects import consumer as consumer_obj
+from placement.objects import export as export_obj
 from placement.objects import resource_provider as rp_obj
+from placement.objects import usage as usage_obj
 
 version_info = pbr.version.VersionInfo('openstack-placement')
 LOG = logging.getLogger(__name__)
@@ -130,6 +134,73 @@ class DbCommands(object):
         # "there are more migrations, but not completable right now"
         return ran and 1 or 0
 
+    def db_usage_counters(self):
+        """Verifies, or with ``--rebuild`` rebuilds, the project and user
+        usage counters used by GET /usages.
+
+        :returns: 0 if the counters are correct or were rebuilt, 1 if some
+                  counters do not match the allocations.
+        """
+        ctxt = context.RequestContext(config=self.config)
+        if self.config.command.rebuild:
+            count = usage_obj.rebuild_usage_counters(ctxt)
+            print('Rebuilt usage counters for %i project users' % count)
+            return 0
+
+        mismatches = usage_obj.verify_usage_counters(ctxt)
+        if not mismatches:
+            print('Usage counters match the allocations')
+            return 0
+        t = prettytable.PrettyTable(
+            ['Project', 'User', 'Resource Class', 'Counted', 'Actual'])
+        for mismatch in mismatches:
+            t.add_row([mismatch['project_uuid'], mismatch['user_uuid'] or '-',
+                       mismatch['resource_class'], mismatch['counted'],
+                       mismatch['actual']])
+        print(t)
+        print("Run 'placement-manage db usage_counters --rebuild' to correct "
+              "the usage counters.")
+        return 1
+
+    def db_export_providers(self):
+        """Writes the capacity information of the resource providers as
+        newline-delimited JSON, one document per provider, to the file named
+        by ``--output`` or to stdout.
+
+        :returns: 0 once all of the providers have been written.
+        """
+        cmd = self.config.command
+        required_aggs = [set([agg]) for agg in cmd.member_of or []]
+        ctxt = context.RequestContext(config=self.config)
+        providers = export_obj.iter_providers(
+            ctxt, resource_class=cmd.resource_class,
+            required_aggs=required_aggs, in_tree=cmd.in_tree)
+        output = open(cmd.output, 'w') if cmd.output else sys.stdout
+        try:
+            for provider in providers:
+                output.write(jsonutils.dumps(provider) + '\n')
+        finally:
+            providers.close()
+            if cmd.output:
+                output.close()
+        return 0
+
+    def db_compact_changes(self):
+        """Discards the changes listed by GET /changes that have been
+        superseded by later ones, and those older than ``--max-age`` seconds,
+        or the ``[placement]change_retention`` option by default.
+
+        :returns: 0 once the changes have been compacted.
+        """
+        max_age = self.config.command.max_age
+        if max_age is None:
+            max_age = self.config.placement.change_retention
+        ctxt = context.RequestContext(config=self.config)
+        superseded, expired = change_obj.compact(ctxt, max_age)
+        print('Discarded %(superseded)i superseded and %(expired)i expired '
+              'changes' % {'superseded': superseded, 'expired': expired})
+        return 0
+
     def _run_online_migration(self, max_count):
         ctxt = context.RequestContext(config=self.config)
         ran = 0
@@ -200,6 +271,42 @@ def add_db_command_parsers(subparsers, config):
     online_dm_parser.set_defaults(
         func=command_object.db_online_data_migrations)
 
+    help = 'Verify or rebuild the project and user usage counters.'
+    usage_parser = db_parser.add_parser(
+        'usage_counters', help=help, description=help)
+    usage_parser.add_argument(
+        '--rebuild', action='store_true', default=False,
+        help='Replace the usage counters with ones calculated from the '
+             'allocations')
+    usage_parser.set_defaults(func=command_object.db_usage_counters)
+
+    help = 'Export the resource providers as newline-delimited JSON.'
+    export_parser = db_parser.add_parser(
+        'export_providers', help=help, description=help)
+    export_parser.add_argument(
+        '--resource-class', metavar='<resource class>',
+        help='Only export providers with inventory of this resource class')
+    export_parser.add_argument(
+        '--member-of', metavar='<aggregate uuid>', action='append',
+        help='Only export providers associated with this aggregate. May be '
+             'repeated')
+    export_parser.add_argument(
+        '--in-tree', metavar='<provider uuid>',
+        help='Only export providers in the same tree as this provider')
+    export_parser.add_argument(
+        '--output', metavar='<file>',
+        help='Write to this file rather than to stdout')
+    export_parser.set_defaults(func=command_object.db_export_providers)
+
+    help = 'Discard superseded and expired changes from the change log.'
+    compact_parser = db_parser.add_parser(
+        'compact_changes', help=help, description=help)
+    compact_parser.add_argument(
+        '--max-age', metavar='<seconds>', type=int,
+        help='Discard changes older than this, rather than the '
+             '[placement]change_retention option')
+    compact_parser.set_defaults(func=command_object.db_compact_changes)
+
 
 def setup_commands(config):
     # This is a separate method because it facilitates unit testing.
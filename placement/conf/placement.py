@@ -42,6 +42,17 @@ is determined.
         default='policy.yaml',
         help='The file that defines placement policies. This can be an '
              'absolute path or relative to the configuration file.'),
+    cfg.IntOpt(
+        'policy_decision_cache_size',
+        default=1024,
+        min=0,
+        help="""
+The number of policy decisions, each for one action, set of credentials and
+target, that each placement process keeps so that it does not have to check
+the policy rules again when the same credentials repeat the same action. The
+decisions are forgotten whenever the policy rules are reloaded. Set to 0 to
+check the rules for every request.
+"""),
     cfg.StrOpt(
         'incomplete_consumer_project_id',
         default=DEFAULT_CONSUMER_MISSING_ID,
@@ -61,6 +72,85 @@ a project or user identifier for the consumer. In cleaning up the data
 modeling, we no longer allow missing project and user information. If an older
 client makes an allocation, we'll use this in place of the information it
 doesn't provide.
+"""),
+    cfg.BoolOpt(
+        'combine_allocation_writes',
+        default=False,
+        help="""
+If True, allocation writes made concurrently within one placement process are
+queued and combined into shared transactions where they involve different
+consumers. Each resource provider generation is then incremented once per
+combined write rather than once per request, which reduces generation
+conflicts and retries when many clients claim resources from the same few
+providers. A combined write that fails is retried one request at a time, so
+each request still gets its own result.
+"""),
+    cfg.IntOpt(
+        'allocation_write_batch_size',
+        default=16,
+        min=1,
+        help="""
+The maximum number of queued allocation writes combined into one transaction
+when ``combine_allocation_writes`` is True.
+"""),
+    cfg.IntOpt(
+        'resource_class_cache_ttl',
+        default=10,
+        min=0,
+        help="""
+The number of seconds for which each placement process uses its cache of the
+resource classes before checking whether another process has created, renamed
+or deleted one. Changes made by the process itself are seen at once.
+"""),
+    cfg.IntOpt(
+        'trait_cache_ttl',
+        default=10,
+        min=0,
+        help="""
+The number of seconds for which each placement process uses its cache of the
+traits before checking whether another process has created or deleted one.
+Changes made by the process itself are seen at once.
+"""),
+    cfg.BoolOpt(
+        'warmup',
+        default=False,
+        help="""
+Prepare each placement process to serve requests before it serves the first
+one: import all of the API handlers, build the JSON schema validators, load
+the resource class and trait caches and open connections to the database.
+When the application is loaded by a master process that then forks its
+workers, each worker opens its own connections as soon as it is forked.
+
+This makes the process start slower and use more memory, since otherwise the
+API handlers are only imported when a request first needs them, so it is
+best enabled when the workers are forked from a master process that warms up
+once for all of them.
+"""),
+    cfg.IntOpt(
+        'warmup_connections',
+        default=2,
+        min=0,
+        help="""
+The number of database connections that each placement process opens while
+warming up.
+"""),
+    cfg.BoolOpt(
+        'warmup_explain_queries',
+        default=False,
+        help="""
+While warming up, have the database plan each of the Cypher statements that
+placement runs with parameters, using EXPLAIN, so that their plans are cached
+before the first request. This only helps a database that has just started,
+since the plans are shared by every client.
+"""),
+    cfg.IntOpt(
+        'change_retention',
+        default=86400,
+        min=0,
+        help="""
+The number of seconds for which changes listed by ``GET /changes`` are kept
+when ``placement-manage db compact_changes`` is run. Clients asking for changes
+from before the newest discarded change have to read everything again.
 """),
 ]
 
@@ -11,7 +11,6 @@
 #    under the License.
 
 from oslo_context import context
-from oslo_db.sqlalchemy import enginefacade
 
 from placement import db_api
 from placement import exception
@@ -24,6 +23,9 @@ class RequestContext(context.RequestContext):
     def __init__(self, *args, **kwargs):
         self.config = kwargs.pop('config', None)
         super(RequestContext, self).__init__(*args, **kwargs)
+        # The results of the read statements run by db_api.run_cached() for
+        # this request.
+        self.query_cache = db_api.QueryCache()
 
     def can(self, action, target=None, fatal=True):
         """Verifies that the given action is valid on the target in this
@@ -16,6 +16,15 @@ def get_connection():
     return _connection
 
 
+def reset_connection():
+    """Forgets the connection, without closing it, so that the next call to
+    get_connection() makes a new one. A forked process calls this so that it
+    does not share the sockets of its parent.
+    """
+    global _connection
+    _connection = None
+
+
 class DotDict(dict):
     """
     Dictionary subclass that allows accessing keys via dot notation. This is
@@ -104,6 +113,37 @@ def execute(query, tx=None, autocommit=True):
     return crs.data()
 
 
+def ensure_uniqueness_constraint(label, property_key):
+    """Creates a uniqueness constraint on `property_key` of the nodes labelled
+    `label`, unless there is one already. Only with one can a MERGE on the
+    property be relied on not to create two nodes when run concurrently.
+    """
+    schema = get_connection().schema
+    if property_key in schema.get_uniqueness_constraints(label):
+        return
+    try:
+        schema.create_uniqueness_constraint(label, property_key)
+    except ClientError:
+        # Another process may have created it first.
+        if property_key not in schema.get_uniqueness_constraints(label):
+            raise
+
+
+def ensure_index(label, property_key):
+    """Creates an index on `property_key` of the nodes labelled `label`,
+    unless there is one already.
+    """
+    schema = get_connection().schema
+    if (property_key,) in schema.get_indexes(label):
+        return
+    try:
+        schema.create_index(label, property_key)
+    except ClientError:
+        # Another process may have created it first.
+        if (property_key,) not in schema.get_indexes(label):
+            raise
+
+
 def remove_constraints(g):
     schema = g.schema
     labels = schema.node_labels
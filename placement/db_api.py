@@ -135,28 +135,43 @@ class TransactionContext():
 
         argspec = inspect.getfullargspec(fn)
         context_index = 1 if argspec.args[0] in("self", "cls") else 0
-        cxn = db.get_connection()
 
-        @functools.wraps(fn)
-        def wrapper(*args, **kwargs):
-            context = args[context_index]
-            _print(str(fn), "CTX", id(context))
+        def run(context, *args, **kwargs):
             if self._context_tx_active(context):
                 _print("RESUING", id(context.tx), "CTX", id(context))
                 return fn(*args, **kwargs)
+            # The connection is looked up for each call, rather than when the
+            # function is decorated, so that a forked process uses its own.
+            cxn = db.get_connection()
             with cxn.begin() as tx:
                 _print("BEGIN", id(tx), "CTX", id(context))
                 context.tx = tx
+                context.before_commit_callbacks = []
                 try:
                     ret = fn(*args, **kwargs)
+                    callbacks = context.before_commit_callbacks
+                    while callbacks:
+                        callbacks.pop(0)()
                 except Exception as e:
                     _print("EXC", id(tx), e, "CTX", id(context))
                     with excutils.save_and_reraise_exception():
                         pass
                 finally:
                     _print("END", id(tx), "CTX", id(context), tx.finished())
-                    pass
+                    context.before_commit_callbacks = None
                 return ret
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            context = args[context_index]
+            _print(str(fn), "CTX", id(context))
+            query_cache = getattr(context, "query_cache", None)
+            if self._mode != "read" and isinstance(query_cache, QueryCache):
+                # The results memoized by run_cached() may be made stale by
+                # a write, so none are used while one is in progress.
+                with query_cache.writing():
+                    return run(context, *args, **kwargs)
+            return run(context, *args, **kwargs)
         return wrapper
 
     @contextlib.contextmanager
@@ -190,9 +205,117 @@ class TransactionContext():
                 context.tx = context.tx_queue.get()
 
 
+class QueryCache(object):
+    """The results of the read statements run by run_cached() for one
+    request, keyed by the text of the statement and its parameters.
+
+    Any function decorated as a writer that is called with the request's
+    context clears the cache both when it starts and when it ends, and
+    run_cached() does not use the cache while one is running.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        self._writers = 0
+
+    @contextlib.contextmanager
+    def writing(self):
+        self._writers += 1
+        self.results.clear()
+        try:
+            yield
+        finally:
+            self._writers -= 1
+            self.results.clear()
+
+    @property
+    def active(self):
+        return not self._writers
+
+
+def _freeze(value):
+    """Returns a hashable equivalent of a statement parameter."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(val) for val in value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+def run_cached(ctx, query, **params):
+    """Runs a read statement in the context's transaction and returns the
+    data of its result, unless the same statement has already been run with
+    the same parameters during the request, and nothing has been written
+    since, in which case the earlier data is returned without running it
+    again. The returned records must not be changed.
+
+    Contexts without a QueryCache in their `query_cache` attribute, such as
+    those used outside of requests, always run the statement.
+    """
+    query_cache = getattr(ctx, "query_cache", None)
+    if not isinstance(query_cache, QueryCache) or not query_cache.active:
+        return ctx.tx.run(query, **params).data()
+    key = (query, _freeze(params))
+    try:
+        result = query_cache.results[key]
+    except TypeError:
+        # A parameter that cannot be hashed cannot be memoized.
+        return ctx.tx.run(query, **params).data()
+    except KeyError:
+        query_cache.misses += 1
+        result = query_cache.results[key] = ctx.tx.run(
+            query, **params).data()
+    else:
+        query_cache.hits += 1
+    return list(result)
+
+
 placement_context_manager = TransactionContext()
 
 
+def before_commit(ctx, callback):
+    """Calls `callback` with no arguments as the last step of the transaction
+    in progress in `ctx`, just before it commits, or at once if that
+    transaction was not begun by placement_context_manager.
+    """
+    callbacks = getattr(ctx, "before_commit_callbacks", None)
+    if isinstance(callbacks, list):
+        callbacks.append(callback)
+    else:
+        callback()
+
+
+def in_transaction(ctx):
+    """Returns True if `ctx` has a transaction in progress, which any
+    function decorated with placement_context_manager then joins.
+    """
+    return placement_context_manager._context_tx_active(ctx)
+
+
+@contextlib.contextmanager
+def read_transaction(ctx):
+    """Runs the block in a single transaction, which every function decorated
+    with placement_context_manager that is called with `ctx` joins, and rolls
+    it back when the block ends, however it ends. This lets a generator read
+    in one transaction across its yields. If `ctx` already has a transaction
+    in progress, the block joins it instead.
+    """
+    if in_transaction(ctx):
+        yield
+        return
+    tx = db.get_connection().begin()
+    ctx.tx = tx
+    try:
+        yield
+    finally:
+        if not tx.finished():
+            tx.rollback()
+
+
 def _get_db_conf(conf_group):
     conf_dict = dict(conf_group.items())
     # Remove the 'sync_on_startup' conf setting, enginefacade does not use it.
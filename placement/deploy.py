@@ -22,12 +22,16 @@ from placement import db_api
 from placement import fault_wrap
 from placement import handler
 from placement import microversion
+from placement.objects import change
 from placement.objects import resource_class
 from placement.objects import trait
+from placement.objects import usage
 from placement import policy
 from placement import requestlog
 from placement import resource_class_cache as rc_cache
+from placement import trait_cache
 from placement import util
+from placement import warmup
 
 
 PROFILER_OUTPUT = os.environ.get('OS_WSGI_PROFILER')
@@ -113,7 +117,10 @@ def update_database(conf):
     ctx = db_api.DbContext()
     trait.ensure_sync(ctx)
     resource_class.ensure_sync(ctx)
-    rc_cache.ensure(ctx)
+    usage.ensure_usage_counters(ctx)
+    change.ensure_sequence(ctx)
+    rc_cache.ensure(ctx, ttl=conf.placement.resource_class_cache_ttl)
+    trait_cache.ensure(ctx, ttl=conf.placement.trait_cache_ttl)
 
 
 # NOTE(cdent): Althought project_name is no longer used because of the
@@ -134,4 +141,8 @@ def loadapp(config, project_name=None):
     application = deploy(config)
     policy.init(config)
     update_database(config)
+    if config.placement.warmup:
+        warmup.warmup(config)
+    else:
+        warmup.reset_after_fork()
     return application
@@ -83,6 +83,11 @@ class ResourceProviderConcurrentUpdateDetected(ConcurrentUpdateDetected):
                "data. Please retry your update")
 
 
+class ConsumerGenerationConflict(ConcurrentUpdateDetected):
+    msg_fmt = ("consumer generation conflict - "
+               "expected %(expected_gen)s but got %(got_gen)s")
+
+
 class ResourceProviderNotFound(NotFound):
     msg_fmt = "No such resource provider(s)"
 
@@ -198,3 +203,8 @@ class ConsumerNotFound(NotFound):
 
 class ConsumerExists(Exists):
     msg_fmt = "The consumer %(uuid)s already exists."
+
+
+class ChangesExpired(_BaseException):
+    msg_fmt = ("The changes after sequence %(since)s are no longer available; "
+               "changes up to sequence %(horizon)s have been discarded.")
@@ -18,31 +18,71 @@ individual HTTP request methods to a Python function representing a
 simple WSGI application for satisfying that request.
 
 The ``make_map`` method processes ROUTE_DECLARATIONS to create a
-Routes.Mapper, including automatic handlers to respond with a
+RouteMap, including automatic handlers to respond with a
 405 when a request is made against a valid URL with an invalid
 method.
+
+The handler modules, and the objects and schemas they use, are only
+imported when a request first needs one of their handlers, or when
+``import_handlers`` is called, so that starting a process does not pay
+for all of them.
 """
 
-import routes
+import importlib
+
 import webob
 
 from oslo_log import log as logging
 
 from placement import exception
-from placement.handlers import aggregate
-from placement.handlers import allocation
-from placement.handlers import allocation_candidate
-from placement.handlers import inventory
-from placement.handlers import reshaper
-from placement.handlers import resource_class
-from placement.handlers import resource_provider
-from placement.handlers import root
-from placement.handlers import trait
-from placement.handlers import usage
 from placement import util
 
 LOG = logging.getLogger(__name__)
 
+
+class LazyHandler(object):
+    """Names a handler in one of the placement.handlers modules, which is
+    imported by resolve().
+    """
+
+    __slots__ = ('module', 'name')
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def resolve(self):
+        module = importlib.import_module('placement.handlers.' + self.module)
+        return getattr(module, self.name)
+
+    def __repr__(self):
+        return '<LazyHandler %s.%s>' % (self.module, self.name)
+
+
+class _HandlerModule(object):
+    """Stands in for a placement.handlers module in ROUTE_DECLARATIONS,
+    giving a LazyHandler for each of its attributes.
+    """
+
+    def __init__(self, module):
+        self.module = module
+
+    def __getattr__(self, name):
+        return LazyHandler(self.module, name)
+
+
+aggregate = _HandlerModule('aggregate')
+allocation = _HandlerModule('allocation')
+allocation_candidate = _HandlerModule('allocation_candidate')
+change = _HandlerModule('change')
+inventory = _HandlerModule('inventory')
+reshaper = _HandlerModule('reshaper')
+resource_class = _HandlerModule('resource_class')
+resource_provider = _HandlerModule('resource_provider')
+root = _HandlerModule('root')
+trait = _HandlerModule('trait')
+usage = _HandlerModule('usage')
+
 # URLs and Handlers
 # NOTE(cdent): When adding URLs here, do not use regex patterns in
 # the path parameters (e.g. {uuid:[0-9a-zA-Z-]+}) as that will lead
@@ -78,6 +118,9 @@ ROUTE_DECLARATIONS = {
         'DELETE': resource_provider.delete_resource_provider,
         'PUT': resource_provider.update_resource_provider
     },
+    '/inventories': {
+        'PUT': inventory.bulk_set_inventories,
+    },
     '/resource_providers/{uuid}/inventories': {
         'GET': inventory.get_inventories,
         'POST': inventory.create_inventory,
@@ -105,6 +148,9 @@ ROUTE_DECLARATIONS = {
     '/resource_tree': {
         'POST': resource_provider.create_resource_tree
     },
+    '/export/resource_providers': {
+        'GET': resource_provider.export_resource_providers,
+    },
     '/allocations': {
         'POST': allocation.set_allocations,
     },
@@ -116,6 +162,9 @@ ROUTE_DECLARATIONS = {
     '/allocation_candidates': {
         'GET': allocation_candidate.list_allocation_candidates,
     },
+    '/allocation_candidates/claim': {
+        'POST': allocation_candidate.claim_allocation_candidate,
+    },
     '/traits': {
         'GET': trait.list_traits,
     },
@@ -132,12 +181,29 @@ ROUTE_DECLARATIONS = {
     '/usages': {
         'GET': usage.get_total_usages,
     },
+    '/provider_summaries': {
+        'POST': usage.list_provider_summaries,
+    },
     '/reshaper': {
         'POST': reshaper.reshape,
     },
+    '/changes': {
+        'GET': change.list_changes,
+    },
 }
 
 
+def import_handlers(declarations=None):
+    """Imports the modules of all the handlers in the route declarations,
+    ROUTE_DECLARATIONS by default, which registers their microversioned
+    methods.
+    """
+    for targets in (declarations or ROUTE_DECLARATIONS).values():
+        for target in targets.values():
+            if isinstance(target, LazyHandler):
+                target.resolve()
+
+
 def dispatch(environ, start_response, mapper):
     """Find a matching route for the current request.
 
@@ -176,18 +242,112 @@ def handle_405(environ, start_response):
     return response(environ, start_response)
 
 
+class _RouteNode(object):
+    """A node of a RouteMap, standing for one segment of a path."""
+
+    __slots__ = ('children', 'param', 'param_child', 'targets', 'methods')
+
+    def __init__(self):
+        # Child nodes keyed by the literal segment that leads to them.
+        self.children = {}
+        # The name of the path parameter that leads to param_child.
+        self.param = None
+        self.param_child = None
+        # The handlers keyed by HTTP method, for a node that ends a route.
+        self.targets = None
+        self.methods = None
+
+
+class RouteMap(object):
+    """A tree of the segments of the declared routes, which matches a path
+    by looking up one segment at a time rather than by trying the regular
+    expression of each route in turn, as a Routes.Mapper does.
+
+    A path parameter, such as ``{uuid}``, matches any segment that is not
+    empty. Literal segments are preferred to path parameters.
+    """
+
+    def __init__(self):
+        self.root = _RouteNode()
+
+    @staticmethod
+    def _segments(path):
+        # The empty path has no segments, while '/' has one empty segment,
+        # so that each can be declared on its own, as with Routes.
+        if not path:
+            return []
+        if not path.startswith('/'):
+            return None
+        return path[1:].split('/')
+
+    def connect(self, route, targets):
+        """Adds a route, with a dict of its handlers keyed by HTTP method."""
+        node = self.root
+        for segment in self._segments(route):
+            if segment.startswith('{') and segment.endswith('}'):
+                name = segment[1:-1]
+                if node.param_child is None:
+                    node.param = name
+                    node.param_child = _RouteNode()
+                elif node.param != name:
+                    raise ValueError(
+                        'Route %s names a path parameter %s where another '
+                        'route names %s' % (route, name, node.param))
+                node = node.param_child
+            else:
+                node = node.children.setdefault(segment, _RouteNode())
+        node.targets = dict(targets)
+        node.methods = ', '.join(targets)
+
+    def _find(self, node, segments, index, params):
+        if index == len(segments):
+            return node if node.targets is not None else None
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, params)
+            if found is not None:
+                return found
+        if segment and node.param_child is not None:
+            found = self._find(node.param_child, segments, index + 1, params)
+            if found is not None:
+                params[node.param] = segment
+                return found
+        return None
+
+    def match(self, environ):
+        """Returns a dict of the path parameters of the route that matches
+        the PATH_INFO of the environ, with its handler for the REQUEST_METHOD
+        as ``action``, or None if no route matches.
+
+        If the route has no handler for the method, the action is
+        handle_405 and ``_methods`` lists the methods it does have.
+        """
+        segments = self._segments(environ.get('PATH_INFO', ''))
+        if segments is None:
+            return None
+        params = {}
+        node = self._find(self.root, segments, 0, params)
+        if node is None:
+            return None
+        method = environ.get('REQUEST_METHOD')
+        action = node.targets.get(method)
+        if action is None:
+            params['action'] = handle_405
+            params['_methods'] = node.methods
+            return params
+        if isinstance(action, LazyHandler):
+            action = node.targets[method] = action.resolve()
+        params['action'] = action
+        return params
+
+
 def make_map(declarations):
-    """Process route declarations to create a Route Mapper."""
-    mapper = routes.Mapper()
+    """Process route declarations to create a RouteMap."""
+    route_map = RouteMap()
     for route, targets in declarations.items():
-        allowed_methods = []
-        for method in targets:
-            mapper.connect(route, action=targets[method],
-                           conditions=dict(method=[method]))
-            allowed_methods.append(method)
-        allowed_methods = ', '.join(allowed_methods)
-        mapper.connect(route, action=handle_405, _methods=allowed_methods)
-    return mapper
+        route_map.connect(route, targets)
+    return route_map
 
 
 class PlacementHandler(object):
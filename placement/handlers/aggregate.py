@@ -91,7 +91,11 @@ def get_aggregates(req):
     """
     context = req.environ['placement.context']
     context.can(policies.LIST)
+    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
     uuid = util.wsgi_path_item(req.environ, 'uuid')
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, rp_obj.get_version(context, uuid)):
+        return util.not_modified(req)
     resource_provider = rp_obj.ResourceProvider.get_by_uuid(
         context, uuid)
     aggregate_uuids = resource_provider.get_aggregates()
@@ -27,6 +27,7 @@ from placement import exception
 from placement.handlers import util as data_util
 from placement import microversion
 from placement.objects import allocation as alloc_obj
+from placement.objects import consumer as consumer_obj
 from placement.objects import resource_provider as rp_obj
 from placement.policies import allocation as policies
 from placement.schemas import allocation as schema
@@ -55,7 +56,7 @@ def _last_modified_from_allocations(allocations, want_version):
     return last_modified
 
 
-def _serialize_allocations_for_consumer(allocations, want_version):
+def serialize_allocations_for_consumer(allocations, want_version):
     """Turn a list of allocations into a dict by resource provider uuid.
 
     {
@@ -171,11 +172,27 @@ def create_allocation_list(context, data, consumers):
     """
     allocation_objects = []
 
+    # Look up every resource provider and every set of existing allocations
+    # referenced by the payload in one query each, rather than once per
+    # consumer.
+    rp_uuids = set()
+    empty_consumer_uuids = []
+    for consumer_uuid in data:
+        allocations = data[consumer_uuid]['allocations']
+        if allocations:
+            rp_uuids.update(allocations)
+        else:
+            empty_consumer_uuids.append(consumer_uuid)
+    rp_objs = _resource_providers_by_uuid(context, rp_uuids)
+    existing_allocations = {}
+    if empty_consumer_uuids:
+        existing_allocations = alloc_obj.get_all_by_consumer_ids(
+            context, empty_consumer_uuids)
+
     for consumer_uuid in data:
         allocations = data[consumer_uuid]['allocations']
         consumer = consumers[consumer_uuid]
         if allocations:
-            rp_objs = _resource_providers_by_uuid(context, allocations.keys())
             for resource_provider_uuid in allocations:
                 resource_provider = rp_objs[resource_provider_uuid]
                 resources = allocations[resource_provider_uuid]['resources']
@@ -188,9 +205,7 @@ def create_allocation_list(context, data, consumers):
             # The allocations are empty, which means wipe them out.
             # Internal to the allocation object this is signalled by a
             # used value of 0.
-            allocations = alloc_obj.get_all_by_consumer_id(
-                context, consumer_uuid)
-            for allocation in allocations:
+            for allocation in existing_allocations.get(consumer_uuid, []):
                 allocation.used = 0
                 allocation_objects.append(allocation)
 
@@ -203,9 +218,9 @@ def inspect_consumers(context, data, want_version):
     Keep a record of the consumers that are created in case they need
     to be removed later.
 
-    If an exception is raised by ensure_consumer, commonly HTTPConflict but
-    also anything else, the newly created consumers will be deleted and the
-    exception reraised to the caller.
+    If an exception is raised by ensure_consumers, commonly HTTPConflict but
+    also anything else, no consumers will have been created and the
+    exception is reraised to the caller.
 
     :param context: The placement context.
     :param data: A dictionary of multiple allocations by consumer uuid.
@@ -216,26 +231,9 @@ def inspect_consumers(context, data, want_version):
     # First, ensure that all consumers referenced in the payload actually
     # exist. And if not, create them. Keep a record of auto-created consumers
     # so we can clean them up if the end allocation replace_all() fails.
-    consumers = {}  # dict of Consumer objects, keyed by consumer UUID
-    new_consumers_created = []
-    for consumer_uuid in data:
-        project_uuid = data[consumer_uuid]['project_id']
-        user_uuid = data[consumer_uuid]['user_id']
-        consumer_generation = data[consumer_uuid].get('consumer_generation')
-        try:
-            consumer, new_consumer_created = data_util.ensure_consumer(
-                context, consumer_uuid, project_uuid, user_uuid,
-                consumer_generation, want_version)
-            if new_consumer_created:
-                new_consumers_created.append(consumer)
-            consumers[consumer_uuid] = consumer
-        except Exception:
-            # If any errors (for instance, a consumer generation conflict)
-            # occur when ensuring consumer records above, make sure we delete
-            # any auto-created consumers.
-            with excutils.save_and_reraise_exception():
-                delete_consumers(new_consumers_created)
-    return consumers, new_consumers_created
+    # The consumers, and their projects and users, are all ensured in a
+    # single statement, so if it fails nothing has been created.
+    return data_util.ensure_consumers(context, data, want_version)
 
 
 @wsgi_wrapper.PlacementWsgify
@@ -247,12 +245,16 @@ def list_for_consumer(req):
     consumer_id = util.wsgi_path_item(req.environ, 'consumer_uuid')
     want_version = req.environ[microversion.MICROVERSION_ENVIRON]
 
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, consumer_obj.get_version(context, consumer_id)):
+        return util.not_modified(req)
+
     # NOTE(cdent): There is no way for a 404 to be returned here,
     # only an empty result. We do not have a way to validate a
     # consumer id.
     allocations = alloc_obj.get_all_by_consumer_id(context, consumer_id)
 
-    output = _serialize_allocations_for_consumer(allocations, want_version)
+    output = serialize_allocations_for_consumer(allocations, want_version)
     last_modified = _last_modified_from_allocations(allocations, want_version)
     allocations_json = jsonutils.dumps(output)
 
@@ -280,6 +282,10 @@ def list_for_resource_provider(req):
     want_version = req.environ[microversion.MICROVERSION_ENVIRON]
     uuid = util.wsgi_path_item(req.environ, 'uuid')
 
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, rp_obj.get_version(context, uuid, include_allocations=True)):
+        return util.not_modified(req)
+
     # confirm existence of resource provider so we get a reasonable
     # 404 instead of empty list
     try:
@@ -315,20 +321,13 @@ def _resource_providers_by_uuid(ctx, rp_uuids):
     :raises: `webob.exc.HTTPBadRequest` if any of the UUIDs do not refer to
              an existing resource provider.
     """
-    res = {}
-    for rp_uuid in rp_uuids:
-        # TODO(jaypipes): Clearly, this is not efficient to do one query for
-        # each resource provider UUID in the allocations instead of doing a
-        # single query for all the UUIDs. However, since
-        # rp_obj.get_all_by_filters() is way too complicated for
-        # this purpose and doesn't raise NotFound anyway, we'll do this.
-        # Perhaps consider adding a rp_obj.get_all_by_uuids() later on?
-        try:
-            res[rp_uuid] = rp_obj.ResourceProvider.get_by_uuid(ctx, rp_uuid)
-        except exception.NotFound:
-            raise webob.exc.HTTPBadRequest(
-                "Allocation for resource provider '%(rp_uuid)s' "
-                "that does not exist." % {'rp_uuid': rp_uuid})
+    rp_uuids = set(rp_uuids)
+    res = rp_obj.get_all_by_uuids(ctx, rp_uuids)
+    missing = sorted(rp_uuids - set(res))
+    if missing:
+        raise webob.exc.HTTPBadRequest(
+            "Allocation for resource provider '%(rp_uuid)s' "
+            "that does not exist." % {'rp_uuid': missing[0]})
     return res
 
 
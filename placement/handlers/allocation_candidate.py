@@ -15,15 +15,21 @@
 import collections
 import itertools
 
+from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
+from oslo_utils import excutils
 from oslo_utils import timeutils
 import six
 import webob
 
+from placement import errors
 from placement import exception
+from placement.handlers import allocation
+from placement.handlers import util as data_util
 from placement import lib
 from placement import microversion
+from placement.objects import allocation as alloc_obj
 from placement.objects import allocation_candidate as ac_obj
 from placement.policies import allocation_candidate as policies
 from placement.schemas import allocation_candidate as schema
@@ -32,6 +38,9 @@ from placement import util
 from placement import wsgi_wrapper
 
 
+LOG = logging.getLogger(__name__)
+
+
 def _transform_allocation_requests_dict(alloc_reqs):
     """Turn supplied list of AllocationRequest objects into a list of
     allocations dicts keyed by resource provider uuid of resources involved
@@ -266,21 +275,12 @@ def _transform_allocation_candidates(context, alloc_cands, requests,
     }
 
 
-@wsgi_wrapper.PlacementWsgify
-@microversion.version_handler('1.10')
-@util.check_accept('application/json')
-def list_allocation_candidates(req):
-    """GET a JSON object with a list of allocation requests and a JSON object
-    of provider summary objects
-
-    On success return a 200 and an application/json body representing
-    a collection of allocation requests and provider summaries
-    """
-    context = req.environ['placement.context']
-    context.can(policies.LIST)
-    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
+def _get_schema(want_version):
+    """Return the query string schema for the requested microversion."""
     get_schema = schema.GET_SCHEMA_1_10
-    if want_version.matches((1, 33)):
+    if want_version.matches((1, 34)):
+        get_schema = schema.GET_SCHEMA_1_34
+    elif want_version.matches((1, 33)):
         get_schema = schema.GET_SCHEMA_1_33
     elif want_version.matches((1, 31)):
         get_schema = schema.GET_SCHEMA_1_31
@@ -292,7 +292,17 @@ def list_allocation_candidates(req):
         get_schema = schema.GET_SCHEMA_1_17
     elif want_version.matches((1, 16)):
         get_schema = schema.GET_SCHEMA_1_16
-    util.validate_query_params(req, get_schema)
+    return get_schema
+
+
+def _get_candidates(req, context, want_version):
+    """Validate the allocation candidate query string of `req` and return a
+    tuple of the matching AllocationCandidates object and the dict of request
+    groups it was built from.
+
+    :raises webob.exc.HTTPBadRequest: if the query string is not valid.
+    """
+    util.validate_query_params(req, _get_schema(want_version))
 
     requests = lib.RequestGroup.dict_from_request(req)
     limit = req.GET.getall('limit')
@@ -313,19 +323,40 @@ def list_allocation_candidates(req):
                 'The "group_policy" parameter is required when specifying '
                 'more than one "resources{N}" parameter.')
 
+    # Schema ensures that sort, if present, is one of SORT_OPTIONS in
+    # placement.schemas.allocation_candidate
+    sort = req.GET.get('sort')
+
     # We can't be aware of nested architecture with old microversions
     nested_aware = want_version.matches((1, 29))
 
     try:
         cands = ac_obj.AllocationCandidates.get_by_requests(
             context, requests, limit=limit, group_policy=group_policy,
-            nested_aware=nested_aware)
+            nested_aware=nested_aware, sort=sort)
     except exception.ResourceClassNotFound as exc:
         raise webob.exc.HTTPBadRequest(
             'Invalid resource class in resources parameter: %(error)s' %
             {'error': exc})
     except exception.TraitNotFound as exc:
         raise webob.exc.HTTPBadRequest(six.text_type(exc))
+    return cands, requests
+
+
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.10')
+@util.check_accept('application/json')
+def list_allocation_candidates(req):
+    """GET a JSON object with a list of allocation requests and a JSON object
+    of provider summary objects
+
+    On success return a 200 and an application/json body representing
+    a collection of allocation requests and provider summaries
+    """
+    context = req.environ['placement.context']
+    context.can(policies.LIST)
+    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
+    cands, requests = _get_candidates(req, context, want_version)
 
     response = req.response
     trx_cands = _transform_allocation_candidates(context, cands, requests,
@@ -337,3 +368,81 @@ def list_allocation_candidates(req):
         response.cache_control = 'no-cache'
         response.last_modified = timeutils.utcnow(with_timezone=True)
     return response
+
+
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.35')
+@util.require_content('application/json')
+@util.check_accept('application/json')
+def claim_allocation_candidate(req):
+    """POST to select an allocation candidate and write it as the allocations
+    of a consumer in a single request.
+
+    The query string is the same as for GET /allocation_candidates; the body
+    identifies the consumer. Candidates are tried in order (see the ``sort``
+    parameter) until one can be written without exceeding capacity or
+    conflicting with a concurrent resource provider update.
+
+    On success return a 200 with an application/json body representing the
+    claimed allocations, in the same form as GET /allocations/{consumer_uuid}.
+    If no candidate could be claimed return a 409.
+    """
+    context = req.environ['placement.context']
+    context.can(policies.CLAIM)
+    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
+    data = util.extract_json(req.body, schema.POST_CLAIM_SCHEMA_1_35)
+    cands, _requests = _get_candidates(req, context, want_version)
+    if not cands.allocation_requests:
+        raise webob.exc.HTTPConflict(
+            'Unable to claim allocation candidate: no allocation candidates '
+            'match the request.')
+
+    consumer_uuid = data['consumer_uuid']
+    consumer, created_new_consumer = data_util.ensure_consumer(
+        context, consumer_uuid, data['project_id'], data['user_id'],
+        data['consumer_generation'], want_version)
+
+    candidates = (
+        [alloc_obj.Allocation(
+            resource_provider=arr.resource_provider,
+            consumer=consumer,
+            resource_class=arr.resource_class,
+            used=arr.amount)
+         for arr in areq.resource_requests]
+        for areq in cands.allocation_requests)
+
+    def _claim(candidates):
+        try:
+            claimed = alloc_obj.claim_first_available(context, candidates)
+            LOG.debug("Successfully claimed allocations %s", claimed)
+            return claimed
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if created_new_consumer:
+                    allocation.delete_consumers([consumer])
+
+    try:
+        claimed = _claim(candidates)
+    # NotFound and InvalidInventory here mean that none of the candidates
+    # could be claimed, either because a provider went away or because
+    # capacity was used up by others since the candidates were found.
+    except (exception.NotFound, exception.InvalidInventory) as exc:
+        raise webob.exc.HTTPConflict(
+            'Unable to claim allocation candidate for consumer '
+            '%(consumer_uuid)s: %(error)s' %
+            {'consumer_uuid': consumer_uuid, 'error': exc})
+    except exception.ConcurrentUpdateDetected as exc:
+        raise webob.exc.HTTPConflict(
+            'Inventory and/or allocations changed while attempting to '
+            'claim: %(error)s' % {'error': exc},
+            comment=errors.CONCURRENT_UPDATE)
+
+    output = allocation.serialize_allocations_for_consumer(
+        claimed, want_version)
+    response = req.response
+    response.status = 200
+    response.body = encodeutils.to_utf8(jsonutils.dumps(output))
+    response.content_type = 'application/json'
+    response.cache_control = 'no-cache'
+    response.last_modified = timeutils.utcnow(with_timezone=True)
+    return response
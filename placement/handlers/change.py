@@ -0,0 +1,66 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Placement API handler for the change log."""
+
+from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
+from oslo_utils import timeutils
+import webob
+
+from placement import errors
+from placement import exception
+from placement import microversion
+from placement.objects import change as change_obj
+from placement.policies import change as policies
+from placement.schemas import change as schema
+from placement import util
+from placement import wsgi_wrapper
+
+
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.42')
+@util.check_accept('application/json')
+def list_changes(req):
+    """GET the changes to resource providers and consumers made after the
+    sequence number in the `since` query parameter.
+
+    On success return a 200 with an application/json body holding the
+    changes and the sequence number to ask for changes after next. Without
+    `since` no changes are returned, only the latest sequence number.
+    Return 410 Gone if some of the changes after `since` have been
+    discarded, in which case the client must read everything again.
+    """
+    context = req.environ['placement.context']
+    context.can(policies.LIST)
+    util.validate_query_params(req, schema.GET_CHANGES_SCHEMA_1_42)
+    since = req.GET.get('since')
+    if since is not None:
+        since = int(since)
+    limit = req.GET.get('limit')
+    if limit is not None:
+        limit = int(limit)
+
+    try:
+        changes, last = change_obj.get_since(context, since=since,
+                                             limit=limit)
+    except exception.ChangesExpired as exc:
+        raise webob.exc.HTTPGone(
+            'Unable to list changes: %(error)s' % {'error': exc},
+            comment=errors.CHANGES_EXPIRED)
+
+    response = req.response
+    response.body = encodeutils.to_utf8(jsonutils.dumps(
+        {'changes': changes, 'last_sequence': last}))
+    response.content_type = 'application/json'
+    response.cache_control = 'no-cache'
+    response.last_modified = timeutils.utcnow(with_timezone=True)
+    return response
@@ -264,7 +264,11 @@ def get_inventories(req):
     """
     context = req.environ['placement.context']
     context.can(policies.LIST)
+    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
     uuid = util.wsgi_path_item(req.environ, 'uuid')
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, rp_obj.get_version(context, uuid)):
+        return util.not_modified(req)
     try:
         rp = rp_obj.ResourceProvider.get_by_uuid(context, uuid)
     except exception.NotFound as exc:
@@ -374,6 +378,79 @@ def set_inventories(req):
     return _send_inventories(req, resource_provider, inventories)
 
 
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.40')
+@util.require_content('application/json')
+def bulk_set_inventories(req):
+    """PUT to set all inventory for many resource providers at once.
+
+    The body holds, for each resource provider UUID, the provider generation
+    and its full set of inventories, as for PUT
+    /resource_providers/{uuid}/inventories. Providers whose inventories are
+    unchanged are left alone, and the rest are changed together: if any
+    provider cannot be updated, none are.
+
+    If any resource provider does not exist, return a 400.
+    If any resource generation is out of sync, return a 409.
+    If an inventory to be deleted is in use, return a 409.
+    If any inventory to be created or updated has settings which are
+    invalid (for example reserved exceeds capacity), return a 400.
+
+    On success return a 200 with an application/json body representing
+    the generation and inventories of each resource provider.
+    """
+    context = req.environ['placement.context']
+    context.can(policies.BULK_UPDATE)
+    want_version = req.environ[microversion.MICROVERSION_ENVIRON]
+    data = util.extract_json(req.body, schema.PUT_INVENTORIES_SCHEMA_1_40)
+
+    inventories = {}
+    for uuid, provider_data in data['resource_providers'].items():
+        resource_provider = rp_obj.ResourceProvider(context, uuid=uuid)
+        inv_list = []
+        for res_class, raw_inventory in provider_data['inventories'].items():
+            inventory_data = copy.copy(INVENTORY_DEFAULTS)
+            inventory_data.update(raw_inventory)
+            inv_list.append(make_inventory_object(
+                resource_provider, res_class, **inventory_data))
+        inventories[uuid] = (provider_data['resource_provider_generation'],
+                             inv_list)
+
+    try:
+        for _generation, inv_list in inventories.values():
+            _validate_inventory_capacity(want_version, inv_list)
+        generations = rp_obj.set_inventories(context, inventories)
+    except exception.ResourceProviderNotFound as exc:
+        raise webob.exc.HTTPBadRequest(
+            'Unable to update inventories: %(error)s' % {'error': exc})
+    except exception.ResourceClassNotFound as exc:
+        raise webob.exc.HTTPBadRequest(
+            'Unknown resource class in inventory: %(error)s' %
+            {'error': exc})
+    except exception.ConcurrentUpdateDetected as exc:
+        raise webob.exc.HTTPConflict(
+            'update conflict: %(error)s' % {'error': exc},
+            comment=errors.CONCURRENT_UPDATE)
+    except exception.InventoryInUse as exc:
+        raise webob.exc.HTTPConflict(
+            'update conflict: %(error)s' % {'error': exc},
+            comment=errors.INVENTORY_INUSE)
+    except exception.InvalidInventoryCapacity as exc:
+        raise webob.exc.HTTPBadRequest(
+            'Unable to update inventories: %(error)s' % {'error': exc})
+
+    output = {'resource_providers': {}}
+    for uuid, (_generation, inv_list) in inventories.items():
+        output['resource_providers'][uuid], _last_modified = (
+            _serialize_inventories(inv_list, generations[uuid]))
+    response = req.response
+    response.status = 200
+    response.body = encodeutils.to_utf8(jsonutils.dumps(output))
+    response.content_type = 'application/json'
+    response.cache_control = 'no-cache'
+    return response
+
+
 @wsgi_wrapper.PlacementWsgify
 @microversion.version_handler('1.5', status_code=405)
 def delete_inventories(req):
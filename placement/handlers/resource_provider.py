@@ -24,6 +24,8 @@ from placement.db import graph_db as db
 from placement import errors
 from placement import exception
 from placement import microversion
+from placement.objects import export as export_obj
+from placement.objects import resource_class as rc_obj
 from placement.objects import resource_provider as rp_obj
 from placement.policies import resource_provider as policies
 from placement.schemas import resource_provider as rp_schema
@@ -187,6 +189,10 @@ def get_resource_provider(req):
     context = req.environ['placement.context']
     context.can(policies.SHOW)
 
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, rp_obj.get_version(context, uuid, include_root=True)):
+        return util.not_modified(req)
+
     # The containing application will catch a not found here.
     resource_provider = rp_obj.ResourceProvider.get_by_uuid(
         context, uuid)
@@ -215,7 +221,9 @@ def list_resource_providers(req):
     want_version = req.environ[microversion.MICROVERSION_ENVIRON]
 
     schema = rp_schema.GET_RPS_SCHEMA_1_0
-    if want_version.matches((1, 18)):
+    if want_version.matches((1, 38)):
+        schema = rp_schema.GET_RPS_SCHEMA_1_38
+    elif want_version.matches((1, 18)):
         schema = rp_schema.GET_RPS_SCHEMA_1_18
     elif want_version.matches((1, 14)):
         schema = rp_schema.GET_RPS_SCHEMA_1_14
@@ -245,6 +253,14 @@ def list_resource_providers(req):
                 value = util.normalize_traits_qs_param(
                     value, allow_forbidden=allow_forbidden)
             filters[attr] = value
+    limit = None
+    if 'limit' in req.GET:
+        limit = int(req.GET['limit'])
+        # Ask for one more than the limit to know whether there is another
+        # page.
+        filters['limit'] = limit + 1
+    if 'marker' in req.GET:
+        filters['marker'] = req.GET['marker']
     try:
         resource_providers = rp_obj.get_all_by_filters(context, filters)
     except exception.ResourceClassNotFound as exc:
@@ -255,9 +271,18 @@ def list_resource_providers(req):
         raise webob.exc.HTTPBadRequest(
             'Invalid trait(s) in request: %(error)s' % {'error': exc})
 
+    next_marker = None
+    if limit is not None and len(resource_providers) > limit:
+        resource_providers = resource_providers[:limit]
+        next_marker = resource_providers[-1].uuid
+
     response = req.response
     output, last_modified = _serialize_providers(
         req.environ, resource_providers, want_version)
+    if next_marker:
+        output['next_marker'] = next_marker
+        output['links'] = [
+            {'rel': 'next', 'href': util.next_page_url(req, next_marker)}]
     response.body = encodeutils.to_utf8(jsonutils.dumps(output))
     response.content_type = 'application/json'
     if want_version.matches((1, 15)):
@@ -361,19 +386,90 @@ def create_resource_tree(req):
 
         returns: the UUID of the root of the newly-created tree
     There is no limit to the level of nesting for child resource providers.
+
+    Starting with microversion 1.39 the body may instead be a list of such
+    trees, all of which are created together. The response then contains the
+    list of the root providers, in the same order.
     """
     context = req.environ["placement.context"]
     context.can(policies.UPDATE)
     schema = rp_schema.POST_RP_TREE
     want_version = req.environ[microversion.MICROVERSION_ENVIRON]
+    if want_version.matches((1, 39)):
+        schema = rp_schema.POST_RP_TREES_1_39
     data = util.extract_json(req.body, schema)
-    root_rp = rp_obj.ResourceProvider.create_tree(context, data)
-    
+    trees = data if isinstance(data, list) else [data]
+    try:
+        root_rps = rp_obj.ResourceProvider.create_trees(context, trees)
+    except db.ClientError as e:
+        if "ConstraintValidationFailed" in str(e):
+            raise webob.exc.HTTPConflict("Conflicting resource provider "
+                    "already exists: %(error)s" % {'error': e},
+                    comment=errors.DUPLICATE_NAME)
+        raise webob.exc.HTTPBadRequest("Unable to create resource "
+                "tree: %(error)s" % {"error": e})
+
+    response = req.response
+    response.status = 200
+    if isinstance(data, list):
+        output = {"resource_providers": [
+            _serialize_provider(req.environ, root_rp, want_version)
+            for root_rp in root_rps]}
+    else:
+        root_rp = root_rps[0]
+        response.location = util.resource_provider_url(req.environ, root_rp)
+        output = _serialize_provider(req.environ, root_rp, want_version)
+    response.body = encodeutils.to_utf8(jsonutils.dumps(output))
+    response.content_type = "application/json"
+    response.cache_control = "no-cache"
+    return response
+
+
+def _ndjson(providers):
+    # The WSGI server closes the response body when it is done with it, or
+    # when the client goes away, which closes the export's transaction.
+    try:
+        for provider in providers:
+            yield encodeutils.to_utf8(jsonutils.dumps(provider) + '\n')
+    finally:
+        providers.close()
+
+
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.37')
+@util.check_accept('application/x-ndjson')
+def export_resource_providers(req):
+    """GET the capacity information of every resource provider as a stream
+    of newline-delimited JSON documents, one per provider.
+
+    The providers are read from the database a page at a time as the
+    response body is written, so the whole forest is never held in memory at
+    once.
+    """
+    context = req.environ['placement.context']
+    context.can(policies.EXPORT)
+    util.validate_query_params(req, rp_schema.GET_EXPORT_SCHEMA_1_37)
+
+    required_aggs = forbidden_aggs = None
+    if 'member_of' in req.GET:
+        required_aggs, forbidden_aggs = util.normalize_member_of_qs_params(
+            req)
+    resource_class = req.GET.get('resource_class')
+    if resource_class:
+        try:
+            rc_obj.ResourceClass.get_by_name(context, resource_class)
+        except exception.ResourceClassNotFound as exc:
+            raise webob.exc.HTTPBadRequest(
+                'Invalid resource class in resource_class parameter: '
+                '%(error)s' % {'error': exc})
+
+    providers = export_obj.iter_providers(
+        context, resource_class=resource_class, required_aggs=required_aggs,
+        forbidden_aggs=forbidden_aggs, in_tree=req.GET.get('in_tree'))
+
     response = req.response
     response.status = 200
-    req.response.location = util.resource_provider_url(req.environ, root_rp)
-    req.response.body = encodeutils.to_utf8(
-            jsonutils.dumps(
-            _serialize_provider(req.environ, root_rp, want_version)))
-    req.response.content_type = "application/json"
-    req.response.cache_control = "no-cache"
+    response.content_type = 'application/x-ndjson'
+    response.cache_control = 'no-cache'
+    response.app_iter = _ndjson(providers)
+    return response
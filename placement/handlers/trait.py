@@ -71,7 +71,7 @@ def put_trait(req):
     name = util.wsgi_path_item(req.environ, 'name')
 
     try:
-        jsonschema.validate(name, schema.CUSTOM_TRAIT)
+        util.schema_validator(schema.CUSTOM_TRAIT).validate(name)
     except jsonschema.ValidationError:
         raise webob.exc.HTTPBadRequest(
             'The trait is invalid. A valid trait must be no longer than '
@@ -182,6 +182,10 @@ def list_traits_for_resource_provider(req):
     want_version = req.environ[microversion.MICROVERSION_ENVIRON]
     uuid = util.wsgi_path_item(req.environ, 'uuid')
 
+    if want_version.matches((1, 41)) and util.etag_matches(
+            req, rp_obj.get_version(context, uuid)):
+        return util.not_modified(req)
+
     # Resource provider object is needed for two things: If it is
     # NotFound we'll get a 404 here, which needs to happen because
     # get_all_by_resource_provider can return an empty list.
@@ -118,3 +118,51 @@ def get_total_usages(req):
         # is the usage, now? So the last-modified time is set to utcnow.
         req.response.last_modified = timeutils.utcnow(with_timezone=True)
     return req.response
+
+
+@wsgi_wrapper.PlacementWsgify
+@microversion.version_handler('1.36')
+@util.require_content('application/json')
+@util.check_accept('application/json')
+def list_provider_summaries(req):
+    """POST to read the generation, inventory and usage of many resource
+    providers at once.
+
+    The body selects the providers, either by a list of UUIDs, by tree or
+    aggregate membership, or all providers. Results are ordered by UUID and
+    paged with `limit`, or PROVIDER_SUMMARIES_DEFAULT_LIMIT, and `marker`;
+    when more providers remain, the response includes the `next_marker` to
+    send for the next page.
+
+    On success return a 200 with an application/json body.
+    """
+    context = req.environ['placement.context']
+    context.can(policies.PROVIDER_SUMMARIES)
+    data = util.extract_json(req.body,
+                             schema.POST_PROVIDER_SUMMARIES_SCHEMA_1_36)
+    limit = data.get('limit', schema.PROVIDER_SUMMARIES_DEFAULT_LIMIT)
+    # Ask for one more than the limit to know whether there is another page.
+    summaries = usage_obj.get_provider_summaries(
+        context, uuids=data.get('resource_providers'),
+        in_tree=data.get('in_tree'), member_of=data.get('member_of'),
+        marker=data.get('marker'), limit=limit + 1)
+
+    output = {'provider_summaries': []}
+    if len(summaries) > limit:
+        summaries = summaries[:limit]
+        output['next_marker'] = summaries[-1]['uuid']
+    for summary in summaries:
+        output['provider_summaries'].append({
+            'resource_provider_uuid': summary['uuid'],
+            'resource_provider_generation': summary['generation'],
+            'inventories': summary['inventories'],
+            'usages': summary['usages'],
+        })
+
+    response = req.response
+    response.body = encodeutils.to_utf8(jsonutils.dumps(output))
+    response.content_type = 'application/json'
+    response.cache_control = 'no-cache'
+    # As for the usages of a single provider, the answer is the state now.
+    response.last_modified = timeutils.utcnow(with_timezone=True)
+    return response
@@ -36,7 +36,8 @@ def ensure_consumer(ctx, consumer_uuid, project_uuid, user_uuid,
     :note: If the supplied project or user external identifiers do not match an
            existing consumer's project and user identifiers, the existing
            consumer's project and user IDs are updated to reflect the supplied
-           ones.
+           ones, without incrementing the consumer's generation (it will be
+           bumped when the allocations are written).
 
     :param ctx: The request context.
     :param consumer_uuid: The uuid of the consumer of the resources.
@@ -48,98 +49,77 @@ def ensure_consumer(ctx, consumer_uuid, project_uuid, user_uuid,
     :raises webob.exc.HTTPConflict if consumer generation is required and there
             was a mismatch
     """
-    created_new_consumer = False
+    consumers, new_consumers_created = ensure_consumers(
+        ctx,
+        {
+            consumer_uuid: {
+                'project_id': project_uuid,
+                'user_id': user_uuid,
+                'consumer_generation': consumer_generation,
+            },
+        },
+        want_version)
+    return consumers[consumer_uuid], bool(new_consumers_created)
+
+
+def ensure_consumers(ctx, consumer_data, want_version):
+    """Ensures there are records for the consumers, projects and users
+    referenced by each of the supplied consumers, in a single statement
+    regardless of how many consumers are supplied.
+
+    Returns a tuple containing a dict, keyed by consumer UUID, of populated
+    Consumer objects containing Project and User sub-objects, and a list of
+    those Consumer objects which were newly created.
+
+    :note: As with ensure_consumer(), an existing consumer whose project or
+           user external identifiers differ from those supplied is updated to
+           reflect the supplied ones, without its generation being changed.
+
+    :param ctx: The request context.
+    :param consumer_data: A dict, keyed by consumer UUID, of dicts containing
+        `project_id`, `user_id` and, optionally, `consumer_generation`.
+    :param want_version: the microversion matcher.
+    :raises webob.exc.HTTPConflict if consumer generation is required and there
+            was a mismatch for any of the consumers. No records are created or
+            modified in that case.
+    """
+    # If we are attempting to modify or create allocations after 1.26, we
+    # need a consumer generation specified. For a consumer that does not
+    # exist yet, the user must specify None to indicate that they expect the
+    # consumer not to exist.
     requires_consumer_generation = want_version.matches((1, 28))
-    if project_uuid is None:
-        project_uuid = ctx.config.placement.incomplete_consumer_project_id
-        user_uuid = ctx.config.placement.incomplete_consumer_user_id
-    try:
-        proj = project_obj.Project.get_by_uuid(ctx, project_uuid)
-    except exception.NotFound:
-        # Auto-create the project if we found no record of it...
-        try:
-            proj = project_obj.Project(ctx, uuid=project_uuid)
-            proj.create()
-        except exception.ProjectExists:
-            # No worries, another thread created this project already
-            proj = project_obj.Project.get_by_uuid(ctx, project_uuid)
-    try:
-        user = user_obj.User.get_by_uuid(ctx, user_uuid)
-    except exception.NotFound:
-        # Auto-create the user if we found no record of it...
-        try:
-            user = user_obj.User(ctx, uuid=user_uuid)
-            user.create()
-        except exception.UserExists:
-            # No worries, another thread created this user already
-            user = user_obj.User.get_by_uuid(ctx, user_uuid)
+    records = []
+    for consumer_uuid, data in consumer_data.items():
+        project_uuid = data.get('project_id')
+        user_uuid = data.get('user_id')
+        if project_uuid is None:
+            project_uuid = ctx.config.placement.incomplete_consumer_project_id
+            user_uuid = ctx.config.placement.incomplete_consumer_user_id
+        records.append({
+            'consumer_uuid': consumer_uuid,
+            'project_uuid': project_uuid,
+            'user_uuid': user_uuid,
+            'generation': data.get('consumer_generation'),
+        })
 
     try:
-        consumer = consumer_obj.Consumer.get_by_uuid(ctx, consumer_uuid)
-        if requires_consumer_generation:
-            if consumer.generation != consumer_generation:
-                raise webob.exc.HTTPConflict(
-                    'consumer generation conflict - '
-                    'expected %(expected_gen)s but got %(got_gen)s' %
-                    {
-                        'expected_gen': consumer.generation,
-                        'got_gen': consumer_generation,
-                    },
-                    comment=errors.CONCURRENT_UPDATE)
-        # NOTE(jaypipes): The user may have specified a different project and
-        # user external ID than the one that we had for the consumer. If this
-        # is the case, go ahead and modify the consumer record with the
-        # newly-supplied project/user information, but do not bump the consumer
-        # generation (since it will be bumped in the
-        # AllocationList.replace_all() method).
-        #
-        # TODO(jaypipes): This means that there may be a partial update.
-        # Imagine a scenario where a user calls POST /allocations, and the
-        # payload references two consumers. The first consumer is a new
-        # consumer and is auto-created. The second consumer is an existing
-        # consumer, but contains a different project or user ID than the
-        # existing consumer's record. If the eventual call to
-        # AllocationList.replace_all() fails for whatever reason (say, a
-        # resource provider generation conflict or out of resources failure),
-        # we will end up deleting the auto-created consumer but we MAY not undo
-        # the changes to the second consumer's project and user ID. I say MAY
-        # and not WILL NOT because I'm not sure that the exception that gets
-        # raised from AllocationList.replace_all() will cause the context
-        # manager's transaction to rollback automatically. I believe that the
-        # same transaction context is used for both util.ensure_consumer() and
-        # AllocationList.replace_all() within the same HTTP request, but need
-        # to test this to be 100% certain...
-        if (project_uuid != consumer.project.uuid or
-                user_uuid != consumer.user.uuid):
-            LOG.debug("Supplied project or user ID for consumer %s was "
-                      "different than existing record. Updating consumer "
-                      "record.", consumer_uuid)
-            consumer.project = proj
-            consumer.user = user
-            consumer.update()
-    except exception.NotFound:
-        # If we are attempting to modify or create allocations after 1.26, we
-        # need a consumer generation specified. The user must have specified
-        # None for the consumer generation if we get here, since there was no
-        # existing consumer with this UUID and therefore the user should be
-        # indicating that they expect the consumer did not exist.
-        if requires_consumer_generation:
-            if consumer_generation is not None:
-                raise webob.exc.HTTPConflict(
-                    'consumer generation conflict - '
-                    'expected null but got %s' % consumer_generation,
-                    comment=errors.CONCURRENT_UPDATE)
-        # No such consumer. This is common for new allocations. Create the
-        # consumer record
-        try:
-            consumer = consumer_obj.Consumer(
-                ctx, uuid=consumer_uuid, project=proj, user=user)
-            consumer.create()
-            created_new_consumer = True
-        except exception.ConsumerExists:
-            # No worries, another thread created this user already
-            consumer = consumer_obj.Consumer.get_by_uuid(ctx, consumer_uuid)
-    # Make sure they are related
-    consumer_obj.relate_project_and_user(ctx, project_uuid, user_uuid,
-            consumer_uuid)
-    return consumer, created_new_consumer
+        ensured = consumer_obj.ensure_consumers(
+            ctx, records, check_generations=requires_consumer_generation)
+    except exception.ConsumerGenerationConflict as exc:
+        raise webob.exc.HTTPConflict(
+            exc.format_message(), comment=errors.CONCURRENT_UPDATE)
+
+    consumers = {}
+    new_consumers_created = []
+    for rec in records:
+        consumer_uuid = rec['consumer_uuid']
+        generation, created = ensured[consumer_uuid]
+        consumer = consumer_obj.Consumer(
+            ctx, uuid=consumer_uuid,
+            project=project_obj.Project(ctx, uuid=rec['project_uuid']),
+            user=user_obj.User(ctx, uuid=rec['user_uuid']),
+            generation=generation)
+        consumers[consumer_uuid] = consumer
+        if created:
+            new_consumers_created.append(consumer)
+    return consumers, new_consumers_created
@@ -26,6 +26,10 @@ import webob
 SERVICE_TYPE = 'placement'
 MICROVERSION_ENVIRON = '%s.microversion' % SERVICE_TYPE
 VERSIONED_METHODS = collections.defaultdict(list)
+# The method chosen for each (qualified name, version) pair, so that
+# VERSIONED_METHODS is only searched the first time a handler is called at a
+# version. It is cleared whenever a method is registered.
+RESOLVED_METHODS = {}
 
 # The Canonical Version List
 VERSIONS = [
@@ -83,6 +87,15 @@ VERSIONS = [
              # `GET /resource_providers` and `GET /allocation_candidates`
     '1.33',  # Support granular resource requests with suffixes that match
              # [A-Za-z0-9_-]{1,64}.
+    '1.34',  # Add sort parameter to `GET /allocation_candidates`
+    '1.35',  # Add `POST /allocation_candidates/claim`
+    '1.36',  # Add `POST /provider_summaries`
+    '1.37',  # Add `GET /export/resource_providers`
+    '1.38',  # Add `limit` and `marker` to `GET /resource_providers`
+    '1.39',  # Accept a list of trees in `POST /resource_tree`
+    '1.40',  # Add `PUT /inventories`
+    '1.41',  # Add ETag and If-None-Match to provider and allocation GETs
+    '1.42',  # Add `GET /changes`
 ]
 
 
@@ -129,12 +142,23 @@ def _find_method(f, version, status_code):
     If no match is found a HTTPError corresponding to status_code will
     be returned.
     """
-    qualified_name = _fully_qualified_name(f)
+    return _resolve_method(_fully_qualified_name(f), version, status_code)
+
+
+def _resolve_method(qualified_name, version, status_code):
+    """Returns the method registered for qualified_name at version,
+    consulting RESOLVED_METHODS before VERSIONED_METHODS.
+    """
+    try:
+        return RESOLVED_METHODS[(qualified_name, version)]
+    except KeyError:
+        pass
     # A KeyError shouldn't be possible here, but let's be robust
     # just in case.
     method_list = VERSIONED_METHODS.get(qualified_name, [])
     for min_version, max_version, func in method_list:
         if min_version <= version <= max_version:
+            RESOLVED_METHODS[(qualified_name, version)] = func
             return func
 
     raise webob.exc.status_map[status_code]
@@ -169,10 +193,12 @@ def version_handler(min_ver, max_ver=None, status_code=404):
 
         def decorated_func(req, *args, **kwargs):
             version = req.environ[MICROVERSION_ENVIRON]
-            return _find_method(f, version, status_code)(req, *args, **kwargs)
+            return _resolve_method(qualified_name, version, status_code)(
+                req, *args, **kwargs)
 
         # Sort highest min version to beginning of list.
         VERSIONED_METHODS[qualified_name].sort(key=lambda x: x[0],
                                                reverse=True)
+        RESOLVED_METHODS.clear()
         return decorated_func
     return decorator
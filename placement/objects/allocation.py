@@ -11,17 +11,23 @@
 #    under the License.
 
 import collections
+import threading
 
+from oslo_context import context as oslo_context
 from oslo_db import api as oslo_db_api
 from oslo_log import log as logging
 
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import change as change_obj
 from placement.objects import consumer as consumer_obj
 from placement.objects import project as project_obj
+from placement.objects import resource_class as rc_obj
 from placement.objects import resource_provider as rp_obj
+from placement.objects import usage as usage_obj
 from placement.objects import user as user_obj
+from placement import stats
 
 
 LOG = logging.getLogger(__name__)
@@ -30,6 +36,14 @@ LOG = logging.getLogger(__name__)
 # been a resource provider (not consumer) generation coflict.
 RP_CONFLICT_RETRY_COUNT = 10
 
+# The maximum number of candidate allocation lists that claim_first_available
+# will attempt to write before giving up.
+CLAIM_ATTEMPT_COUNT = 10
+
+# The number of seconds a write queued with the ClaimCoordinator waits for the
+# combiner to take it before writing it on its own.
+CLAIM_WAIT_TIMEOUT = 5.0
+
 
 class Allocation(object):
 
@@ -65,12 +79,7 @@ def _delete_allocations_for_consumer(context, consumer_uuid):
     be written. This is wrapped in a transaction, so if the write subsequently
     fails, the deletion will also be rolled back.
     """
-    query = """
-            MATCH p=(:CONSUMER {uuid: '%s'})-[:USES]->()
-            WITH relationships(p)[0] AS usages
-            DELETE usages
-    """ % consumer_uuid
-    context.tx.run(query)
+    usage_obj.release_allocations(context, [consumer_uuid])
 
 
 def _check_capacity_exceeded(context, allocs):
@@ -92,32 +101,27 @@ def _check_capacity_exceeded(context, allocs):
     :param allocs: List of `Allocation` objects to check
     """
     rc_names = set([a.resource_class for a in allocs])
-    # Make sure that all the rc_names are valid
-    query = """
-            MATCH (rc:RESOURCE_CLASS)
-            WHERE rc.name IN {names}
-            RETURN rc.name AS rc_name
-    """
-    result = context.tx.run(query, names=list(rc_names))
-    db_names = set([rec["rc_name"] for rec in result])
-    set_bad_names = rc_names - db_names
+    provider_uuids = set([a.resource_provider.uuid for a in allocs])
+    # The existing allocations of the consumers in `allocs` are about to be
+    # replaced, so they are left out of the usage totals.
+    consumer_uuids = set([a.consumer.uuid for a in allocs])
+    set_bad_names = rc_obj.unknown_names(context, rc_names)
     if set_bad_names:
         bad_names = ",".join(set_bad_names)
         raise exception.ResourceClassNotFound(resource_class=bad_names)
 
-    provider_uuids = set([a.resource_provider.uuid for a in allocs])
     query = """
             MATCH (rp:RESOURCE_PROVIDER)-[:PROVIDES]->(rc)
             WHERE rp.uuid IN {rp_uuids}
-            AND labels(rc)[0] IN {labels}
-            WITH rp, rc
-            OPTIONAL MATCH p=(cs:CONSUMER)-[:USES]->(rc)
-            WITH rp, rc, relationships(p)[0] AS allocs
+            AND labels(rc)[0] IN {names}
+            OPTIONAL MATCH (cs:CONSUMER)-[allocs:USES]->(rc)
+            WHERE NOT cs.uuid IN {consumer_uuids}
             WITH rp, rc, sum(allocs.amount) AS total_usages
             RETURN rp, rc, labels(rc)[0] AS rc_name, total_usages
     """
-    result = context.tx.run(query, rp_uuids=list(provider_uuids),
-            labels=list(rc_names)).data()
+    result = context.tx.run(query, names=list(rc_names),
+            rp_uuids=list(provider_uuids),
+            consumer_uuids=list(consumer_uuids)).data()
 
     # Create a map keyed by (rp_uuid, res_class) for the records in the DB
     usage_map = {}
@@ -216,25 +220,46 @@ def _get_allocations_by_provider_uuid(context, rp_uuid):
             RETURN rp, rc, rc_name, cs, usages, pj, user
     """ % rp_uuid
     result = context.tx.run(query).data()
-    allocs = []
-    for record in result:
-        rec_cs = db.pythonize(record["cs"])
-        pj_uuid = record["pj"].get("uuid") if record["pj"] else None
-        user_uuid = record["user"].get("uuid") if record["user"] else None
-        allocs.append({
-            "resource_provider_name": record["rp"]["name"],
-            "resource_provider_uuid": record["rp"]["uuid"],
-            "resource_provider_generation": record["rp"]["generation"],
-            "resource_class_name": record["rc_name"],
-            "used": record["usages"]["amount"],
-            "consumer_uuid": rec_cs["uuid"],
-            "consumer_generation": rec_cs["generation"],
-            "project_uuid": pj_uuid,
-            "user_uuid": user_uuid,
-            "created_at": rec_cs["created_at"],
-            "updated_at": rec_cs["updated_at"],
-        })
-    return allocs
+    return [_consumer_allocation_from_record(record) for record in result]
+
+
+@db_api.placement_context_manager.reader
+def _get_allocations_by_consumer_uuids(context, consumer_uuids):
+    """Returns the allocations of all of the supplied consumers in a single
+    query, in the same form as _get_allocations_by_consumer_uuid().
+    """
+    query = """
+            MATCH p=(cs:CONSUMER)-[:USES]->(rc)
+            WHERE cs.uuid IN {consumer_uuids}
+            WITH cs, rc, labels(rc)[0] AS rc_name,
+                relationships(p)[0] AS usages
+            OPTIONAL MATCH (pj:PROJECT)-[:OWNS]->(user:USER)-[:OWNS]->(cs)
+            WITH rc, rc_name, cs, usages, pj, user
+            MATCH (rp:RESOURCE_PROVIDER)-[:PROVIDES]->(rc)
+            RETURN rp, rc, rc_name, cs, usages, pj, user
+    """
+    result = context.tx.run(query,
+            consumer_uuids=list(consumer_uuids)).data()
+    return [_consumer_allocation_from_record(record) for record in result]
+
+
+def _consumer_allocation_from_record(record):
+    rec_cs = db.pythonize(record["cs"])
+    pj_uuid = record["pj"].get("uuid") if record["pj"] else None
+    user_uuid = record["user"].get("uuid") if record["user"] else None
+    return {
+        "resource_provider_name": record["rp"]["name"],
+        "resource_provider_uuid": record["rp"]["uuid"],
+        "resource_provider_generation": record["rp"]["generation"],
+        "resource_class_name": record["rc_name"],
+        "used": record["usages"]["amount"],
+        "consumer_uuid": rec_cs["uuid"],
+        "consumer_generation": rec_cs["generation"],
+        "project_uuid": pj_uuid,
+        "user_uuid": user_uuid,
+        "created_at": rec_cs["created_at"],
+        "updated_at": rec_cs["updated_at"],
+    }
 
 
 @db_api.placement_context_manager.reader
@@ -298,6 +323,57 @@ def _create_incomplete_consumer(context, consumer_id):
     return
 
 
+# Replaces the allocations of a set of consumers in a single statement:
+# existing USES edges of the consumers are removed, the new ones are created,
+# and the generation of every provider and consumer involved is compared and
+# set. The usage of the removed edges is returned so that the usage counters
+# can be adjusted. Each UNWIND is over a list that may be empty, so it is
+# swapped for [null] in that case to keep a row flowing into the rest of the
+# statement.
+_WRITE_ALLOCATIONS_QUERY = """
+        OPTIONAL MATCH (old_cs:CONSUMER)-[old:USES]->(old_inv)
+        WHERE old_cs.uuid IN {consumer_uuids}
+        OPTIONAL MATCH (old_pj:PROJECT)-[:OWNS]->(old_us:USER)
+            -[:OWNS]->(old_cs)
+        WITH collect(old) AS olds,
+            collect(CASE WHEN old IS NULL THEN null ELSE
+                {project_uuid: coalesce(old.project_uuid, old_pj.uuid),
+                user_uuid: coalesce(old.user_uuid, old_us.uuid),
+                resource_class: labels(old_inv)[0], used: old.amount,
+                rp_uuid: [(old_rp)-[:PROVIDES]->(old_inv) | old_rp.uuid][0]}
+            END) AS released
+        FOREACH (old IN olds | DELETE old)
+        WITH released
+        UNWIND (CASE {allocs} WHEN [] THEN [null] ELSE {allocs} END) AS alloc
+        OPTIONAL MATCH (rp:RESOURCE_PROVIDER {uuid: alloc.rp_uuid})
+            -[:PROVIDES]->(inv)
+        WHERE labels(inv)[0] = alloc.rc_name
+        OPTIONAL MATCH (cs:CONSUMER {uuid: alloc.consumer_uuid})
+        FOREACH (ignored IN
+                CASE WHEN inv IS NULL OR cs IS NULL THEN [] ELSE [1] END |
+            CREATE (cs)-[:USES {amount: alloc.used,
+                project_uuid: alloc.project_uuid,
+                user_uuid: alloc.user_uuid}]->(inv))
+        WITH released, count(CASE WHEN inv IS NULL OR cs IS NULL THEN null
+            ELSE 1 END) AS num_created
+        UNWIND (CASE {rps} WHEN [] THEN [null] ELSE {rps} END) AS rp_gen
+        OPTIONAL MATCH (rp:RESOURCE_PROVIDER {uuid: rp_gen.uuid})
+        WHERE rp.generation = rp_gen.generation
+        SET rp.generation = rp_gen.generation + 1
+        WITH released, num_created, count(rp) AS num_rps
+        UNWIND (CASE {consumers} WHEN [] THEN [null] ELSE {consumers} END)
+            AS cs_gen
+        OPTIONAL MATCH (cs:CONSUMER {uuid: cs_gen.uuid})
+        WHERE cs.generation = cs_gen.generation
+        SET cs.generation = cs_gen.generation + 1
+        RETURN released, num_created, num_rps, count(cs) AS num_consumers
+"""
+
+
+def _owner_uuid(owner):
+    return owner.uuid if owner is not None else None
+
+
 @db_api.placement_context_manager.writer
 def _set_allocations(context, allocs):
     """Write a set of allocations.
@@ -305,6 +381,12 @@ def _set_allocations(context, allocs):
     We must check that there is capacity for each allocation.
     If there is not we roll back the entire set.
 
+    The work is done in three statements regardless of the number of
+    allocations: one to validate capacity and constraints, one to replace
+    the allocations and increment the generations of the providers and
+    consumers involved, and one to update the project and user usage
+    counters.
+
     :raises `exception.ResourceClassNotFound` if any resource class in any
             allocation in allocs cannot be found in either the DB.
     :raises `exception.InvalidAllocationCapacityExceeded` if any inventory
@@ -315,13 +397,6 @@ def _set_allocations(context, allocs):
     :raises `ConcurrentUpdateDetected` if a generation for a resource
             provider or consumer failed its increment check.
     """
-    # First delete any existing allocations for any consumers. This
-    # provides a clean slate for the consumers mentioned in the list of
-    # allocations being manipulated.
-    consumer_uuids = set(alloc.consumer.uuid for alloc in allocs)
-    for consumer_uuid in consumer_uuids:
-        _delete_allocations_for_consumer(context, consumer_uuid)
-
     # Before writing any allocation records, we check that the submitted
     # allocations do not cause any inventory capacity to be exceeded for
     # any resource provider and resource class involved in the allocation
@@ -330,7 +405,8 @@ def _set_allocations(context, allocs):
     # function returns a list of ResourceProvider objects containing the
     # generation of the resource provider at the time of the check. These
     # objects are used at the end of the allocation transaction as a guard
-    # against concurrent updates.
+    # against concurrent updates. The existing allocations of the consumers
+    # involved are not counted, since they are about to be replaced.
     #
     # Don't check capacity when alloc.used is zero. Zero is not a valid
     # amount when making an allocation (the minimum consumption of a
@@ -347,36 +423,66 @@ def _set_allocations(context, allocs):
         if alloc.consumer.uuid not in visited_consumers:
             visited_consumers[alloc.consumer.uuid] = alloc.consumer
 
-        # If alloc.used is set to zero that is a signal that we don't want
-        # to (re-)create any allocations for this resource class.
-        # _delete_current_allocs has already wiped out allocations so just
-        # continue
-        if alloc.used == 0:
-            continue
-        consumer_uuid = alloc.consumer.uuid
-        rp = alloc.resource_provider
-        rc_name = alloc.resource_class
-        query = """
-                MATCH (rp:RESOURCE_PROVIDER {uuid: '%s'})
-                WITH rp
-                MATCH (rp)-[:PROVIDES]->(rc:%s)
-                WITH rp, rc
-                MATCH (cs:CONSUMER {uuid: '%s'})
-                WITH rp, rc, cs
-                CREATE p=(cs)-[:USES {amount: %s}]->(rc)
-                RETURN p
-        """ % (rp.uuid, rc_name, consumer_uuid, alloc.used)
-        result = context.tx.run(query)
-
-    # Generation checking happens here. If the inventory for this resource
+    # If alloc.used is set to zero that is a signal that we don't want to
+    # (re-)create any allocations for this resource class. The existing
+    # allocations of every consumer are wiped out by the write regardless.
+    new_allocs = [
+        {
+            "rp_uuid": alloc.resource_provider.uuid,
+            "rc_name": alloc.resource_class,
+            "consumer_uuid": alloc.consumer.uuid,
+            "project_uuid": _owner_uuid(alloc.consumer.project),
+            "user_uuid": _owner_uuid(alloc.consumer.user),
+            "used": alloc.used,
+        }
+        for alloc in allocs if alloc.used != 0]
+    rp_gens = [{"uuid": rp.uuid, "generation": rp.generation}
+               for rp in visited_rps.values()]
+    consumer_gens = [{"uuid": consumer.uuid,
+                      "generation": consumer.generation}
+                     for consumer in visited_consumers.values()]
+    result = context.tx.run(_WRITE_ALLOCATIONS_QUERY,
+            consumer_uuids=list(visited_consumers), allocs=new_allocs,
+            rps=rp_gens, consumers=consumer_gens).data()
+    record = result[0]
+
+    # Generation checking happens here. If the inventory for any resource
     # provider changed out from under us, this will raise a
     # ConcurrentUpdateDetected which can be caught by the caller to choose
     # to try again. It will also rollback the transaction so that these
     # changes always happen atomically.
+    if record["num_rps"] != len(rp_gens):
+        raise exception.ResourceProviderConcurrentUpdateDetected()
+    if record["num_consumers"] != len(consumer_gens):
+        raise exception.ConcurrentUpdateDetected()
+    # An allocation is not written when its inventory or consumer has gone
+    # since the capacity check. Carrying on would leave the usage counters
+    # out of step with the allocations.
+    if record["num_created"] != len(new_allocs):
+        raise exception.ConcurrentUpdateDetected()
+    claimed = [{"project_uuid": alloc["project_uuid"],
+                "user_uuid": alloc["user_uuid"],
+                "resource_class": alloc["rc_name"],
+                "used": alloc["used"]}
+               for alloc in new_allocs]
+    usage_obj.adjust_usages(context, record["released"], claimed)
     for rp in visited_rps.values():
-        rp.increment_generation()
+        rp.generation += 1
     for consumer in visited_consumers.values():
-        consumer.increment_generation()
+        consumer.generation += 1
+    # The providers that only lost allocations of the consumers do not have
+    # their generations changed.
+    rp_generations = dict((released["rp_uuid"], None)
+                          for released in record["released"])
+    rp_generations.update((rp.uuid, rp.generation)
+                          for rp in visited_rps.values())
+    change_obj.record(context, [
+        (change_obj.RESOURCE_PROVIDER, rp_uuid, change_obj.ALLOCATIONS,
+         generation)
+        for rp_uuid, generation in sorted(rp_generations.items())] + [
+        (change_obj.CONSUMER, consumer.uuid, change_obj.ALLOCATIONS,
+         consumer.generation)
+        for consumer in visited_consumers.values()])
     # If any consumers involved in this transaction ended up having no
     # allocations, delete the consumer records. Exclude consumers that had
     # *some resource* in the allocation list with a total > 0 since clearly
@@ -455,15 +561,244 @@ def get_all_by_consumer_id(context, consumer_id):
     return alloc_list
 
 
-def replace_all(context, alloc_list):
-    """Replace the supplied allocations.
+def get_all_by_consumer_ids(context, consumer_ids):
+    """Returns a dict, keyed by consumer UUID, of lists of the Allocation
+    objects for each of the supplied consumers, fetched in a single query.
+    Consumers with no allocations are not included.
+    """
+    db_allocs = _get_allocations_by_consumer_uuids(context, consumer_ids)
+    consumers = {}
+    alloc_lists = collections.defaultdict(list)
+    for rec in db_allocs:
+        consumer_uuid = rec["consumer_uuid"]
+        consumer = consumers.get(consumer_uuid)
+        if consumer is None:
+            consumer = consumer_obj.Consumer(
+                context, uuid=consumer_uuid,
+                generation=rec["consumer_generation"],
+                project=project_obj.Project(context, uuid=rec["project_uuid"]),
+                user=user_obj.User(context, uuid=rec["user_uuid"]))
+            consumers[consumer_uuid] = consumer
+        alloc_lists[consumer_uuid].append(
+            Allocation(
+                resource_provider=rp_obj.ResourceProvider(
+                    context,
+                    uuid=rec["resource_provider_uuid"],
+                    name=rec["resource_provider_name"],
+                    generation=rec["resource_provider_generation"]),
+                resource_class=rec["resource_class_name"],
+                consumer=consumer,
+                used=rec["used"],
+                created_at=rec.get("created_at"),
+                updated_at=rec.get("updated_at")))
+    return dict(alloc_lists)
 
-    :note: This method always deletes all allocations for all consumers
-           referenced in the list of Allocation objects and then replaces
-           the consumer's allocations with the Allocation objects. In doing
-           so, it will end up setting the Allocation.id attribute of each
-           Allocation object.
+
+def _reload_providers(context, alloc_list):
+    """Replace the resource provider of each Allocation in ``alloc_list`` with
+    a freshly loaded ResourceProvider object, so that the generations used in
+    the next write attempt are current.
     """
+    # We only want to reload each unique resource provider once.
+    alloc_rp_uuids = set(alloc.resource_provider.uuid for alloc in alloc_list)
+    seen_rps = {}
+    for rp_uuid in alloc_rp_uuids:
+        seen_rps[rp_uuid] = rp_obj.ResourceProvider.get_by_uuid(
+                context, rp_uuid)
+    for alloc in alloc_list:
+        rp_uuid = alloc.resource_provider.uuid
+        alloc.resource_provider = seen_rps[rp_uuid]
+
+
+class _ClaimRequest(object):
+    """One caller's allocation write, waiting in a ClaimCoordinator."""
+
+    def __init__(self, context, alloc_list):
+        self.context = context
+        self.alloc_list = alloc_list
+        self.consumer_uuids = set(alloc.consumer.uuid for alloc in alloc_list)
+        self.done = threading.Event()
+        # Set when the write is done, or when it is the caller's turn to
+        # become the combiner.
+        self.wakeup = threading.Event()
+        self.exc = None
+
+    def finish(self, exc=None):
+        self.exc = exc
+        self.done.set()
+        self.wakeup.set()
+
+
+class ClaimCoordinator(object):
+    """Combines concurrent allocation writes made in this process into shared
+    transactions.
+
+    Every write bumps the generation of each resource provider it touches, so
+    concurrent writes against the same popular provider (a shared storage
+    pool, say) conflict and retry. Instead, callers queue their writes here.
+    The first caller to find no write in progress becomes the combiner. It
+    takes the queued writes in batches and performs each batch as a single
+    _set_allocations() call, which checks capacity for the whole batch and
+    bumps each provider's generation once. If a combined write fails, each of
+    its writes is retried on its own so that every caller gets its own
+    success or failure.
+
+    The combiner stops once its own write is done, and hands the queue over
+    to the next waiting caller, so that no caller's response waits on the
+    writes of others for long. A caller whose write is not taken within
+    CLAIM_WAIT_TIMEOUT seconds writes it on its own.
+
+    Writes for the same consumer are never combined, since each of them
+    replaces all of that consumer's allocations.
+
+    `stats` counts:
+
+    submitted: writes queued with the coordinator.
+    batches: combined writes of more than one queued write.
+    combined: queued writes completed as part of a combined write.
+    combine_failures: combined writes that had to be retried singly.
+    withdrawn: queued writes not taken by the combiner in time, and written
+               by their callers.
+    writes: single-transaction allocation write attempts, combined or not.
+    rp_conflicts: write attempts that hit a resource provider generation
+                  conflict.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._combining = False
+        self.stats = stats.Counters('Allocation write')
+
+    def submit(self, context, alloc_list):
+        """Queue a write of `alloc_list` and wait for it to be done.
+
+        :raises: whatever replacing the allocations on their own would raise.
+        """
+        request = _ClaimRequest(context, alloc_list)
+        with self._lock:
+            self._pending.append(request)
+        self.stats.incr('submitted')
+        timed_out = False
+        while True:
+            with self._lock:
+                if request.done.is_set():
+                    break
+                request.wakeup.clear()
+                combiner = not self._combining
+                withdrawn = (not combiner and timed_out and
+                             request in self._pending)
+                if combiner:
+                    self._combining = True
+                elif withdrawn:
+                    self._pending.remove(request)
+            if combiner:
+                self._combine(request)
+            elif withdrawn:
+                self.stats.incr('withdrawn')
+                self._write_alone(request)
+            else:
+                timed_out = not request.wakeup.wait(CLAIM_WAIT_TIMEOUT)
+        if request.exc is not None:
+            raise request.exc
+
+    def _combine(self, own):
+        """Write batches of queued writes until `own` has been written."""
+        context = own.context
+        batch_size = context.config.placement.allocation_write_batch_size
+        batch = []
+        try:
+            while not own.done.is_set():
+                with self._lock:
+                    batch = self._pending[:batch_size]
+                    del self._pending[:batch_size]
+                if not batch:
+                    break
+                for group in self._group(batch):
+                    self._write_group(context, group)
+                batch = []
+        finally:
+            with self._lock:
+                # Whatever stopped the combiner, the writes it took and did
+                # not finish are queued again for the next one, apart from
+                # its own, whose caller gets the exception.
+                self._pending[:0] = [
+                    request for request in batch
+                    if request is not own and not request.done.is_set()]
+                if own in self._pending:
+                    self._pending.remove(own)
+                self._combining = False
+                if self._pending:
+                    self._pending[0].wakeup.set()
+
+    @staticmethod
+    def _group(batch):
+        """Split a batch into groups of requests that share no consumer."""
+        groups = []
+        for request in batch:
+            for group in groups:
+                if not any(request.consumer_uuids & other.consumer_uuids
+                           for other in group):
+                    group.append(request)
+                    break
+            else:
+                groups.append([request])
+        return groups
+
+    def _write_group(self, context, group):
+        if len(group) > 1:
+            combined = []
+            for request in group:
+                combined.extend(request.alloc_list)
+            try:
+                _reload_providers(context, combined)
+                self.stats.incr('writes')
+                _set_allocations(context, combined)
+            except Exception as exc:
+                conflict = exception.ResourceProviderConcurrentUpdateDetected
+                if isinstance(exc, conflict):
+                    self.stats.incr('rp_conflicts')
+                self.stats.incr('combine_failures')
+                LOG.debug("Combined allocation write failed, writing each "
+                          "separately: %s", exc)
+            else:
+                self.stats.incr('batches')
+                self.stats.incr('combined', len(group))
+                # The combined write is logged under the combiner's request,
+                # so the requests it wrote for are named.
+                LOG.debug("Combined %(count)d allocation writes into one "
+                          "transaction, for requests %(request_ids)s",
+                          {"count": len(group),
+                           "request_ids": ", ".join(
+                               request.context.request_id
+                               for request in group)})
+                for request in group:
+                    request.finish()
+                return
+        for request in group:
+            self._write_alone(request)
+
+    @staticmethod
+    def _write_alone(request):
+        # The write is made in the request's own context, and logged with its
+        # request id, whichever caller makes it.
+        current = oslo_context.get_current()
+        request.context.update_store()
+        try:
+            _replace_all(request.context, request.alloc_list)
+        except Exception as exc:
+            request.finish(exc)
+        else:
+            request.finish()
+        finally:
+            if current is not None:
+                current.update_store()
+
+
+_CLAIM_COORDINATOR = ClaimCoordinator()
+
+
+def _replace_all(context, alloc_list):
     # Retry _set_allocations server side if there is a
     # ResourceProviderConcurrentUpdateDetected. We don't care about
     # sleeping, we simply want to reset the resource provider objects
@@ -474,21 +809,14 @@ def replace_all(context, alloc_list):
     while retries:
         retries -= 1
         try:
+            _CLAIM_COORDINATOR.stats.incr('writes')
             _set_allocations(context, alloc_list)
             break
         except exception.ResourceProviderConcurrentUpdateDetected:
+            _CLAIM_COORDINATOR.stats.incr('rp_conflicts')
             LOG.debug("Retrying allocations write on resource provider "
                       "generation conflict")
-            # We only want to reload each unique resource provider once.
-            alloc_rp_uuids = set(
-                    alloc.resource_provider.uuid for alloc in alloc_list)
-            seen_rps = {}
-            for rp_uuid in alloc_rp_uuids:
-                seen_rps[rp_uuid] = rp_obj.ResourceProvider.get_by_uuid(
-                        context, rp_uuid)
-            for alloc in alloc_list:
-                rp_uuid = alloc.resource_provider.uuid
-                alloc.resource_provider = seen_rps[rp_uuid]
+            _reload_providers(context, alloc_list)
     else:
         # We ran out of retries so we need to raise again.
         # The log will automatically have request id info associated with
@@ -501,6 +829,81 @@ def replace_all(context, alloc_list):
         raise exception.ResourceProviderConcurrentUpdateDetected()
 
 
+def replace_all(context, alloc_list):
+    """Replace the supplied allocations.
+
+    If CONF.placement.combine_allocation_writes is True, and the caller is not
+    already inside a transaction, the write is queued with the process's
+    ClaimCoordinator and may be combined with concurrent writes.
+
+    :note: This method always deletes all allocations for all consumers
+           referenced in the list of Allocation objects and then replaces
+           the consumer's allocations with the Allocation objects. In doing
+           so, it will end up setting the Allocation.id attribute of each
+           Allocation object.
+    """
+    # A caller that already has a transaction open expects the write to be a
+    # part of it, so it cannot be handed to the combiner.
+    if (context.config.placement.combine_allocation_writes and
+            not db_api.in_transaction(context)):
+        _CLAIM_COORDINATOR.submit(context, alloc_list)
+    else:
+        _replace_all(context, alloc_list)
+
+
+def claim_first_available(context, candidates):
+    """Write the first of a sequence of candidate allocation lists that can
+    be satisfied, and return it.
+
+    Each candidate is a list of Allocation objects for a single consumer, as
+    built from one allocation request. The resource providers are reloaded
+    before each attempt so that the generation check uses current values.
+
+    Each attempt is made in its own writer transaction by _set_allocations(),
+    so a failed attempt is rolled back completely before the next candidate is
+    tried; the graph database offers no savepoints with which to undo a single
+    attempt inside a larger transaction.
+
+    :param context: The placement context.
+    :param candidates: An iterable of lists of Allocation objects, in order of
+                       preference.
+    :returns: The list of Allocation objects that was written, or None if
+              `candidates` is empty.
+    :raises `exception.InvalidInventory`,
+            `exception.ResourceProviderConcurrentUpdateDetected` or
+            `exception.NotFound`: the failure from the last attempt, if no
+            candidate could be written.
+    :raises `exception.ConcurrentUpdateDetected` if the consumer generation
+            changed; this is not retried since every candidate shares the same
+            consumer.
+    """
+    last_exc = None
+    for attempt, alloc_list in enumerate(candidates):
+        if attempt >= CLAIM_ATTEMPT_COUNT:
+            LOG.warning("Exceeded attempt limit of %d on claiming allocation "
+                        "candidates", CLAIM_ATTEMPT_COUNT)
+            break
+        try:
+            # A provider deleted since the candidates were computed raises
+            # NotFound here, which simply rules out this candidate.
+            _reload_providers(context, alloc_list)
+            _CLAIM_COORDINATOR.stats.incr('writes')
+            _set_allocations(context, alloc_list)
+            return alloc_list
+        except (exception.NotFound,
+                exception.InvalidAllocationCapacityExceeded,
+                exception.InvalidAllocationConstraintsViolated,
+                exception.ResourceProviderConcurrentUpdateDetected) as exc:
+            if isinstance(
+                    exc, exception.ResourceProviderConcurrentUpdateDetected):
+                _CLAIM_COORDINATOR.stats.incr('rp_conflicts')
+            LOG.debug("Allocation candidate could not be claimed, trying the "
+                      "next one: %s", exc)
+            last_exc = exc
+    if last_exc is not None:
+        raise last_exc
+
+
 def delete_all(context, alloc_list):
     consumer_uuids = set(alloc.consumer.uuid for alloc in alloc_list)
     for consumer_uuid in consumer_uuids:
@@ -12,6 +12,7 @@
 
 import collections
 import copy
+import heapq
 import itertools
 import random
 
@@ -27,6 +28,7 @@ from placement.objects import research_context as res_ctx
 from placement.objects import resource_provider as rp_obj
 from placement.objects import trait as trait_obj
 from placement import resource_class_cache as rc_cache
+from placement.schemas import allocation_candidate as ac_schema
 
 
 LOG = logging.getLogger(__name__)
@@ -50,7 +52,7 @@ class AllocationCandidates(object):
 
     @classmethod
     def get_by_requests(cls, context, requests, limit=None, group_policy=None,
-                        nested_aware=True):
+                        nested_aware=True, sort=None):
         """Returns an AllocationCandidates object containing all resource
         providers matching a set of supplied resource constraints, with a set
         of allocation requests constructed from that list of resource
@@ -76,13 +78,18 @@ class AllocationCandidates(object):
         :param nested_aware: If False, we are blind to nested architecture and
                              can't pick resources from multiple providers even
                              if they come from the same tree.
+        :param sort: One of ac_schema.SORT_OPTIONS, or None. When supplied,
+                     the allocation requests are ordered by the matching
+                     weigher and, if `limit` is also supplied, only the best
+                     N are returned. This takes precedence over
+                     CONF.placement.randomize_allocation_candidates.
         :return: An instance of AllocationCandidates with allocation_requests
                  and provider_summaries satisfying `requests`, limited
                  according to `limit`.
         """
         alloc_reqs, provider_summaries = cls._get_by_requests(
             context, requests, limit=limit, group_policy=group_policy,
-            nested_aware=nested_aware)
+            nested_aware=nested_aware, sort=sort)
         return cls(
             allocation_requests=alloc_reqs,
             provider_summaries=provider_summaries,
@@ -128,7 +135,7 @@ class AllocationCandidates(object):
     @classmethod
     @db_api.placement_context_manager.reader
     def _get_by_requests(cls, context, requests, limit=None,
-                         group_policy=None, nested_aware=True):
+                         group_policy=None, nested_aware=True, sort=None):
         has_trees = res_ctx.has_provider_trees(context)
         sharing = res_ctx.get_sharing_providers(context)
 
@@ -167,16 +174,23 @@ class AllocationCandidates(object):
                 alloc_request_objs, summary_objs)
 
         return cls._limit_results(context, alloc_request_objs, summary_objs,
-                                  limit)
+                                  limit, sort=sort)
 
     @staticmethod
-    def _limit_results(context, alloc_request_objs, summary_objs, limit):
+    def _limit_results(context, alloc_request_objs, summary_objs, limit,
+                       sort=None):
         # Limit the number of allocation request objects. We do this after
         # creating all of them so that we can do a random slice without
         # needing to mess with the complex sql above or add additional
         # columns to the DB.
         if limit and limit < len(alloc_request_objs):
-            if context.config.placement.randomize_allocation_candidates:
+            if sort:
+                # Heap-based selection of the best N by the chosen weigher,
+                # so we never fully sort a large candidate list.
+                alloc_request_objs = _sort_allocation_requests(
+                    context, alloc_request_objs, summary_objs, sort,
+                    limit=limit)
+            elif context.config.placement.randomize_allocation_candidates:
                 alloc_request_objs = random.sample(alloc_request_objs, limit)
             else:
                 alloc_request_objs = alloc_request_objs[:limit]
@@ -198,6 +212,9 @@ class AllocationCandidates(object):
             LOG.debug('Limiting results yields %d allocation requests and '
                       '%d provider summaries', len(alloc_request_objs),
                       len(summary_objs))
+        elif sort:
+            alloc_request_objs = _sort_allocation_requests(
+                context, alloc_request_objs, summary_objs, sort)
         elif context.config.placement.randomize_allocation_candidates:
             random.shuffle(alloc_request_objs)
 
@@ -631,7 +648,7 @@ def _get_usages_by_provider_tree(context, root_uuids):
                 inv.max_unit AS max_unit,
                 sum(usages.amount) AS used
     """ % list(root_uuids)
-    result = context.tx.run(query).data()
+    result = db_api.run_cached(context, query)
     return result
 
 
@@ -799,6 +816,86 @@ def _merge_candidates(candidates, group_policy=None):
     return list(areqs), psums
 
 
+def _get_tree_sizes(context, root_uuids):
+    """Returns a dict, keyed by root provider UUID, of the number of providers
+    in each of the trees indicated in ``root_uuids``.
+    """
+    query = """
+            MATCH (root:RESOURCE_PROVIDER)-[:CONTAINS*0..]->(rp)
+            WHERE root.uuid IN {root_uuids}
+            RETURN root.uuid AS root_uuid, count(rp) AS tree_size
+    """
+    result = db_api.run_cached(context, query, root_uuids=list(root_uuids))
+    return {rec["root_uuid"]: rec["tree_size"] for rec in result}
+
+
+def _free_capacity_ratio(areq, psum_res_by_rp_rc):
+    """Returns the mean, across the resource classes requested in ``areq``, of
+    the fraction of each provider's capacity that would remain free if the
+    allocation request were claimed. Normalizing per resource class keeps a
+    large absolute amount of one class (say, MEMORY_MB) from swamping the
+    others.
+    """
+    ratios = []
+    for arr in areq.resource_requests:
+        psum_res = psum_res_by_rp_rc.get(
+            _rp_rc_key(arr.resource_provider, arr.resource_class))
+        if psum_res is None or not psum_res.capacity:
+            continue
+        free = psum_res.capacity - psum_res.used - arr.amount
+        ratios.append(float(free) / psum_res.capacity)
+    if not ratios:
+        return 0.0
+    return sum(ratios) / len(ratios)
+
+
+def _sort_allocation_requests(context, areqs, psums, sort, limit=None):
+    """Orders a list of AllocationRequest objects by the weigher named in
+    ``sort``, using the usage information already gathered in the provider
+    summaries.
+
+    When ``limit`` is supplied, only the best ``limit`` allocation requests are
+    returned, selected with a bounded heap rather than a full sort.
+
+    :param context: placement.context.RequestContext object
+    :param areqs: A list of AllocationRequest objects.
+    :param psums: A list of ProviderSummary objects for the providers in
+                  ``areqs``.
+    :param sort: One of ac_schema.SORT_OPTIONS.
+    :param limit: An optional integer maximum number of results.
+    """
+    psum_res_by_rp_rc = {}
+    for psum in psums:
+        for psum_res in psum.resources:
+            key = _rp_rc_key(psum.resource_provider, psum_res.resource_class)
+            psum_res_by_rp_rc[key] = psum_res
+
+    tree_sizes = {}
+    if sort in (ac_schema.SORT_PACK_TREE, ac_schema.SORT_SPREAD_TREE):
+        root_uuids = set(areq.anchor_root_provider_uuid for areq in areqs)
+        root_uuids.discard(None)
+        if root_uuids:
+            tree_sizes = _get_tree_sizes(context, root_uuids)
+
+    def _key(areq):
+        free = _free_capacity_ratio(areq, psum_res_by_rp_rc)
+        tree_size = tree_sizes.get(areq.anchor_root_provider_uuid, 1)
+        if sort == ac_schema.SORT_PACK:
+            return free
+        if sort == ac_schema.SORT_SPREAD:
+            return -free
+        # The tree weighers fall back on free capacity to break ties.
+        if sort == ac_schema.SORT_PACK_TREE:
+            return -tree_size, free
+        return tree_size, -free
+
+    # Both heapq.nsmallest() and sorted() are stable, so candidates with the
+    # same weight keep the order in which they were found.
+    if limit:
+        return heapq.nsmallest(limit, areqs, key=_key)
+    return sorted(areqs, key=_key)
+
+
 def _rp_rc_key(rp, rc):
     """Creates hashable key unique to a provider + resource class."""
     return rp.uuid, rc
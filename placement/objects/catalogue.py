@@ -0,0 +1,95 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Synchronization of the standard catalogues, the os-traits and
+os-resource-classes libraries, to the graph.
+
+Each catalogue has a CATALOGUE_VERSION node holding a stamp of the names it
+was last synchronized with. Every placement process synchronizes the
+catalogues when it starts, but while the installed libraries are unchanged
+that only reads the stamp. Otherwise the first process to take the write lock
+on the CATALOGUE_VERSION node creates the missing nodes with a single
+statement, and the others find the new stamp once it has committed.
+"""
+
+import hashlib
+
+from oslo_log import log as logging
+
+from placement import db_api
+
+LOG = logging.getLogger(__name__)
+
+_STAMP_QUERY = """
+        OPTIONAL MATCH (c:CATALOGUE_VERSION {name: {name}})
+        RETURN c.stamp AS stamp
+"""
+
+# Setting a property takes the write lock on the node, which is held until
+# the transaction commits.
+_LOCK_QUERY = """
+        MERGE (c:CATALOGUE_VERSION {name: {name}})
+        SET c.locked_at = timestamp()
+        RETURN c.stamp AS stamp
+"""
+
+_MERGE_QUERY = """
+        UNWIND {names} AS name
+        OPTIONAL MATCH (existing:%(label)s {name: name})
+        WITH name, existing
+        MERGE (node:%(label)s {name: name})
+        ON CREATE SET node.created_at = timestamp(),
+            node.updated_at = timestamp()
+        RETURN count(existing) AS existing
+"""
+
+_SET_STAMP_QUERY = """
+        MATCH (c:CATALOGUE_VERSION {name: {name}})
+        SET c.stamp = {stamp}, c.synced_at = timestamp()
+"""
+
+
+def stamp(names):
+    """Returns a string that identifies the supplied set of names."""
+    return hashlib.sha256(
+        "\n".join(sorted(names)).encode("utf-8")).hexdigest()
+
+
+@db_api.placement_context_manager.reader
+def _get_stamp(ctx, name):
+    return ctx.tx.run(_STAMP_QUERY, name=name).data()[0]["stamp"]
+
+
+@db_api.placement_context_manager.writer
+def sync(ctx, name, label, names):
+    """Ensures that there is a node with the supplied label for each of the
+    supplied names.
+
+    :param name: the name of the catalogue, such as "os_traits".
+    :param label: the label of the nodes, such as "TRAIT".
+    :param names: the names in the catalogue.
+    :returns: the number of nodes created.
+    """
+    names = list(names)
+    want = stamp(names)
+    if _get_stamp(ctx, name) == want:
+        return 0
+    # Another process may have synchronized the catalogue while this one
+    # waited for the lock.
+    if ctx.tx.run(_LOCK_QUERY, name=name).data()[0]["stamp"] == want:
+        return 0
+    result = ctx.tx.run(_MERGE_QUERY % {"label": label}, names=names).data()
+    created = len(names) - result[0]["existing"]
+    ctx.tx.run(_SET_STAMP_QUERY, name=name, stamp=want)
+    LOG.debug("Synchronized %(name)s, creating %(created)d of %(count)d "
+              "%(label)s nodes", {"name": name, "created": created,
+                                  "count": len(names), "label": label})
+    return created
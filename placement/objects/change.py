@@ -0,0 +1,201 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""The log of changes to resource providers and consumers, which clients read
+with GET /changes to keep their copies up to date.
+
+Each change is a CHANGE node that names the resource that changed, the kind
+of change and, where it is known, the new generation of the resource. It is
+numbered from a single CHANGE_SEQUENCE node that is incremented in the same
+transaction as the change. The write lock on that node is held until the
+transaction commits, so the changes become visible in sequence order.
+
+Writing transactions therefore take turns at the sequence, but only for the
+moment it takes to commit: the changes are written as the last step of the
+transaction, after the rest of its work is done.
+"""
+
+import functools
+
+from placement.db import graph_db as db
+from placement import db_api
+from placement import exception
+
+RESOURCE_PROVIDER = "resource_provider"
+CONSUMER = "consumer"
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+INVENTORIES = "inventories"
+TRAITS = "traits"
+AGGREGATES = "aggregates"
+ALLOCATIONS = "allocations"
+
+# The sequence node is created by ensure_sequence() when each process starts,
+# under a uniqueness constraint on its name, so that there is only ever one.
+_CREATE_SEQUENCE_QUERY = """
+        MERGE (seq:CHANGE_SEQUENCE {name: 'changes'})
+        ON CREATE SET seq.value = 0, seq.horizon = 0
+"""
+
+_RECORD_CHANGES_QUERY = """
+        MATCH (seq:CHANGE_SEQUENCE {name: 'changes'})
+        WITH seq, seq.value AS start
+        SET seq.value = start + size({changes})
+        WITH start
+        UNWIND range(0, size({changes}) - 1) AS i
+        CREATE (c:CHANGE)
+        SET c = {changes}[i], c.sequence = start + i + 1,
+            c.created_at = timestamp()
+"""
+
+_SEQUENCE_QUERY = """
+        OPTIONAL MATCH (seq:CHANGE_SEQUENCE {name: 'changes'})
+        RETURN coalesce(seq.value, 0) AS last,
+            coalesce(seq.horizon, 0) AS horizon
+"""
+
+# Only the latest change of each kind to each resource is returned, since
+# the earlier ones tell a client nothing more.
+_CHANGES_QUERY = """
+        MATCH (c:CHANGE)
+        WHERE c.sequence > {since} AND c.sequence <= {last}
+        WITH c
+        ORDER BY c.sequence DESC
+        WITH c.resource_type AS resource_type, c.uuid AS uuid,
+            c.event AS event, collect(c)[0] AS latest
+        RETURN properties(latest) AS change
+        ORDER BY latest.sequence
+"""
+
+_DELETE_SUPERSEDED_QUERY = """
+        MATCH (c:CHANGE)
+        WITH c
+        ORDER BY c.sequence DESC
+        WITH c.resource_type AS resource_type, c.uuid AS uuid,
+            c.event AS event, collect(c) AS changes
+        UNWIND changes[1..] AS superseded
+        DELETE superseded
+        RETURN count(*) AS deleted
+"""
+
+_DELETE_EXPIRED_QUERY = """
+        MATCH (seq:CHANGE_SEQUENCE {name: 'changes'})
+        OPTIONAL MATCH (c:CHANGE)
+        WHERE c.created_at < timestamp() - {max_age}
+        WITH seq, collect(c) AS expired, max(c.sequence) AS newest
+        FOREACH (c IN expired | DELETE c)
+        SET seq.horizon = CASE WHEN newest > seq.horizon THEN newest
+            ELSE seq.horizon END
+        RETURN size(expired) AS deleted
+"""
+
+
+def _format(change):
+    return {"sequence": change["sequence"],
+            "resource_type": change["resource_type"],
+            "uuid": change["uuid"],
+            "event": change["event"],
+            "generation": change.get("generation")}
+
+
+def ensure_sequence(ctx):
+    """Creates the CHANGE_SEQUENCE node and the uniqueness constraint that
+    keeps it single, unless they exist already, as deploy.update_database()
+    does when each process starts.
+
+    The changes are indexed too, by the uniqueness constraint on their
+    sequence numbers and by an index on the time they were made, so that
+    GET /changes reads only the changes after the client's sequence number,
+    and expired changes are found without reading the rest.
+    """
+    db.ensure_uniqueness_constraint("CHANGE_SEQUENCE", "name")
+    db.ensure_uniqueness_constraint("CHANGE", "sequence")
+    db.ensure_index("CHANGE", "created_at")
+    _create_sequence(ctx)
+
+
+@db_api.placement_context_manager.writer
+def _create_sequence(ctx):
+    ctx.tx.run(_CREATE_SEQUENCE_QUERY)
+
+
+def _write(ctx, rows):
+    ctx.tx.run(_RECORD_CHANGES_QUERY, changes=rows)
+
+
+@db_api.placement_context_manager.writer
+def record(ctx, changes):
+    """Adds changes to the log, in the transaction of the write that made
+    them. They are written just before that transaction commits, so that it
+    holds the lock on the sequence for as short a time as possible.
+
+    :param changes: a list of (resource_type, uuid, event, generation) tuples.
+                    The generation is the one the resource has after the
+                    change, or None if it is not known.
+    """
+    if not changes:
+        return
+    rows = [{"resource_type": resource_type, "uuid": uuid, "event": event,
+             "generation": generation}
+            for resource_type, uuid, event, generation in changes]
+    db_api.before_commit(ctx, functools.partial(_write, ctx, rows))
+
+
+@db_api.placement_context_manager.reader
+def get_since(ctx, since=None, limit=None):
+    """Returns a tuple of the changes made after sequence number `since`, in
+    sequence order, and the sequence number to ask for changes after next.
+
+    Each change is a dict with the keys `sequence`, `resource_type`, `uuid`,
+    `event` and `generation`. If `since` is None, no changes are returned,
+    only the latest sequence number, which is where a client that has just
+    read everything should start.
+
+    :param limit: if supplied, at most this many changes are returned.
+    :raises: `exception.ChangesExpired` if some of the changes after `since`
+             have been discarded by compact().
+    """
+    result = ctx.tx.run(_SEQUENCE_QUERY).data()[0]
+    last = result["last"]
+    if since is None:
+        return [], last
+    if since < result["horizon"]:
+        raise exception.ChangesExpired(since=since, horizon=result["horizon"])
+    # Changes numbered up to the sequence read above are all committed, since
+    # the sequence could not have been read while one of them was pending.
+    query = _CHANGES_QUERY
+    if limit:
+        query += "LIMIT {limit}"
+    changes = [_format(rec["change"])
+               for rec in ctx.tx.run(query, since=since, last=last,
+                                     limit=limit).data()]
+    if limit and len(changes) == limit:
+        last = changes[-1]["sequence"]
+    return changes, last
+
+
+@db_api.placement_context_manager.writer
+def compact(ctx, max_age):
+    """Discards the changes that have been superseded by a later change of the
+    same kind to the same resource, which is done without loss, and those
+    older than `max_age` seconds, after which clients asking for changes from
+    before the newest of them have to read everything again.
+
+    :returns: a tuple of the number of superseded and of expired changes
+              discarded.
+    """
+    result = ctx.tx.run(_DELETE_SUPERSEDED_QUERY).data()
+    superseded = result[0]["deleted"] if result else 0
+    result = ctx.tx.run(_DELETE_EXPIRED_QUERY, max_age=max_age * 1000).data()
+    expired = result[0]["deleted"] if result else 0
+    return superseded, expired
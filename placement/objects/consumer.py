@@ -16,7 +16,9 @@ from oslo_utils import timeutils
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import change as change_obj
 from placement.objects import project as project_obj
+from placement.objects import usage as usage_obj
 from placement.objects import user as user_obj
 
 
@@ -98,6 +100,30 @@ def _get_consumer_by_uuid(ctx, uuid):
     }
 
 
+@db_api.placement_context_manager.reader
+def get_version(ctx, uuid):
+    """Returns a list of values that changes whenever the allocations of the
+    consumer with the supplied UUID, as shown with the generations of their
+    resource providers, change, without loading them. Returns None if there
+    is no such consumer.
+
+    Writing allocations changes the generation of the consumer, and deleting
+    them removes their resource providers from the list.
+    """
+    query = """
+            MATCH (cs:CONSUMER {uuid: {uuid}})
+            OPTIONAL MATCH (cs)-[:USES]->()<-[:PROVIDES]-(rp:RESOURCE_PROVIDER)
+            WITH cs, rp
+            ORDER BY rp.uuid
+            WITH cs, collect(DISTINCT [rp.uuid, rp.generation]) AS providers
+            RETURN [cs.generation, providers] AS version
+    """
+    result = ctx.tx.run(query, uuid=uuid).data()
+    if not result:
+        return None
+    return result[0]["version"]
+
+
 @db_api.placement_context_manager.writer
 def _delete_consumer(ctx, consumer):
     """Deletes the supplied consumer. If the consumer has any allocations
@@ -107,11 +133,14 @@ def _delete_consumer(ctx, consumer):
                 Session
     :param consumer: `Consumer` whose generation should be updated.
     """
+    usage_obj.release_allocations(ctx, [consumer.uuid])
     query = """
             MATCH (cs:CONSUMER {uuid: '%s'})
             DETACH DELETE cs
     """ % consumer.uuid
     ctx.tx.run(query)
+    change_obj.record(ctx, [(change_obj.CONSUMER, consumer.uuid,
+                             change_obj.DELETED, None)])
 
 
 @db_api.placement_context_manager.writer
@@ -168,6 +197,101 @@ def relate_project_and_user(ctx, project_uuid, user_uuid, consumer_uuid):
     ctx.tx.run(query).data()
 
 
+# Ensures, for each record, that the project, user and consumer exist and are
+# related as (project)-[:OWNS]->(user)-[:OWNS]->(consumer), removing any
+# ownership relationships that do not match. A consumer created here is
+# flagged so that the statement can report it, and the flag is removed again
+# before the statement completes.
+_ENSURE_CONSUMERS_QUERY = """
+        UNWIND {records} AS rec
+        MERGE (pj:PROJECT {uuid: rec.project_uuid})
+        ON CREATE SET pj.created_at = timestamp(),
+            pj.updated_at = timestamp()
+        MERGE (us:USER {uuid: rec.user_uuid})
+        ON CREATE SET us.created_at = timestamp(),
+            us.updated_at = timestamp()
+        MERGE (cs:CONSUMER {uuid: rec.consumer_uuid})
+        ON CREATE SET cs.generation = 0, cs.created_at = timestamp(),
+            cs.updated_at = timestamp(), cs.placement_new = true
+        WITH rec, pj, us, cs, cs.placement_new IS NOT NULL AS created
+        REMOVE cs.placement_new
+        WITH rec, pj, us, cs, created
+        OPTIONAL MATCH (other_us:USER)-[cs_owner:OWNS]->(cs)
+        WHERE other_us.uuid <> rec.user_uuid
+        DELETE cs_owner
+        WITH DISTINCT rec, pj, us, cs, created
+        OPTIONAL MATCH (other_pj:PROJECT)-[us_owner:OWNS]->(us)
+        WHERE other_pj.uuid <> rec.project_uuid
+        DELETE us_owner
+        WITH DISTINCT rec, pj, us, cs, created
+        MERGE (pj)-[:OWNS]->(us)
+        MERGE (us)-[:OWNS]->(cs)
+        RETURN cs.uuid AS uuid, cs.generation AS generation, created
+"""
+
+
+@db_api.placement_context_manager.writer
+def ensure_consumers(ctx, records, check_generations=False):
+    """Makes sure that the project, user and consumer in each of the supplied
+    records exist, creating any that are missing, and that each consumer is
+    owned by its user and each user by its project, all in one statement.
+
+    Ownership relationships that do not match the records are removed, so a
+    consumer moved to a different project or user is updated. The generation
+    of an existing consumer is not changed.
+
+    :param ctx: `placement.context.RequestContext` that contains an oslo_db
+                Session
+    :param records: list of dicts with keys `consumer_uuid`, `project_uuid`
+                    and `user_uuid`, and, when check_generations is True,
+                    `generation`: the generation the caller expects the
+                    consumer to have, or None if it expects the consumer not
+                    to exist.
+    :param check_generations: whether to compare the generation of each
+                              consumer with the one in its record.
+    :returns: a dict, keyed by consumer UUID, of tuples of the consumer's
+              generation and a boolean indicating whether it was created.
+    :raises: `exception.ConsumerGenerationConflict` if check_generations is
+             True and any consumer's generation does not match the expected
+             one. The transaction is rolled back, so nothing is created or
+             modified in that case.
+    """
+    result = ctx.tx.run(_ENSURE_CONSUMERS_QUERY, records=records).data()
+    ensured = {rec["uuid"]: (rec["generation"], rec["created"])
+               for rec in result}
+    if check_generations:
+        for rec in records:
+            generation, created = ensured[rec["consumer_uuid"]]
+            expected = None if created else generation
+            if rec["generation"] != expected:
+                raise exception.ConsumerGenerationConflict(
+                    expected_gen="null" if expected is None else expected,
+                    got_gen=rec["generation"])
+    return ensured
+
+
+def ensure_consumer(ctx, consumer_uuid, project_uuid, user_uuid,
+                    generation=None, check_generation=False):
+    """Makes sure that the supplied project, user and consumer exist and are
+    related, in a single statement. See ensure_consumers().
+
+    :returns: a tuple of the consumer's generation and a boolean indicating
+              whether it was created.
+    :raises: `exception.ConsumerGenerationConflict` if check_generation is
+             True and the consumer's generation does not match the supplied
+             one.
+    """
+    record = {
+        "consumer_uuid": consumer_uuid,
+        "project_uuid": project_uuid,
+        "user_uuid": user_uuid,
+        "generation": generation,
+    }
+    ensured = ensure_consumers(ctx, [record],
+                               check_generations=check_generation)
+    return ensured[consumer_uuid]
+
+
 class Consumer(object):
 
     def __init__(self, context, uuid=None, project=None, user=None,
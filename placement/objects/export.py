@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Streaming export of resource provider capacity information."""
+
+from placement import db_api
+from placement import trait_cache
+
+
+# The number of resource providers read by each statement of an export.
+EXPORT_PAGE_SIZE = 500
+
+INVENTORY_FIELDS = ("total", "reserved", "min_unit", "max_unit", "step_size",
+                    "allocation_ratio")
+
+
+def _export_query(resource_class=None, required_aggs=None,
+                  forbidden_aggs=None, in_tree=None, after_marker=False):
+    if in_tree:
+        query_lines = [
+            "MATCH (:RESOURCE_PROVIDER {uuid: {in_tree}})"
+            "<-[:CONTAINS*0..99]-(tree_root:RESOURCE_PROVIDER)",
+            "WHERE NOT ()-[:CONTAINS]->(tree_root)",
+            "MATCH (tree_root)-[:CONTAINS*0..99]->(rp:RESOURCE_PROVIDER)",
+        ]
+    else:
+        query_lines = ["MATCH (rp:RESOURCE_PROVIDER)"]
+    conditions = []
+    if resource_class:
+        conditions.append("ANY(rc IN [(rp)-[:PROVIDES]->(i) | labels(i)[0]] "
+                          "WHERE rc = {resource_class})")
+    if required_aggs:
+        # Each member of required_aggs is a list of aggregates, at least one
+        # of which the provider must be associated with.
+        conditions.append("ALL(aggs IN {required_aggs} WHERE "
+                          "ANY(agg IN [(rp)-[:ASSOCIATED]->(a) | a.uuid] "
+                          "WHERE agg IN aggs))")
+    if forbidden_aggs:
+        conditions.append("NONE(agg IN [(rp)-[:ASSOCIATED]->(a) | a.uuid] "
+                          "WHERE agg IN {forbidden_aggs})")
+    if after_marker:
+        conditions.append("rp.uuid > {marker}")
+    if conditions:
+        query_lines.append("WHERE %s" % " AND ".join(conditions))
+    # Only a page of providers is ordered and expanded, so the server does not
+    # have to build the whole export before returning the first one.
+    query_lines.append("WITH rp ORDER BY rp.uuid LIMIT {limit}")
+    query_lines.append("""
+            OPTIONAL MATCH (parent:RESOURCE_PROVIDER)-[:CONTAINS]->(rp)
+            OPTIONAL MATCH (root:RESOURCE_PROVIDER)-[:CONTAINS*0..99]->(rp)
+            WHERE NOT ()-[:CONTAINS]->(root)
+            WITH rp, parent, root
+            OPTIONAL MATCH (rp)-[:PROVIDES]->(inv)
+            OPTIONAL MATCH (inv)<-[u:USES]-(:CONSUMER)
+            WITH rp, parent, root, inv, sum(u.amount) AS used
+            WITH rp, parent, root, collect(CASE WHEN inv IS NULL THEN null ELSE
+                {resource_class: labels(inv)[0], inventory: properties(inv),
+                used: used} END) AS inventories
+            RETURN properties(rp) AS rp, parent.uuid AS parent_uuid,
+                root.uuid AS root_uuid, inventories,
+                [(rp)-[:ASSOCIATED]->(agg) | agg.uuid] AS aggregates
+            ORDER BY rp.uuid
+    """)
+    return "\n".join(query_lines)
+
+
+def _export_record(record, traits):
+    rp = record["rp"]
+    inventories = {}
+    usages = {}
+    for inv in record["inventories"]:
+        rc = inv["resource_class"]
+        inventories[rc] = {field: inv["inventory"].get(field)
+                           for field in INVENTORY_FIELDS}
+        usages[rc] = inv["used"]
+    return {
+        "uuid": rp["uuid"],
+        "name": rp.get("name"),
+        "generation": rp.get("generation"),
+        "parent_provider_uuid": record["parent_uuid"],
+        "root_provider_uuid": record["root_uuid"] or rp["uuid"],
+        "inventories": inventories,
+        "usages": usages,
+        "traits": sorted(traits),
+        "aggregates": sorted(record["aggregates"]),
+    }
+
+
+@db_api.placement_context_manager.reader
+def _get_page(context, query, **params):
+    return context.tx.run(query, **params).data()
+
+
+def iter_providers(context, resource_class=None, required_aggs=None,
+                   forbidden_aggs=None, in_tree=None,
+                   page_size=EXPORT_PAGE_SIZE):
+    """Yields a dict for each resource provider, in UUID order, with its
+    name, generation, parent and root providers, inventories, usages, traits
+    and aggregates.
+
+    The providers are read `page_size` at a time, each page by a single
+    statement starting after the last UUID of the previous page, so memory
+    use does not grow with the number of providers. All of the pages are
+    read in one transaction, which is rolled back when the generator is
+    exhausted or closed, however early the caller stops. Neo4j isolates
+    transactions at the read committed level and keeps no snapshots, so a
+    change committed while the export runs is seen by the pages read after
+    it.
+
+    The traits of each provider are told from its other properties by the
+    trait cache.
+
+    :param resource_class: if supplied, only providers with inventory of this
+                           resource class are included.
+    :param required_aggs: if supplied, a list of sets of aggregate UUIDs; only
+                          providers associated with at least one aggregate in
+                          each set are included.
+    :param forbidden_aggs: if supplied, providers associated with any of these
+                           aggregate UUIDs are excluded.
+    :param in_tree: if supplied, only providers in the same tree as the
+                    provider with this UUID are included.
+    :param page_size: the number of providers read by each statement.
+    """
+    filters = dict(resource_class=resource_class,
+                   required_aggs=required_aggs,
+                   forbidden_aggs=forbidden_aggs, in_tree=in_tree)
+    first_query = _export_query(**filters)
+    next_query = _export_query(after_marker=True, **filters)
+    params = dict(resource_class=resource_class,
+                  required_aggs=[list(aggs) for aggs in required_aggs or []],
+                  forbidden_aggs=list(forbidden_aggs or []),
+                  in_tree=in_tree, limit=page_size)
+    cache = trait_cache.ensure(context)
+    with db_api.read_transaction(context):
+        marker = None
+        while True:
+            query = first_query if marker is None else next_query
+            records = _get_page(context, query, marker=marker, **params)
+            for record in records:
+                # Traits are stored as properties of the provider node that
+                # are named for the trait.
+                traits = cache.traits_from_props(list(record["rp"]))
+                yield _export_record(record, traits)
+            if len(records) < page_size:
+                return
+            marker = records[-1]["rp"]["uuid"]
@@ -14,11 +14,11 @@
 import collections
 import os_traits
 from oslo_log import log as logging
-import sqlalchemy as sa
 
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import resource_class as rc_obj
 from placement.objects import rp_candidates
 from placement.objects import trait as trait_obj
 from placement import resource_class_cache as rc_cache
@@ -64,6 +64,10 @@ class RequestGroupSearchContext(object):
         # TODO(tetsuro): split this into smaller functions reordering
         self.context = context
 
+        # The statements run for the group share the request's memoized
+        # results, although they are run in a transaction of their own.
+        self.query_cache = getattr(context, "query_cache", None)
+
         # A dict, keyed by resource class internal ID, of the amounts of that
         # resource class being requested by the group.
         self.resources = request.resources
@@ -176,7 +180,7 @@ def provider_uuids_from_rp_uuids(ctx, rp_uuids):
         ORDER BY uuid, parent_uuid, root_uuid
         RETURN uuid, parent_uuid, root_uuid
     """.format(rp_uuids=util.makelist(rp_uuids))
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return {rec["uuid"]: ProviderIds(**rec) for rec in result}
 
 
@@ -193,31 +197,17 @@ def provider_uuids_from_uuid(ctx, uuid):
     return provider_uuids_from_rp_uuids(ctx, [uuid]).get(uuid)
 
 
-@db_api.placement_context_manager.reader
 def validate_resources(ctx, rc_names):
     """Ensure that all the resource classes requested are valid."""
-    query = """
-            MATCH (rc:RESOURCE_CLASS)
-            RETURN DISTINCT rc.name AS rc_name
-    """
-    result = ctx.tx.run(query).data()
-    valid_names = set([rec["rc_name"] for rec in result])
-    invalid_rc_names = set(rc_names) - valid_names
+    invalid_rc_names = rc_obj.unknown_names(ctx, rc_names)
     if invalid_rc_names:
         resource_class = ",".join(invalid_rc_names)
         raise exception.ResourceClassNotFound(resource_class)
 
 
-@db_api.placement_context_manager.reader
 def validate_traits(ctx, traits):
     """Ensure that all the traits requested are valid."""
-    query = """
-            MATCH (t:TRAIT)
-            RETURN DISTINCT t.name AS trait
-    """
-    result = ctx.tx.run(query).data()
-    valid_names = set([rec["trait"] for rec in result])
-    invalid_names = set(traits) - valid_names
+    invalid_names = trait_obj.unknown_names(ctx, traits)
     if invalid_names:
         trait_names = ",".join(invalid_names)
         raise exception.TraitNotFound(trait_names)
@@ -256,7 +246,7 @@ def get_providers_with_resource(ctx, rc_name, amount, tree_root_uuid=None):
             AND numrel IS null
             RETURN rp.uuid AS rp_uuid, root.uuid AS root_uuid
     """.format(rt=tree_root_clause, rc_name=rc_name, amount=amount)
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return set((rec["rp_uuid"], rec["root_uuid"]) for rec in result)
 
 
@@ -308,7 +298,7 @@ def get_provider_uuids_matching(rg_ctx):
         parts.append( QUERY_TEMPLATE.format(num=num, rc_name=rc_name,
                 amount=amount))
     query = "\nUNION\n".join(parts)
-    result = rg_ctx.tx.run(query).data()
+    result = db_api.run_cached(rg_ctx, query)
     # There will be a record for each (rp, root) that satisfies each requested
     # resource. Only keep those where the root appears for all the resources.
     provs_with_resource = set([(rec["rp_uuid"], rec["root_uuid"]) for rec in result])
@@ -511,7 +501,7 @@ def _get_trees_with_traits(ctx, rp_uuids, required_traits, forbidden_traits):
             RETURN rp.uuid AS rp_uuid, root.uuid AS root_uuid
             ORDER BY rp_uuid, root_uuid
     """.format(rp_uuids=util.makelist(rp_uuids), trait_clause=trait_clause)
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return [(rec["rp_uuid"], rec["root_uuid"]) for rec in result]
 
 
@@ -552,7 +542,7 @@ def provider_ids_matching_aggregates(ctx, member_of, rp_uuids=None):
             {agg_clause}
             RETURN rp.uuid AS rp_uuid
     """.format(rp_clause=rp_clause, agg_clause=agg_clause)
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return set([rec["rp_uuid"] for rec in result])
 
 
@@ -567,7 +557,7 @@ def _filter_rps_by_traits(ctx, traits, any_or_all):
         WHERE %s
         RETURN rp.uuid AS rp_uuid
     """ % trait_str
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return set([rec["rp_uuid"] for rec in result])
 
 
@@ -720,7 +710,7 @@ def anchors_for_sharing_providers(ctx, rp_uuids):
             WHERE shared.uuid IN {rp_uuids}
             RETURN shared.uuid as s_uuid, anchor.uuid AS a_uuid 
     """.format(rp_uuids=util.makelist(rp_uuids))
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return set((rec["s_uuid"], rec["a_uuid"]) for rec in result)
 
 
@@ -738,5 +728,5 @@ def has_provider_trees(ctx):
             MATCH p=()-[:CONTAINS]->()
             RETURN sum(size(relationships(p))) AS nest_count
     """
-    result = ctx.tx.run(query).data()
+    result = db_api.run_cached(ctx, query)
     return result[0]["nest_count"] > 0
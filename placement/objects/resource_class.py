@@ -22,6 +22,7 @@ import six
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import catalogue
 from placement import resource_class_cache as rc_cache
 
 _RESOURCE_CLASSES_LOCK = 'resource_classes_sync'
@@ -58,7 +59,6 @@ class ResourceClass(object):
         return target
 
     @classmethod
-    @db_api.placement_context_manager.reader
     def get_by_name(cls, context, name):
         """Return a ResourceClass object with the given string name.
 
@@ -66,17 +66,9 @@ class ResourceClass(object):
 
         :raises: ResourceClassNotFound if no such resource class was found
         """
-        query = """
-                MATCH (rc:RESOURCE_CLASS {name: '%s'})
-                RETURN rc
-        """ % name
-        result = context.tx.run(query).data()
-        if not result:
-            raise exception.ResourceClassNotFound(resource_class=name)
-        rec = db.pythonize(result[0])
-        obj = cls(context, name=name, updated_at=rec.get("updated_at"),
-                created_at=rec.get("created_at"))
-        return obj
+        rec = rc_cache.ensure(context).all_from_string(name)
+        return cls(context, name=name, updated_at=rec["updated_at"],
+                   created_at=rec["created_at"])
 
     @staticmethod
     @db_api.placement_context_manager.reader
@@ -115,6 +107,7 @@ class ResourceClass(object):
             try:
                 rc = self._create_in_db(self._context, updates)
                 self._from_db_object(self._context, self, rc)
+                clear_known_names()
                 break
             except db_exc.DBDuplicateEntry as e:
                 # The duplication is on the other unique column, "name". So do
@@ -145,6 +138,7 @@ class ResourceClass(object):
             result = context.tx.run(query).data()
         except db.ClientError:
             raise db_exc.DBDuplicateEntry()
+        rc_cache.bump_version(context)
         return result[0]["rc"]
 
     def destroy(self):
@@ -153,6 +147,7 @@ class ResourceClass(object):
             raise exception.ResourceClassCannotDeleteStandard(
                     resource_class=self.name)
         self._destroy(self._context, self.name)
+        clear_known_names()
 
     @staticmethod
     @db_api.placement_context_manager.writer
@@ -174,6 +169,7 @@ class ResourceClass(object):
                 DELETE rc
         """ % name
         result = context.tx.run(query).data()
+        rc_cache.bump_version(context)
 
     def save(self):
         # Never update any standard resource class.
@@ -186,6 +182,7 @@ class ResourceClass(object):
             if value:
                 updates[field] = value
         self._save(self._context, self.name, updates)
+        clear_known_names()
 
     @staticmethod
     @db_api.placement_context_manager.writer
@@ -202,6 +199,23 @@ class ResourceClass(object):
             result = context.tx.run(query).data()
         except db.ClientError:
             raise exception.ResourceClassExists(resource_class=name)
+        rc_cache.bump_version(context)
+
+
+def clear_known_names():
+    """Clears this process's resource class cache after a change to the
+    resource classes.
+    """
+    if rc_cache.RC_CACHE is not None:
+        rc_cache.RC_CACHE.clear()
+
+
+def unknown_names(ctx, names):
+    """Returns the set of the supplied resource class names that do not exist.
+    The database is only read when some name is not in the resource class
+    cache, or the cache is due to be checked.
+    """
+    return rc_cache.ensure(ctx).unknown_names(names)
 
 
 def ensure_sync(ctx):
@@ -215,46 +229,22 @@ def ensure_sync(ctx):
             _RESOURCE_CLASSES_SYNCED = True
 
 
-@db_api.placement_context_manager.reader
 def get_all(context):
-    """Get a list of all the resource classes in the database."""
-    query = """
-            MATCH (rc:RESOURCE_CLASS)
-            RETURN rc
-    """
-    result = context.tx.run(query).data()
-    result_objs = [db.pythonize(rec["rc"]) for rec in result]
-    return [ResourceClass(context, **obj) for obj in result_objs]
+    """Get a list of all the resource classes, in name order."""
+    return [ResourceClass(context, name=rec["name"],
+                          updated_at=rec["updated_at"],
+                          created_at=rec["created_at"])
+            for rec in sorted(rc_cache.ensure(context).get_all(),
+                              key=lambda rec: rec["name"])]
 
 
 @db_api.placement_context_manager.writer
 def _resource_classes_sync(context):
-    # Create a set of all resource class in the os_resource_classes library.
-
-    query = """
-            MATCH (rc:RESOURCE_CLASS)
-            RETURN rc.name AS name
+    """Creates the resource classes in the os_resource_classes library that
+    are not in the database with a single statement. This is skipped by all
+    but one process after the library has changed; see
+    `placement.objects.catalogue`.
     """
-    result = context.tx.run(query).data()
-    db_std_classes = []
-    if result:
-        db_std_classes = [res["name"] for res in result
-                if not orc.is_custom(res["name"])]
-    LOG.debug("Found existing resource classes in db: %s", db_std_classes)
-    # Determine those resource clases which are in os_resource_classes but not
-    # currently in the database, and insert them.
-    missing_rc_names = [name for name in orc.STANDARDS
-            if name not in db_std_classes]
-    for rc_name in missing_rc_names:
-        query = """
-                MERGE (rc:RESOURCE_CLASS {name: '%s', created_at: timestamp(),
-                    updated_at: timestamp()})
-        """ % rc_name
-        try:
-            result = context.tx.run(query).data()
-        except db.ClientError:
-            pass  # some other process sync'd, just ignore
-        except db.TransientError as e:
-            LOG.error("Transient errror creating Resource Class '%s': %s" %
-                    (rc_name, e))
-                
+    if catalogue.sync(context, "os_resource_classes", "RESOURCE_CLASS",
+                      orc.STANDARDS):
+        rc_cache.bump_version(context)
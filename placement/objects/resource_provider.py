@@ -28,15 +28,38 @@ import six
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import change as change_obj
 from placement.objects import inventory as inv_obj
 from placement.objects import research_context as res_ctx
+from placement.objects import resource_class as rc_obj
 from placement.objects import trait as trait_obj
 from placement import resource_class_cache as rc_cache
+from placement import stats
 from placement import util
 
 
 LOG = logging.getLogger(__name__)
 
+# The number of writes of inventory, traits and aggregates that were skipped
+# because they would not have changed what is stored, keyed by the kind of
+# write. These are counted per process.
+SKIPPED_WRITES = stats.Counters('Skipped write')
+
+
+def _record_change(ctx, rp, event):
+    """Adds a change of the supplied kind to the provider, with its current
+    generation, to the change log.
+    """
+    change_obj.record(ctx, [(change_obj.RESOURCE_PROVIDER, rp.uuid, event,
+                             rp.generation)])
+
+
+def _skip_write(kind, rp_uuid):
+    SKIPPED_WRITES.incr(kind)
+    LOG.debug("Skipped writing unchanged %(kind)s of resource provider "
+              "%(uuid)s; %(count)d %(kind)s writes skipped",
+              {"kind": kind, "uuid": rp_uuid, "count": SKIPPED_WRITES[kind]})
+
 
 @db_api.placement_context_manager.writer
 def get_current_inventory_resources(ctx, rp, include_total=False):
@@ -250,15 +273,11 @@ def _add_inventory(ctx, rp, inventory):
             cannot be found in the DB.
     """
     rc = inventory.resource_class
-    query = """
-            MATCH (rc:RESOURCE_CLASS {name: '%s'})
-            RETURN rc
-            """ % rc
-    result = ctx.tx.run(query).data()
-    if not result:
+    if rc_obj.unknown_names(ctx, [rc]):
         raise exception.ResourceClassNotFound(resource_class=rc)
     _add_inventory_to_provider(ctx, rp, [inventory])
     rp.increment_generation()
+    _record_change(ctx, rp, change_obj.INVENTORIES)
 
 
 @db_api.placement_context_manager.writer
@@ -271,6 +290,7 @@ def _update_inventory(ctx, rp, inventory):
     exceeded = _update_inventory_for_provider(ctx, rp, [inventory],
             set([inventory.resource_class]))
     rp.increment_generation()
+    _record_change(ctx, rp, change_obj.INVENTORIES)
     return exceeded
 
 
@@ -285,6 +305,7 @@ def _delete_inventory(ctx, rp, resource_class):
         raise exception.NotFound(
             "No inventory of class %s found for delete" % resource_class)
     rp.increment_generation()
+    _record_change(ctx, rp, change_obj.INVENTORIES)
 
 
 @db_api.placement_context_manager.writer
@@ -306,38 +327,178 @@ def _set_inventory(ctx, rp, inv_list):
             inventory in inv_list cannot be found in the DB.
     :raises `exception.InventoryInUse` if we attempt to delete inventory
             from a provider that has allocations for that resource class.
+    :raises `exception.ResourceProviderNotFound` if the provider no longer
+            exists.
+    """
+    # If nothing would change, neither the inventory nor the generation is
+    # written. Otherwise the generation check and increment guard the change
+    # as for any other writer; see _set_inventories().
+    generations, exceeded = _set_inventories(
+        ctx, {rp.uuid: (rp.generation, inv_list)})
+    rp.generation = generations[rp.uuid]
+    return exceeded
+
+
+_INVENTORY_FIELDS = ("total", "reserved", "min_unit", "max_unit",
+                     "step_size", "allocation_ratio")
+
+_INVENTORY_STATE_QUERY = """
+UNWIND {uuids} AS uuid
+MATCH (rp:RESOURCE_PROVIDER {uuid: uuid})
+OPTIONAL MATCH (rp)-[:PROVIDES]->(inv)
+OPTIONAL MATCH (inv)<-[u:USES]-(:CONSUMER)
+WITH rp, inv, sum(u.amount) AS used
+RETURN rp.uuid AS uuid, rp.generation AS generation,
+    collect(CASE WHEN inv IS NULL THEN null ELSE
+        {resource_class: labels(inv)[0], inventory: properties(inv),
+        used: used} END) AS inventories
+"""
+
+_DELETE_INVENTORIES_QUERY = """
+UNWIND {rows} AS row
+MATCH (:RESOURCE_PROVIDER {uuid: row.uuid})-[:PROVIDES]->(inv)
+WHERE labels(inv)[0] = row.resource_class
+DETACH DELETE inv
+"""
+
+_UPDATE_INVENTORIES_QUERY = """
+UNWIND {rows} AS row
+MATCH (:RESOURCE_PROVIDER {uuid: row.uuid})-[:PROVIDES]->(inv)
+WHERE labels(inv)[0] = row.resource_class
+SET inv += row.inventory
+"""
+
+_INCREMENT_GENERATIONS_QUERY = """
+UNWIND {rows} AS row
+MATCH (rp:RESOURCE_PROVIDER {uuid: row.uuid})
+WHERE rp.generation = row.generation
+SET rp.generation = row.generation + 1
+RETURN rp.uuid AS uuid
+"""
+
+
+@db_api.placement_context_manager.writer
+def _set_inventories(ctx, inventories):
+    """Replaces the inventories of many resource providers in one
+    transaction.
+
+    The current inventories, generations and usage of all of the providers
+    are read by a single statement, and the differences are calculated here.
+    Providers whose inventories would not change are left alone, generation
+    included. The changes for the rest are applied with one statement each
+    for the deleted and updated inventories, one per resource class for the
+    added ones, and one for the generations.
+
+    :param inventories: A dict, keyed by provider UUID, of tuples of the
+                        generation the caller last saw for the provider and the
+                        list of `Inventory` objects it should have.
+    :returns: A tuple of a dict of the new generation of each provider, keyed
+              by UUID, and a list of (uuid, class) tuples that have exceeded
+              their capacity after this inventory update.
+    :raises `exception.ResourceProviderNotFound` if any of the providers does
+            not exist.
+    :raises `exception.ResourceProviderConcurrentUpdateDetected` if the
+            generation of any of the providers is not the one supplied.
+    :raises `exception.ResourceClassNotFound` if any resource class in any
+            inventory cannot be found in the DB.
+    :raises `exception.InventoryInUse` if we attempt to delete inventory
+            from a provider that has allocations for that resource class.
     """
-    existing_resources = get_current_inventory_resources(ctx, rp)
-    these_resources = set([r.resource_class for r in inv_list])
-
-    # Determine which resources we should be adding, deleting and/or
-    # updating in the resource provider's inventory by comparing sets
-    # of resource class identifiers.
-    to_add = these_resources - existing_resources
-    to_delete = existing_resources - these_resources
-    to_update = these_resources & existing_resources
+    rc_names = set(inv.resource_class
+                   for _gen, inv_list in inventories.values()
+                   for inv in inv_list)
+    bad_rcs = rc_obj.unknown_names(ctx, rc_names)
+    if bad_rcs:
+        raise exception.ResourceClassNotFound(
+            resource_class=", ".join(sorted(bad_rcs)))
+
+    result = ctx.tx.run(_INVENTORY_STATE_QUERY,
+                        uuids=list(inventories)).data()
+    current = {rec["uuid"]: rec for rec in result}
+    missing = set(inventories) - set(current)
+    if missing:
+        raise exception.ResourceProviderNotFound(
+            "No such resource provider(s): %s" % ", ".join(sorted(missing)))
+
+    generations = {}
     exceeded = []
+    to_delete = []
+    to_update = []
+    to_add = collections.defaultdict(list)
+    to_increment = []
+    for uuid, (generation, inv_list) in sorted(inventories.items()):
+        rec = current[uuid]
+        if rec["generation"] != generation:
+            raise exception.ResourceProviderConcurrentUpdateDetected(
+                "Resource provider %s generation conflict - expected %s but "
+                "got %s" % (uuid, generation, rec["generation"]))
+        existing = {inv["resource_class"]: inv for inv in rec["inventories"]}
+        wanted = {inv.resource_class: inv for inv in inv_list}
+        changed = False
+
+        in_use = sorted(rc for rc in set(existing) - set(wanted)
+                        if existing[rc]["used"])
+        if in_use:
+            raise exception.InventoryInUse(resource_classes=", ".join(in_use),
+                                           resource_provider=uuid)
+        for rc in set(existing) - set(wanted):
+            to_delete.append({"uuid": uuid, "resource_class": rc})
+            changed = True
+        for rc, inv in wanted.items():
+            values = {field: getattr(inv, field)
+                      for field in _INVENTORY_FIELDS}
+            if rc not in existing:
+                to_add[rc].append({"uuid": uuid, "inventory": values})
+                changed = True
+                continue
+            if any(existing[rc]["inventory"].get(field) != value
+                   for field, value in values.items()):
+                to_update.append({"uuid": uuid, "resource_class": rc,
+                                  "inventory": values})
+                changed = True
+                if inv.capacity < existing[rc]["used"]:
+                    exceeded.append((uuid, rc))
+
+        if changed:
+            to_increment.append({"uuid": uuid, "generation": generation})
+            generations[uuid] = generation + 1
+        else:
+            _skip_write("inventory", uuid)
+            generations[uuid] = generation
 
     if to_delete:
-        _delete_inventory_from_provider(ctx, rp, to_delete)
-    if to_add:
-        inv_to_add = [inv for inv in inv_list if inv.resource_class in to_add]
-        _add_inventory_to_provider(ctx, rp, inv_to_add)
+        ctx.tx.run(_DELETE_INVENTORIES_QUERY, rows=to_delete)
     if to_update:
-        exceeded = _update_inventory_for_provider(ctx, rp, inv_list,
-                                                  to_update)
-
-    # Here is where we update the resource provider's generation value.  If
-    # this update updates zero rows, that means that another thread has updated
-    # the inventory for this resource provider between the time the caller
-    # originally read the resource provider record and inventory information
-    # and this point. We raise an exception here which will rollback the above
-    # transaction and return an error to the caller to indicate that they can
-    # attempt to retry the inventory save after reverifying any capacity
-    # conditions and re-reading the existing inventory information.
-    rp.increment_generation()
+        ctx.tx.run(_UPDATE_INVENTORIES_QUERY, rows=to_update)
+    for rc_name, rows in sorted(to_add.items()):
+        ctx.tx.run(_create_inventories_query(rc_name), rows=rows)
+    if to_increment:
+        # As in _set_inventory(), a provider whose generation has changed
+        # since it was read means that another thread has updated it, and
+        # raising here rolls back all of the changes.
+        result = ctx.tx.run(_INCREMENT_GENERATIONS_QUERY,
+                            rows=to_increment).data()
+        if len(result) != len(to_increment):
+            raise exception.ResourceProviderConcurrentUpdateDetected()
+        change_obj.record(ctx, [
+            (change_obj.RESOURCE_PROVIDER, row["uuid"],
+             change_obj.INVENTORIES, generations[row["uuid"]])
+            for row in to_increment])
+    return generations, exceeded
 
-    return exceeded
+
+def set_inventories(ctx, inventories):
+    """Replaces the inventories of many resource providers at once, skipping
+    any provider whose inventories are unchanged. See _set_inventories().
+
+    :returns: A dict of the new generation of each provider, keyed by UUID.
+    """
+    generations, exceeded = _set_inventories(ctx, inventories)
+    for uuid, rclass in exceeded:
+        LOG.warning('Resource provider %(uuid)s is now over-'
+                    'capacity for %(resource)s',
+                    {'uuid': uuid, 'resource': rclass})
+    return generations
 
 
 @db_api.placement_context_manager.reader
@@ -365,6 +526,47 @@ def _get_provider_by_uuid(ctx, uuid):
     }
 
 
+@db_api.placement_context_manager.reader
+def get_version(ctx, uuid, include_root=False, include_allocations=False):
+    """Returns a list of values that changes whenever the representation of
+    the resource provider with the supplied UUID, or of its inventory, traits
+    or aggregates, changes, without loading any of them. Returns None if there
+    is no such provider.
+
+    Most changes increment the generation of the provider. Changes of its
+    name or parent, and changes of its aggregates at microversions that do not
+    consider the generation, set its updated_at instead.
+
+    :param include_root: whether the UUID of the root provider of the tree is
+                         included, since it changes when an ancestor is given
+                         a parent.
+    :param include_allocations: whether the number of allocations against the
+                                provider is included. Deleting allocations
+                                does not change the generation of the provider
+                                but always lowers the number, and creating
+                                them always changes the generation.
+    """
+    query_lines = ["MATCH (rp:RESOURCE_PROVIDER {uuid: {uuid}})"]
+    returns = ["rp.generation", "rp.updated_at"]
+    if include_root:
+        query_lines.append(
+            "OPTIONAL MATCH (root:RESOURCE_PROVIDER)-[:CONTAINS*0..99]->(rp) "
+            "WHERE NOT ()-[:CONTAINS]->(root)")
+        returns.append("root.uuid")
+    if include_allocations:
+        query_lines.extend([
+            "OPTIONAL MATCH (rp)-[:PROVIDES]->()<-[u:USES]-(:CONSUMER)",
+            "WITH rp, %scount(u) AS allocations" % (
+                "root, " if include_root else ""),
+        ])
+        returns.append("allocations")
+    query_lines.append("RETURN [%s] AS version" % ", ".join(returns))
+    result = ctx.tx.run("\n".join(query_lines), uuid=uuid).data()
+    if not result:
+        return None
+    return result[0]["version"]
+
+
 @db_api.placement_context_manager.reader
 def _get_aggregates_by_provider(ctx, rp):
     """Returns a list of UUIDs of any aggregates for the supplied resource
@@ -413,6 +615,10 @@ def associate(ctx, resource_provider, rp_uuids):
             RETURN share""".format(rp_uuid=resource_provider.uuid,
                     rp_list=util.makelist(rp_uuids))
     result = ctx.tx.run(query).data()
+    # The share is listed among the aggregates of each of the providers.
+    change_obj.record(ctx, [
+        (change_obj.RESOURCE_PROVIDER, rp_uuid, change_obj.AGGREGATES, None)
+        for rp_uuid in rp_uuids])
 
 @db_api.placement_context_manager.writer
 def _set_aggregates(ctx, resource_provider, provided_aggregates,
@@ -434,6 +640,11 @@ def _set_aggregates(ctx, resource_provider, provided_aggregates,
     # provider
     aggs_to_disassociate = [agg_uuid for agg_uuid in existing_aggregates
             if agg_uuid not in provided_aggregates]
+    if not aggs_to_associate and not aggs_to_disassociate:
+        # Nothing would change, so neither the associations nor the
+        # generation are written.
+        _skip_write("aggregates", resource_provider.uuid)
+        return
 
     if aggs_to_associate:
         stmnt = "MERGE (agg%s:AGGREGATE {uuid: '%s'})"
@@ -468,7 +679,15 @@ def _set_aggregates(ctx, resource_provider, provided_aggregates,
         result = ctx.tx.run(query).data()
     if increment_generation:
         resource_provider.increment_generation()
-    return
+    else:
+        # The generation is not changed at older microversions, but the
+        # entity tag of the provider must still change; see get_version().
+        query = """
+                MATCH (rp:RESOURCE_PROVIDER {uuid: {uuid}})
+                SET rp.updated_at = timestamp()
+        """
+        ctx.tx.run(query, uuid=resource_provider.uuid)
+    _record_change(ctx, resource_provider, change_obj.AGGREGATES)
 
 
 @db_api.placement_context_manager.writer
@@ -483,22 +702,21 @@ def _set_traits(ctx, rp, traits):
     :param rp: The ResourceProvider object to set traits against
     :param traits: List of Trait objects
     """
-    # Get the list of all trait names
-    trait_names = trait_obj.Trait.get_all_names(ctx)
     # Get the traits for this RP
     query = """
             MATCH (rp:RESOURCE_PROVIDER {uuid: '%s'})
-            WITH rp
-            MATCH (t:TRAIT)
-            WHERE t.name IN keys(properties(rp))
-            RETURN t.name AS trait_name
+            RETURN keys(rp) AS props
     """ % rp.uuid
     result = ctx.tx.run(query).data()
-    existing_traits = set([rec["trait_name"] for rec in result])
+    props = result[0]["props"] if result else []
+    existing_traits = set(trait_obj._traits_from_props(ctx, props))
     new_traits = set([trait.name for trait in traits])
     to_add = new_traits - existing_traits
     to_delete = existing_traits - new_traits
     if not to_add and not to_delete:
+        # Nothing would change, so neither the traits nor the generation are
+        # written.
+        _skip_write("traits", rp.uuid)
         return
     # Remove the traits no longer needed
     del_list = []
@@ -522,6 +740,7 @@ def _set_traits(ctx, rp, traits):
     """ % (rp.uuid, add_clause, del_clause)
     result = ctx.tx.run(query).data()
     rp.increment_generation()
+    _record_change(ctx, rp, change_obj.TRAITS)
 
 
 @db_api.placement_context_manager.reader
@@ -755,6 +974,7 @@ class ResourceProvider(object):
         self.generation = rp_db.generation
         self.created_at = rp_db.created_at
         self.updated_at = rp_db.updated_at
+        _record_change(ctx, self, change_obj.CREATED)
 
     @staticmethod
     @db_api.placement_context_manager.writer
@@ -808,6 +1028,8 @@ class ResourceProvider(object):
                 RETURN rp
                 """ % uuid
         result = ctx.tx.run(query).data()
+        change_obj.record(ctx, [(change_obj.RESOURCE_PROVIDER, uuid,
+                                 change_obj.DELETED, None)])
 
     @db_api.placement_context_manager.writer
     def _update_in_db(self, ctx, updates):
@@ -919,6 +1141,7 @@ class ResourceProvider(object):
                 """ % (self.uuid, update_clause)
         result = ctx.tx.run(query).data()
         self._from_db_object(ctx, self, db.pythonize(result[0]["rp"]))
+        _record_change(ctx, self, change_obj.UPDATED)
 
     @staticmethod
     @db_api.placement_context_manager.writer  # For online data migration
@@ -948,8 +1171,21 @@ class ResourceProvider(object):
         Note: There is no limit to the level of nesting for child resource
         providers.
         """
-        rp_rec = _create_tree(ctx, tree)
-        return cls._from_db_object(ctx, cls(ctx), rp_rec)
+        return cls.create_trees(ctx, [tree])[0]
+
+    @classmethod
+    def create_trees(cls, ctx, trees):
+        """Creates all of the providers in a list of trees, each in the format
+        accepted by create_tree(), in a single transaction. The providers are
+        created a level at a time, so the number of statements depends on the
+        depth of the trees and not on the number of providers.
+
+        A list of the root providers of the newly-created trees is returned,
+        in the same order as the trees.
+        """
+        rp_recs = _create_trees(ctx, trees)
+        return [cls._from_db_object(ctx, cls(ctx), rp_rec)
+                for rp_rec in rp_recs]
 
 
 @db_api.placement_context_manager.reader
@@ -1022,7 +1258,9 @@ def _get_all_by_filters_from_db(ctx, filters):
     #          'MEMORY_MB': 1024
     #      },
     #      'in_tree': <uuid>,
-    #      'required': [<trait_name>, ...]
+    #      'required': [<trait_name>, ...],
+    #      'marker': <uuid>,
+    #      'limit': <int>
     #  }
     if not filters:
         filters = {}
@@ -1041,6 +1279,8 @@ def _get_all_by_filters_from_db(ctx, filters):
     forbidden = set([trait.lstrip('!') for trait in forbidden])
     resources = filters.pop('resources', {})
     in_tree = filters.pop('in_tree', None)
+    marker = filters.pop('marker', None)
+    limit = filters.pop('limit', None)
 
     rp_props = []
     if name:
@@ -1070,22 +1310,6 @@ def _get_all_by_filters_from_db(ctx, filters):
         query_lines.append("MATCH (%s)" % rp_str)
         query_lines.append("WITH rp")
 
-    if resources:
-        # This will raise a 'ResourceClassNotFound' exception if any resource
-        # classes are not valid names. 
-        res_ctx.validate_resources(ctx, list(resources.keys()))
-        rps_with_rsrcs = []
-        for rc_name, amount in resources.items():
-            rps = res_ctx.get_providers_with_resource(ctx, rc_name, amount)
-            rps_with_rsrcs.append(set([rp[0] for rp in rps]))
-        good_rps = rps_with_rsrcs[0]
-        for rsrc_set in rps_with_rsrcs[1:]:
-            good_rps.intersection_update(rsrc_set)
-        # Now create the query lines to limit RPs to just those with sufficient
-        # resources.
-        query_lines.append("WHERE rp.uuid IN %s" % list(good_rps))
-        query_lines.append("WITH rp")
-
     if member_of:
         for num, agg in enumerate(member_of):
             query_lines.append("MATCH (rp)-[:ASSOCIATED]->(agg{num})".format(
@@ -1104,7 +1328,8 @@ def _get_all_by_filters_from_db(ctx, filters):
     # This will raise a 'TraitNotFound' exception if any required or forbidden
     # traits are specified. These values are passed in as sets.
     all_traits = required | forbidden
-    res_ctx.validate_traits(ctx, all_traits)
+    if all_traits:
+        res_ctx.validate_traits(ctx, all_traits)
     for trait in required:
         trait_filters.append("EXISTS(rp.%s)" % trait)
     for trait in forbidden:
@@ -1113,9 +1338,39 @@ def _get_all_by_filters_from_db(ctx, filters):
     if trait_str:
         query_lines.append("WHERE %s" % trait_str)
         query_lines.append("WITH rp")
+    # The providers are paged by UUID, so that each page is found by seeking
+    # past the marker rather than by skipping all of the earlier pages.
+    if marker:
+        query_lines.append("WHERE rp.uuid > {marker}")
+        query_lines.append("WITH rp")
+    params = {"marker": marker, "limit": limit}
+    if resources:
+        # This will raise a 'ResourceClassNotFound' exception if any resource
+        # classes are not valid names.
+        res_ctx.validate_resources(ctx, list(resources.keys()))
+        # The capacity checks come after the cheaper filters, so that
+        # capacity is only calculated for the providers that are left. Each
+        # resource class narrows the providers to those with an inventory of
+        # it that can satisfy the requested amount.
+        for num, (rc_name, amount) in enumerate(sorted(resources.items())):
+            query_lines.append("""
+                MATCH (rp)-[:PROVIDES]->(inv{num}:{rc_name})
+                OPTIONAL MATCH (inv{num})<-[u{num}:USES]-(:CONSUMER)
+                WITH rp, inv{num}, sum(u{num}.amount) AS used{num}
+                WHERE (inv{num}.total - inv{num}.reserved) *
+                    inv{num}.allocation_ratio - used{num} >= {{amount{num}}}
+                AND inv{num}.min_unit <= {{amount{num}}}
+                AND inv{num}.max_unit >= {{amount{num}}}
+                AND {{amount{num}}} % inv{num}.step_size = 0
+                WITH rp
+            """.format(num=num, rc_name=rc_name))
+            params["amount%s" % num] = amount
     query_lines.append("RETURN rp")
+    query_lines.append("ORDER BY rp.uuid")
+    if limit is not None:
+        query_lines.append("LIMIT {limit}")
     query = "\n".join(query_lines)
-    result = ctx.tx.run(query).data()
+    result = ctx.tx.run(query, **params).data()
     return [db.pythonize(rec["rp"]) for rec in result]
 
 
@@ -1129,19 +1384,59 @@ def get_all_by_filters(ctx, filters=None):
 
     :param ctx: `placement.context.RequestContext` that may be used to
                     grab a DB connection.
-    :param filters: Can be `name`, `uuid`, `member_of`, `in_tree` or
-                    `resources` where `member_of` is a list of list of
-                    aggregate UUIDs, `in_tree` is a UUID of a resource
-                    provider that we can use to find the root provider ID
-                    of the tree of providers to filter results by and
-                    `resources` is a dict of amounts keyed by resource
-                    classes.
+    :param filters: Can be `name`, `uuid`, `member_of`, `in_tree`,
+                    `resources`, `marker` or `limit` where `member_of` is a
+                    list of list of aggregate UUIDs, `in_tree` is a UUID of a
+                    resource provider that we can use to find the root
+                    provider ID of the tree of providers to filter results
+                    by, `resources` is a dict of amounts keyed by resource
+                    classes, `marker` is a provider UUID after which to start
+                    and `limit` is the maximum number of providers to return.
+                    Providers are returned in UUID order.
     :type filters: dict
     """
     resource_providers = _get_all_by_filters_from_db(ctx, filters)
     return [ResourceProvider(ctx, **rp) for rp in resource_providers]
 
 
+@db_api.placement_context_manager.reader
+def _get_providers_by_uuids(ctx, uuids):
+    """Returns a list of dicts of information about the resource providers with
+    the supplied UUIDs, in the same form as _get_provider_by_uuid(). UUIDs
+    with no matching provider are ignored.
+    """
+    query = """
+            MATCH (rp:RESOURCE_PROVIDER)
+            WHERE rp.uuid IN {uuids}
+            RETURN rp
+    """
+    result = ctx.tx.run(query, uuids=list(uuids)).data()
+    providers = []
+    for rec in result:
+        rp = db.pythonize(rec["rp"])
+        providers.append({"uuid": rp.uuid,
+                          "name": rp.name,
+                          "generation": rp.generation,
+                          "updated_at": rp.updated_at,
+                          "created_at": rp.created_at,
+        })
+    return providers
+
+
+def get_all_by_uuids(ctx, uuids):
+    """Returns a dict, keyed by UUID, of ResourceProvider objects for the
+    supplied UUIDs, fetched in a single query. UUIDs that do not match an
+    existing provider are missing from the result.
+
+    :param ctx: `placement.context.RequestContext` that may be used to
+                    grab a DB connection.
+    :param uuids: iterable of UUIDs of the providers to fetch.
+    """
+    return {rec["uuid"]: ResourceProvider._from_db_object(
+                ctx, ResourceProvider(ctx), rec)
+            for rec in _get_providers_by_uuids(ctx, uuids)}
+
+
 @db_api.placement_context_manager.reader
 def _parent_provider_for_rp(ctx, rp):
     """Given a resource provider, returns the UUID of its parent. If there is
@@ -1193,64 +1488,110 @@ def is_nested(ctx, rp1_uuid, rp2_uuid):
     return bool(result)
 
 
+def _flatten_trees(trees):
+    """Flattens a list of nested tree dicts, as accepted by create_tree(),
+    into a list of levels. Each level is a list of the rows for the providers
+    at that depth, with the properties of the provider node, its parent's UUID
+    and its inventories. A UUID is generated for any provider without one.
+    """
+    levels = []
+    nodes = [(tree, None) for tree in trees]
+    while nodes:
+        level = []
+        children = []
+        for node, parent_uuid in nodes:
+            uuid = node.get("uuid") or db.gen_uuid()
+            props = {"uuid": uuid, "generation": 0}
+            if "name" in node:
+                props["name"] = node["name"]
+            if "type" in node:
+                props["provider_type"] = node["type"]
+            for trait in node.get("traits", []):
+                props[trait] = True
+            inventories = []
+            for rsrc in node.get("resources", []):
+                total = rsrc.get("total")
+                inventories.append({
+                    "resource_class": rsrc.get("name"),
+                    "inventory": {
+                        "total": total,
+                        "reserved": rsrc.get("reserved", 0),
+                        "min_unit": rsrc.get("min_unit", 1),
+                        "max_unit": rsrc.get("max_unit", total),
+                        "step_size": rsrc.get("step_size", 1),
+                        "allocation_ratio": rsrc.get("allocation_ratio", 1),
+                    },
+                })
+            level.append({"uuid": uuid, "parent_uuid": parent_uuid,
+                          "props": props, "inventories": inventories})
+            children.extend((child, uuid)
+                            for child in node.get("children", []))
+        levels.append(level)
+        nodes = children
+    return levels
+
+
+_CREATE_ROOTS_QUERY = """
+UNWIND {rows} AS row
+CREATE (rp:RESOURCE_PROVIDER)
+SET rp = row.props, rp.created_at = timestamp(), rp.updated_at = timestamp()
+"""
+
+_CREATE_CHILDREN_QUERY = """
+UNWIND {rows} AS row
+MATCH (parent:RESOURCE_PROVIDER {uuid: row.parent_uuid})
+CREATE (parent)-[:CONTAINS]->(rp:RESOURCE_PROVIDER)
+SET rp = row.props, rp.created_at = timestamp(), rp.updated_at = timestamp()
+"""
+
+# The inventory node is labelled with the name of its resource class, and
+# labels cannot be parameters, so there is one statement per resource class.
+_CREATE_INVENTORIES_QUERY = """
+UNWIND {rows} AS row
+MATCH (rp:RESOURCE_PROVIDER {uuid: row.uuid})
+CREATE (rp)-[:PROVIDES]->(inv:`%s`)
+SET inv = row.inventory
+"""
+
+
+def _create_inventories_query(rc_name):
+    """Returns _CREATE_INVENTORIES_QUERY for the resource class `rc_name`,
+    with any backticks in the name escaped.
+    """
+    return _CREATE_INVENTORIES_QUERY % rc_name.replace("`", "``")
+
+
 @db_api.placement_context_manager.writer
-def _create_tree(ctx, tree, parent_uuid=None):
-    atts = []
-    if "name" in tree:
-        nm = tree["name"]
-        atts.append("name: '{name}'".format(name=nm))
-    if "type" in tree:
-        tp = tree["type"]
-        atts.append("provider_type: '{tp}'".format(tp=tp))
-    uuid = tree["uuid"] if "uuid" in tree else db.gen_uuid()
-    atts.append("uuid: '{uuid}'".format(uuid=uuid))
-    for trait in tree["traits"]:
-        atts.append("{trait}: True".format(trait=trait))
-    atts.append("generation: 0")
-    atts.append("created_at: timestamp()")
-    atts.append("updated_at: timestamp()")
-    atts_clause = ", ".join(atts)
-    
-    provides = []
-    for rsrc in tree["resources"]:
-        rc_name = rsrc.get("name")
-        total = rsrc.get("total")
-        reserved = rsrc.get("reserved", 0)
-        min_unit= rsrc.get("min_unit", 1)
-        max_unit = rsrc.get("max_unit", total)
-        step_size = rsrc.get("step_size", 1)
-        allocation_ratio = rsrc.get("allocation_ratio", 1)
-        prov_stmnt = """
-WITH nd
-CREATE (nd)-[:PROVIDES]->(:{rc_name}
-{{total: {total}, reserved: {reserved}, min_unit: {min_unit},
-max_unit: {max_unit}, allocation_ratio: {allocation_ratio},
-step_size: {step_size} }})""".format(rc_name=rc_name, total=total,
-        reserved=reserved, min_unit=min_unit, max_unit=max_unit,
-        allocation_ratio=allocation_ratio, step_size=step_size)
-        provides.append(prov_stmnt)
-
-    prov_clause = "\n".join(provides)
-    if parent_uuid:
-        query = """
-MATCH (parent:RESOURCE_PROVIDER {{ uuid: '{parent_uuid}' }})
-WITH parent
-CREATE (parent)-[:CONTAINS]->(nd:RESOURCE_PROVIDER {{ {atts_clause} }})
-{prov_clause}
-RETURN nd AS rp""".format(parent_uuid=parent_uuid,
-        atts_clause=atts_clause, prov_clause=prov_clause)
-    else:
-        # Primary node
-        query = """
-CREATE (nd:RESOURCE_PROVIDER {{ {atts_clause} }})
-{prov_clause}
-RETURN nd AS rp""".format(atts_clause=atts_clause,
-        prov_clause=prov_clause)
+def _create_trees(ctx, trees):
+    """Creates the providers of one or more trees with one statement per level
+    of the trees for the providers, and one statement per resource class for
+    their inventories, however many providers there are.
 
-    result = ctx.tx.run(query).data()
-    rp_rec = result[0]["rp"]
-    # Call recursively to add child nodes, if any
-    child_nodes = tree.get("children", [])
-    for child in child_nodes:
-        _create_tree(ctx, child, rp_rec["uuid"])
-    return rp_rec
+    Returns the records of the root providers, in the order of the trees.
+    """
+    levels = _flatten_trees(trees)
+    inventory_rows = collections.defaultdict(list)
+    for depth, level in enumerate(levels):
+        query = _CREATE_CHILDREN_QUERY if depth else _CREATE_ROOTS_QUERY
+        ctx.tx.run(query, rows=[{"parent_uuid": row["parent_uuid"],
+                                 "props": row["props"]} for row in level])
+        for row in level:
+            for inv in row["inventories"]:
+                inventory_rows[inv["resource_class"]].append(
+                    {"uuid": row["uuid"], "inventory": inv["inventory"]})
+    for rc_name, rows in sorted(inventory_rows.items()):
+        ctx.tx.run(_create_inventories_query(rc_name), rows=rows)
+    change_obj.record(ctx, [
+        (change_obj.RESOURCE_PROVIDER, row["uuid"], change_obj.CREATED,
+         row["props"]["generation"])
+        for level in levels for row in level])
+
+    root_uuids = [row["uuid"] for row in levels[0]]
+    query = """
+            UNWIND {uuids} AS uuid
+            MATCH (rp:RESOURCE_PROVIDER {uuid: uuid})
+            RETURN rp
+    """
+    result = ctx.tx.run(query, uuids=root_uuids).data()
+    by_uuid = {rec["rp"]["uuid"]: rec["rp"] for rec in result}
+    return [by_uuid[uuid] for uuid in root_uuids]
@@ -21,6 +21,8 @@ import six
 from placement.db import graph_db as db
 from placement import db_api
 from placement import exception
+from placement.objects import catalogue
+from placement import trait_cache
 
 _TRAIT_LOCK = 'trait_sync'
 _TRAITS_SYNCED = False
@@ -70,6 +72,7 @@ class Trait(object):
             result = context.tx.run(query).data()
         except db.ClientError as e:
             raise db_exc.DBDuplicateEntry(e)
+        trait_cache.bump_version(context)
         return db.pythonize(result[0]["trait"])
 
     def create(self):
@@ -90,35 +93,16 @@ class Trait(object):
             raise exception.TraitExists(name=self.name)
 
         self._from_db_object(self._context, self, db_trait)
-
-    @staticmethod
-    @db_api.placement_context_manager.reader
-    def _get_by_name_from_db(context, name):
-        query = """
-                MATCH (trait:TRAIT {name: '%s'})
-                RETURN trait
-        """ % name
-        result = context.tx.run(query).data()
-        if not result:
-            raise exception.TraitNotFound(names=name)
-        trait = db.pythonize(result[0]["trait"])
-        return trait
+        clear_known_names()
 
     @classmethod
     def get_by_name(cls, context, name):
-        db_trait = cls._get_by_name_from_db(context, six.text_type(name))
+        db_trait = trait_cache.ensure(context).get(six.text_type(name))
         return cls(context, **db_trait)
 
     @classmethod
-    @db_api.placement_context_manager.reader
     def get_all_names(cls, context):
-        query = """
-                MATCH (t:TRAIT)
-                RETURN t.name AS trait_name
-        """
-        result = context.tx.run(query).data()
-        trait_names = [rec["trait_name"] for rec in result]
-        return trait_names
+        return trait_cache.ensure(context).get_all_names()
 
     @staticmethod
     @db_api.placement_context_manager.writer
@@ -140,6 +124,7 @@ class Trait(object):
         result = context.tx.run(query).data()
         if not result:
             raise exception.TraitNotFound(names=name)
+        trait_cache.bump_version(context)
 
     def destroy(self):
         if not self.name:
@@ -149,6 +134,21 @@ class Trait(object):
             raise exception.TraitCannotDeleteStandard(name=self.name)
 
         self._destroy_in_db(self._context, self.name)
+        clear_known_names()
+
+
+def clear_known_names():
+    """Clears this process's trait cache after a change to the traits."""
+    if trait_cache.TRAIT_CACHE is not None:
+        trait_cache.TRAIT_CACHE.clear()
+
+
+def unknown_names(ctx, names):
+    """Returns the set of the supplied trait names that do not exist. The
+    database is only read when some name is not in the trait cache, or the
+    cache is due to be checked.
+    """
+    return trait_cache.ensure(ctx).unknown_names(names)
 
 
 def ensure_sync(ctx):
@@ -160,7 +160,8 @@ def ensure_sync(ctx):
     duplicating work.
 
     Different placement API server processes that talk to the same database
-    will avoid issues through the power of transactions.
+    take turns through a lock on the catalogue's version node, and only the
+    first of them after the os_traits library changes writes anything.
 
     :param ctx: `placement.context.RequestContext` that may be used to grab a
                 DB connection.
@@ -173,11 +174,24 @@ def ensure_sync(ctx):
         if not _TRAITS_SYNCED:
             _trait_sync(ctx)
             _TRAITS_SYNCED = True
+            clear_known_names()
 
 
 def get_all(context, filters=None):
-    db_traits = _get_all_from_db(context, filters)
-    return [Trait(context, **data) for data in db_traits]
+    filters = filters or {}
+    if 'associated' in filters:
+        # Which traits are associated is only known from the providers.
+        db_traits = _get_all_from_db(context, filters)
+    else:
+        db_traits = trait_cache.ensure(context).get_all()
+        if 'name_in' in filters:
+            names = set(six.text_type(n) for n in filters['name_in'])
+            db_traits = [data for data in db_traits if data['name'] in names]
+        if 'prefix' in filters:
+            db_traits = [data for data in db_traits
+                         if data['name'].startswith(filters['prefix'])]
+    return [Trait(context, **data)
+            for data in sorted(db_traits, key=lambda data: data['name'])]
 
 
 def get_all_by_resource_provider(context, rp):
@@ -203,9 +217,7 @@ def get_traits_by_provider_uuid(context, rp_uuid):
 
 
 def _traits_from_props(context, props):
-    all_names = Trait.get_all_names(context)
-    trait_names = [prop for prop in props if prop in all_names]
-    return trait_names
+    return trait_cache.ensure(context).traits_from_props(props)
 
 
 @db_api.placement_context_manager.reader
@@ -296,34 +308,13 @@ def _get_all_from_db(context, filters):
 def _trait_sync(context):
     """Sync the os_traits symbols to the database.
 
-    Reads all symbols from the os_traits library, checks if any of them do
-    not exist in the database and bulk-inserts those that are not. This is
-    done once per web-service process, at startup.
+    Creates the traits in the os_traits library that are not in the database
+    with a single statement. This is done once per web-service process, at
+    startup, and is skipped by all but one process after the os_traits
+    library has changed; see `placement.objects.catalogue`.
 
     :param context: `placement.context.RequestContext` that may be used to grab
                     a DB connection.
     """
-    # Create a set of all traits in the os_traits library.
-    std_traits = set(os_traits.get_traits())
-    # Get the traits in the database
-    trait_names = Trait.get_all_names(context)
-    db_traits = set(name for name in trait_names
-            if not os_traits.is_custom(name))
-    # Determine those traits which are in os_traits but not
-    # currently in the database, and insert them.
-    need_sync = std_traits - db_traits
-    if not need_sync:
-        return
-    qlines = []
-    for num, trait_name in enumerate(need_sync):
-        qline = """
-                CREATE (t%s:TRAIT {name: '%s', created_at: timestamp(),
-                    updated_at: timestamp()})
-        """ % (num, trait_name)
-        qlines.append(qline)
-    query = "\n".join(qlines) + "\nRETURN t0"
-
-    try:
-        result = context.tx.run(query).data()
-    except db.ClientError:
-        pass  # some other process sync'd, just ignore
+    if catalogue.sync(context, "os_traits", "TRAIT", os_traits.get_traits()):
+        trait_cache.bump_version(context)
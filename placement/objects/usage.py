@@ -10,8 +10,105 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+from oslo_log import log as logging
+
 from placement.db import graph_db as db
 from placement import db_api
+from placement.objects import change as change_obj
+
+
+LOG = logging.getLogger(__name__)
+
+
+# Usage totals are kept in counter nodes, one per resource class for each
+# project (PROJECT_USAGE) and for each project and user (USER_USAGE), so that
+# GET /usages does not need to walk every consumer a project owns. The
+# counters are adjusted in the same transaction as the allocations that change
+# them. The project and user that a USES relationship was counted against are
+# stored on the relationship itself, so that the same counters are decremented
+# when it is removed even if the consumer has since changed owners.
+#
+# Each counter is found by its `key`, which has a uniqueness constraint (see
+# ensure_usage_counters()), so that concurrent first allocations for the same
+# project cannot create two counters.
+_ADJUST_USAGES_QUERY = """
+        UNWIND {deltas} AS delta
+        MERGE (pu:PROJECT_USAGE {key: delta.project_uuid + ":" +
+            delta.resource_class})
+        ON CREATE SET pu.project_uuid = delta.project_uuid,
+            pu.resource_class = delta.resource_class, pu.used = 0
+        SET pu.used = pu.used + delta.used
+        MERGE (uu:USER_USAGE {key: delta.project_uuid + ":" +
+            delta.user_uuid + ":" + delta.resource_class})
+        ON CREATE SET uu.project_uuid = delta.project_uuid,
+            uu.user_uuid = delta.user_uuid,
+            uu.resource_class = delta.resource_class, uu.used = 0
+        SET uu.used = uu.used + delta.used
+"""
+
+# Sets the counters to the supplied usages, rather than adjusting them, so
+# that running it twice does not count the usages twice.
+_SET_USAGES_QUERY = """
+        UNWIND {projects} AS usage
+        MERGE (pu:PROJECT_USAGE {key: usage.project_uuid + ":" +
+            usage.resource_class})
+        SET pu.project_uuid = usage.project_uuid,
+            pu.resource_class = usage.resource_class, pu.used = usage.used
+        WITH count(*) AS ignored
+        UNWIND {users} AS usage
+        MERGE (uu:USER_USAGE {key: usage.project_uuid + ":" +
+            usage.user_uuid + ":" + usage.resource_class})
+        SET uu.project_uuid = usage.project_uuid,
+            uu.user_uuid = usage.user_uuid,
+            uu.resource_class = usage.resource_class, uu.used = usage.used
+"""
+
+# The number of counters, the number of them written before they had keys,
+# and whether there are any allocations at all. Each label is matched on its
+# own, so that only the counters are scanned.
+_COUNTER_STATE_QUERY = """
+        OPTIONAL MATCH (pu:PROJECT_USAGE)
+        WITH count(pu) AS projects,
+            count(CASE WHEN pu.key IS NULL THEN 1 END) AS unkeyed_projects
+        OPTIONAL MATCH (uu:USER_USAGE)
+        WITH projects, unkeyed_projects, count(uu) AS users,
+            count(CASE WHEN uu.key IS NULL THEN 1 END) AS unkeyed_users
+        RETURN projects + users AS counters,
+            unkeyed_projects + unkeyed_users AS unkeyed,
+            exists((:CONSUMER)-[:USES]->()) AS allocated
+"""
+
+_COUNTER_LABELS = ("PROJECT_USAGE", "USER_USAGE")
+
+# Removes the USES relationships of a set of consumers, returning the usage
+# that each was counted against and the consumer it belonged to.
+_RELEASE_ALLOCATIONS_QUERY = """
+        MATCH (cs:CONSUMER)-[u:USES]->(inv)
+        WHERE cs.uuid IN {consumer_uuids}
+        OPTIONAL MATCH (pj:PROJECT)-[:OWNS]->(us:USER)-[:OWNS]->(cs)
+        WITH u, {consumer_uuid: cs.uuid,
+            project_uuid: coalesce(u.project_uuid, pj.uuid),
+            user_uuid: coalesce(u.user_uuid, us.uuid),
+            resource_class: labels(inv)[0], used: u.amount,
+            rp_uuid: [(rp)-[:PROVIDES]->(inv) | rp.uuid][0]} AS usage
+        DELETE u
+        RETURN usage
+"""
+
+# The usage of each project, user and resource class, calculated from the
+# USES relationships. Relationships written before the owner was recorded on
+# them are counted against the consumer's current owner.
+_CALCULATE_USAGES_QUERY = """
+        MATCH (cs:CONSUMER)-[u:USES]->(inv)
+        OPTIONAL MATCH (pj:PROJECT)-[:OWNS]->(us:USER)-[:OWNS]->(cs)
+        WITH coalesce(u.project_uuid, pj.uuid) AS project_uuid,
+            coalesce(u.user_uuid, us.uuid) AS user_uuid,
+            labels(inv)[0] AS resource_class, u.amount AS amount
+        WHERE project_uuid IS NOT NULL AND user_uuid IS NOT NULL
+        RETURN project_uuid, user_uuid, resource_class, sum(amount) AS used
+"""
 
 
 class Usage(object):
@@ -49,16 +146,265 @@ def _get_all_by_resource_provider_uuid(context, rp_uuid):
 
 @db_api.placement_context_manager.reader
 def _get_all_by_project_user(context, project_id, user_id=None):
+    # The counters are looked up by the prefix of their key, which is indexed
+    # by its uniqueness constraint, rather than by their other properties,
+    # which are not.
     if user_id:
-        match = "MATCH p=(:USER {uuid: '%s'})-[*]->()-[:USES]->(rc)" % user_id
+        prefix = "%s:%s:" % (project_id, user_id)
+        query = """
+                MATCH (u:USER_USAGE)
+                WHERE u.key STARTS WITH {prefix}
+                    AND u.project_uuid = {project_id}
+                    AND u.user_uuid = {user_id} AND u.used <> 0
+                RETURN u.resource_class AS rcname, u.used AS used
+        """
     else:
-        match = "MATCH p=(:PROJECT {uuid: '%s'})-[*]->()-[:USES]->(rc)"
-        match = match % project_id
-    query = """
-            %s
-            WITH labels(rc)[0] AS rcname, relationships(p)[-1] AS used
-            RETURN rcname, sum(used.amount) AS used
-    """ % match
-    result = context.tx.run(query).data()
+        prefix = "%s:" % project_id
+        query = """
+                MATCH (u:PROJECT_USAGE)
+                WHERE u.key STARTS WITH {prefix}
+                    AND u.project_uuid = {project_id} AND u.used <> 0
+                RETURN u.resource_class AS rcname, u.used AS used
+        """
+    result = context.tx.run(query, prefix=prefix, project_id=project_id,
+                            user_id=user_id).data()
     return [{"resource_class": rec["rcname"], "usage": rec["used"]}
             for rec in result]
+
+
+def usage_deltas(released, claimed):
+    """Returns the list of changes to the usage counters needed when the
+    `released` usages are removed and the `claimed` usages are added.
+
+    Each usage is a dict with the keys `project_uuid`, `user_uuid`,
+    `resource_class` and `used`. Usages without a project or user cannot be
+    counted and are ignored, and changes that cancel out are dropped.
+    """
+    totals = collections.Counter()
+    for sign, usages in ((-1, released), (1, claimed)):
+        for usage in usages:
+            if not usage["project_uuid"] or not usage["user_uuid"]:
+                continue
+            key = (usage["project_uuid"], usage["user_uuid"],
+                   usage["resource_class"])
+            totals[key] += sign * usage["used"]
+    return [{"project_uuid": key[0],
+             "user_uuid": key[1],
+             "resource_class": key[2],
+             "used": used}
+            for key, used in sorted(totals.items()) if used]
+
+
+@db_api.placement_context_manager.writer
+def adjust_usages(context, released, claimed=None):
+    """Updates the project and user usage counters for the supplied released
+    and claimed usages, as described in usage_deltas(), in one statement.
+    This is meant to be called in the same transaction as the change to the
+    allocations.
+    """
+    deltas = usage_deltas(released, claimed or [])
+    if deltas:
+        context.tx.run(_ADJUST_USAGES_QUERY, deltas=deltas)
+
+
+@db_api.placement_context_manager.writer
+def release_allocations(context, consumer_uuids):
+    """Deletes all of the allocations of the supplied consumers and
+    decrements the usage counters they were counted against.
+    """
+    result = context.tx.run(_RELEASE_ALLOCATIONS_QUERY,
+                            consumer_uuids=list(consumer_uuids)).data()
+    usages = [rec["usage"] for rec in result]
+    if not usages:
+        return
+    adjust_usages(context, usages)
+    # Neither the providers nor the consumers have their generations changed
+    # when allocations are deleted.
+    # Only the consumers that had allocations to release have changed.
+    rp_uuids = set(usage["rp_uuid"] for usage in usages)
+    released_uuids = set(usage["consumer_uuid"] for usage in usages)
+    change_obj.record(context, [
+        (change_obj.RESOURCE_PROVIDER, rp_uuid, change_obj.ALLOCATIONS, None)
+        for rp_uuid in sorted(rp_uuids)] + [
+        (change_obj.CONSUMER, consumer_uuid, change_obj.ALLOCATIONS, None)
+        for consumer_uuid in sorted(released_uuids)])
+
+
+def _calculated_usages(context):
+    result = context.tx.run(_CALCULATE_USAGES_QUERY).data()
+    return {(rec["project_uuid"], rec["user_uuid"], rec["resource_class"]):
+            rec["used"] for rec in result}
+
+
+@db_api.placement_context_manager.reader
+def verify_usage_counters(context):
+    """Compares the usage counters with the usage calculated from the
+    allocations.
+
+    :returns: a list of dicts, one for each counter that is wrong, with the
+              keys `project_uuid`, `user_uuid` (None for a project counter),
+              `resource_class`, `counted` and `actual`.
+    """
+    actual_users = _calculated_usages(context)
+    actual_projects = collections.Counter()
+    for (project_uuid, user_uuid, rc), used in actual_users.items():
+        actual_projects[(project_uuid, None, rc)] += used
+    query = """
+            MATCH (u:PROJECT_USAGE)
+            RETURN u.project_uuid AS project_uuid, null AS user_uuid,
+                u.resource_class AS resource_class, u.used AS used
+            UNION ALL
+            MATCH (u:USER_USAGE)
+            RETURN u.project_uuid AS project_uuid, u.user_uuid AS user_uuid,
+                u.resource_class AS resource_class, u.used AS used
+    """
+    result = context.tx.run(query).data()
+    counted = {(rec["project_uuid"], rec["user_uuid"], rec["resource_class"]):
+               rec["used"] for rec in result}
+    actual = dict(actual_users)
+    actual.update(actual_projects)
+    mismatches = []
+    for key in sorted(set(counted) | set(actual),
+                      key=lambda k: tuple(v or "" for v in k)):
+        if counted.get(key, 0) != actual.get(key, 0):
+            mismatches.append({"project_uuid": key[0],
+                               "user_uuid": key[1],
+                               "resource_class": key[2],
+                               "counted": counted.get(key, 0),
+                               "actual": actual.get(key, 0)})
+    return mismatches
+
+
+@db_api.placement_context_manager.writer
+def rebuild_usage_counters(context):
+    """Replaces all of the usage counters with ones calculated from the
+    allocations, recording the owner each allocation is counted against on
+    its USES relationship.
+
+    :returns: the number of USER_USAGE counters written.
+    """
+    query = """
+            MATCH (cs:CONSUMER)-[u:USES]->()
+            WHERE u.project_uuid IS NULL OR u.user_uuid IS NULL
+            MATCH (pj:PROJECT)-[:OWNS]->(us:USER)-[:OWNS]->(cs)
+            SET u.project_uuid = pj.uuid, u.user_uuid = us.uuid
+    """
+    context.tx.run(query)
+    for label in _COUNTER_LABELS:
+        context.tx.run("MATCH (u:%s) DELETE u" % label)
+    users = [{"project_uuid": key[0],
+              "user_uuid": key[1],
+              "resource_class": key[2],
+              "used": used}
+             for key, used in sorted(_calculated_usages(context).items())
+             if used]
+    project_totals = collections.Counter()
+    for usage in users:
+        project_totals[(usage["project_uuid"],
+                        usage["resource_class"])] += usage["used"]
+    projects = [{"project_uuid": key[0],
+                 "resource_class": key[1],
+                 "used": used}
+                for key, used in sorted(project_totals.items())]
+    context.tx.run(_SET_USAGES_QUERY, projects=projects, users=users)
+    return len(users)
+
+
+@db_api.placement_context_manager.reader
+def _get_counter_state(context):
+    return context.tx.run(_COUNTER_STATE_QUERY).data()[0]
+
+
+def ensure_usage_counters(context):
+    """Makes sure that the usage counters can be relied on, as
+    deploy.update_database() does when each process starts.
+
+    The counters are built from the allocations if there are none yet, as
+    after an upgrade from a release that did not keep them, and rebuilt if
+    any were written before they had keys. The uniqueness constraints on the
+    keys are created if they are missing.
+    """
+    state = _get_counter_state(context)
+    if state["unkeyed"]:
+        # Counters without keys might have been duplicated by concurrent
+        # writes, which would keep the constraints from being created.
+        count = rebuild_usage_counters(context)
+        LOG.info("Rebuilt %d usage counters written without keys", count)
+    for label in _COUNTER_LABELS:
+        db.ensure_uniqueness_constraint(label, "key")
+    if not state["counters"] and state["allocated"]:
+        count = rebuild_usage_counters(context)
+        LOG.info("Built %d usage counters from the allocations", count)
+
+
+@db_api.placement_context_manager.reader
+def get_provider_summaries(context, uuids=None, in_tree=None, member_of=None,
+                           marker=None, limit=None):
+    """Returns the generation, inventory and usage of a page of resource
+    providers in a single query, ordered by UUID.
+
+    :param uuids: if not None, only providers with these UUIDs are included.
+    :param in_tree: if supplied, only providers in the same tree as the
+                    provider with this UUID are included.
+    :param member_of: if supplied, only providers associated with at least one
+                      of these aggregate UUIDs are included.
+    :param marker: if supplied, only providers with a UUID after this one are
+                   included.
+    :param limit: the maximum number of providers to return.
+    :returns: a list of dicts with the keys `uuid`, `generation`,
+              `inventories` (a dict, keyed by resource class, of dicts of the
+              inventory fields) and `usages` (a dict, keyed by resource class,
+              of the amount of the provider's own inventory that is used).
+    """
+    if in_tree:
+        query_lines = [
+            "MATCH (:RESOURCE_PROVIDER {uuid: {in_tree}})"
+            "<-[:CONTAINS*0..99]-(root:RESOURCE_PROVIDER)",
+            "WHERE NOT ()-[:CONTAINS]->(root)",
+            "MATCH (root)-[:CONTAINS*0..99]->(rp:RESOURCE_PROVIDER)",
+        ]
+    else:
+        query_lines = ["MATCH (rp:RESOURCE_PROVIDER)"]
+    conditions = []
+    if uuids is not None:
+        conditions.append("rp.uuid IN {uuids}")
+    if member_of:
+        conditions.append("ANY(agg IN [(rp)-[:ASSOCIATED]->(a) | a.uuid] "
+                          "WHERE agg IN {member_of})")
+    if marker:
+        conditions.append("rp.uuid > {marker}")
+    if conditions:
+        query_lines.append("WHERE %s" % " AND ".join(conditions))
+    query_lines.append("WITH rp ORDER BY rp.uuid")
+    if limit is not None:
+        query_lines.append("LIMIT {limit}")
+    query_lines.append("""
+            OPTIONAL MATCH (rp)-[:PROVIDES]->(inv)
+            OPTIONAL MATCH (inv)<-[u:USES]-(:CONSUMER)
+            WITH rp, inv, sum(u.amount) AS used
+            WITH rp, collect(CASE WHEN inv IS NULL THEN null ELSE
+                {resource_class: labels(inv)[0], inventory: properties(inv),
+                used: used} END) AS inventories
+            RETURN rp.uuid AS uuid, rp.generation AS generation, inventories
+            ORDER BY uuid
+    """)
+    query = "\n".join(query_lines)
+    result = context.tx.run(query, uuids=uuids, in_tree=in_tree,
+                            member_of=member_of, marker=marker,
+                            limit=limit).data()
+    inv_fields = ("total", "reserved", "min_unit", "max_unit", "step_size",
+                  "allocation_ratio")
+    summaries = []
+    for rec in result:
+        inventories = {}
+        usages = {}
+        for inv in rec["inventories"]:
+            rc = inv["resource_class"]
+            inventories[rc] = {field: inv["inventory"].get(field)
+                               for field in inv_fields}
+            usages[rc] = inv["used"]
+        summaries.append({"uuid": rec["uuid"],
+                          "generation": rec["generation"],
+                          "inventories": inventories,
+                          "usages": usages})
+    return summaries
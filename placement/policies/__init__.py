@@ -16,6 +16,7 @@ from placement.policies import aggregate
 from placement.policies import allocation
 from placement.policies import allocation_candidate
 from placement.policies import base
+from placement.policies import change
 from placement.policies import inventory
 from placement.policies import reshaper
 from placement.policies import resource_class
@@ -36,4 +37,5 @@ def list_rules():
         allocation.list_rules(),
         allocation_candidate.list_rules(),
         reshaper.list_rules(),
+        change.list_rules(),
     )
@@ -17,6 +17,7 @@ from placement.policies import base
 
 
 LIST = 'placement:allocation_candidates:list'
+CLAIM = 'placement:allocation_candidates:claim'
 
 rules = [
     policy.DocumentedRuleDefault(
@@ -30,7 +31,19 @@ rules = [
             }
         ],
         scope_types=['system'],
-    )
+    ),
+    policy.DocumentedRuleDefault(
+        CLAIM,
+        base.RULE_ADMIN_API,
+        "Select an allocation candidate and claim it for a consumer.",
+        [
+            {
+                'method': 'POST',
+                'path': '/allocation_candidates/claim'
+            }
+        ],
+        scope_types=['system'],
+    ),
 ]
 
 
@@ -22,6 +22,7 @@ CREATE = PREFIX % 'create'
 SHOW = PREFIX % 'show'
 UPDATE = PREFIX % 'update'
 DELETE = PREFIX % 'delete'
+BULK_UPDATE = PREFIX % 'bulk_update'
 BASE_PATH = '/resource_providers/{uuid}/inventories'
 
 rules = [
@@ -88,6 +89,17 @@ rules = [
             }
         ],
         scope_types=['system']),
+    policy.DocumentedRuleDefault(
+        BULK_UPDATE,
+        base.RULE_ADMIN_API,
+        "Update the inventories of many resource providers.",
+        [
+            {
+                'method': 'PUT',
+                'path': '/inventories'
+            }
+        ],
+        scope_types=['system']),
 ]
 
 
@@ -22,6 +22,7 @@ CREATE = PREFIX % 'create'
 SHOW = PREFIX % 'show'
 UPDATE = PREFIX % 'update'
 DELETE = PREFIX % 'delete'
+EXPORT = PREFIX % 'export'
 
 rules = [
     policy.DocumentedRuleDefault(
@@ -79,6 +80,17 @@ rules = [
             }
         ],
         scope_types=['system']),
+    policy.DocumentedRuleDefault(
+        EXPORT,
+        base.RULE_ADMIN_API,
+        "Export the capacity information of all resource providers.",
+        [
+            {
+                'method': 'GET',
+                'path': '/export/resource_providers'
+            }
+        ],
+        scope_types=['system']),
 ]
 
 
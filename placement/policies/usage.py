@@ -18,6 +18,7 @@ from placement.policies import base
 
 PROVIDER_USAGES = 'placement:resource_providers:usages'
 TOTAL_USAGES = 'placement:usages'
+PROVIDER_SUMMARIES = 'placement:provider_summaries'
 
 
 rules = [
@@ -46,7 +47,18 @@ rules = [
                 'path': '/usages'
             }
         ],
-        scope_types=['system'])
+        scope_types=['system']),
+    policy.DocumentedRuleDefault(
+        PROVIDER_SUMMARIES,
+        base.RULE_ADMIN_API,
+        "List the inventory and usage of many resource providers.",
+        [
+            {
+                'method': 'POST',
+                'path': '/provider_summaries'
+            }
+        ],
+        scope_types=['system']),
 ]
 
 
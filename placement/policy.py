@@ -11,6 +11,10 @@
 #    under the License.
 """Policy Enforcement for placement API."""
 
+import collections
+import threading
+import time
+
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_policy import policy
@@ -18,18 +22,87 @@ from oslo_utils import excutils
 
 from placement import exception
 from placement import policies
+from placement import stats
 
 
 LOG = logging.getLogger(__name__)
 _ENFORCER = None
+DEFAULT_DECISION_CACHE_SIZE = 1024
+# The number of seconds between checks of the policy file for changes.
+RULES_CHECK_INTERVAL = 5
+_RULES_CHECKED = 0
+
+
+class DecisionCache(object):
+    """A bounded cache of the results of policy checks, keyed by the action,
+    the credentials and the target, which forgets the least recently used
+    decision when it is full.
+
+    `stats` counts the checks answered from the cache (`hits`), those that
+    were not (`misses`), the decisions dropped to make room (`evictions`) and
+    the times the cache was cleared (`clears`), and logs them at INFO.
+    """
+
+    def __init__(self, maxsize=DEFAULT_DECISION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._decisions = collections.OrderedDict()
+        self.stats = stats.Counters('Policy decision cache')
+
+    def get(self, key):
+        """Returns the cached decision for key, or None."""
+        with self._lock:
+            try:
+                decision = self._decisions.pop(key)
+            except KeyError:
+                self.stats.incr('misses')
+                return None
+            self._decisions[key] = decision
+            self.stats.incr('hits')
+            return decision
+
+    def put(self, key, decision):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._decisions.pop(key, None)
+            self._decisions[key] = decision
+            while len(self._decisions) > self.maxsize:
+                self._decisions.popitem(last=False)
+                self.stats.incr('evictions')
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+            self.stats.incr('clears')
+
+    def __len__(self):
+        with self._lock:
+            return len(self._decisions)
+
+
+_DECISIONS = DecisionCache()
+
+
+class _Enforcer(policy.Enforcer):
+    """An Enforcer that forgets the cached decisions whenever its rules are
+    set, which is how the rules of a changed policy file are loaded.
+    """
+
+    def set_rules(self, rules, overwrite=True, use_conf=False):
+        super(_Enforcer, self).set_rules(
+            rules, overwrite=overwrite, use_conf=use_conf)
+        _DECISIONS.clear()
 
 
 def reset():
     """Used to reset the global _ENFORCER between test runs."""
-    global _ENFORCER
+    global _ENFORCER, _DECISIONS, _RULES_CHECKED
     if _ENFORCER:
         _ENFORCER.clear()
         _ENFORCER = None
+    _DECISIONS = DecisionCache()
+    _RULES_CHECKED = 0
 
 
 def init(conf):
@@ -41,11 +114,12 @@ def init(conf):
         # to read the policy file from config option [oslo_policy]/policy_file
         # which is used by nova. In other words, to have separate policy files
         # for placement and nova, we have to use separate policy_file options.
-        _enforcer = policy.Enforcer(
+        _enforcer = _Enforcer(
             conf, policy_file=conf.placement.policy_file)
         _enforcer.register_defaults(policies.list_rules())
         _enforcer.load_rules()
         _ENFORCER = _enforcer
+        _DECISIONS.maxsize = conf.placement.policy_decision_cache_size
 
 
 def get_enforcer():
@@ -61,6 +135,30 @@ def _get_enforcer(conf):
     return _ENFORCER
 
 
+def _freeze(value):
+    """Returns a hashable equivalent of a credential or target value, in
+    which the order of lists, such as that of the roles, is not significant.
+    """
+    if hasattr(value, 'items'):
+        return frozenset((key, _freeze(val)) for key, val in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(_freeze(val) for val in value)
+    return value
+
+
+def _check_rules():
+    """Loads the rules of a changed policy file, looking for changes at most
+    once every RULES_CHECK_INTERVAL seconds, since looking stats the policy
+    file and its directories. Loading them clears the decision cache.
+    """
+    global _RULES_CHECKED
+    now = time.time()
+    if now - _RULES_CHECKED < RULES_CHECK_INTERVAL:
+        return
+    _RULES_CHECKED = now
+    _ENFORCER.load_rules()
+
+
 def authorize(context, action, target, do_raise=True):
     """Verifies that the action is valid on the target in this context.
 
@@ -79,11 +177,24 @@ def authorize(context, action, target, do_raise=True):
         exact value False if not authorized and do_raise is False.
     """
     credentials = context.to_policy_values()
+    # Rules from a changed policy file are loaded before the cache is used,
+    # so that loading them clears it.
+    _check_rules()
+    try:
+        key = (action, _freeze(credentials), _freeze(target))
+        hash(key)
+    except TypeError:
+        key = None
+    result = _DECISIONS.get(key) if key is not None else None
     try:
-        # NOTE(mriedem): The "action" kwarg is for the PolicyNotAuthorized exc.
-        return _ENFORCER.authorize(
-            action, target, credentials, do_raise=do_raise,
-            exc=exception.PolicyNotAuthorized, action=action)
+        if result is None:
+            result = _ENFORCER.authorize(
+                action, target, credentials, do_raise=False)
+            if key is not None:
+                _DECISIONS.put(key, result)
+        if not result and do_raise:
+            raise exception.PolicyNotAuthorized(action=action)
+        return result
     except policy.PolicyNotRegistered:
         with excutils.save_and_reraise_exception():
             LOG.exception('Policy not registered')
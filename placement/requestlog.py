@@ -85,3 +85,10 @@ class RequestLog(object):
                 microversion.MICROVERSION_ENVIRON, '-'),
         }
         LOG.info(self.format, log_format)
+        context = environ.get('placement.context')
+        query_cache = getattr(context, 'query_cache', None)
+        if query_cache is not None and query_cache.hits:
+            LOG.debug('%(hits)d of %(total)d read statements were answered '
+                      'from the query cache of the request',
+                      {'hits': query_cache.hits,
+                       'total': query_cache.hits + query_cache.misses})
@@ -9,74 +9,98 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+"""A process-wide cache of the resource classes, kept current as described
+in placement.versioned_cache.
+"""
 
-from oslo_concurrency import lockutils
-import sqlalchemy as sa
-
-from placement.db.sqlalchemy import models
-from placement import db_api
+from placement.db import graph_db as db
 from placement import exception
+from placement import versioned_cache
 
 RC_CACHE = None
-_RC_TBL = models.ResourceClass.__table__
-_LOCKNAME = 'rc_cache'
+VERSION_NAME = 'resource_classes'
+
+_LOAD_QUERY = """
+        MATCH (rc:RESOURCE_CLASS)
+        RETURN id(rc) AS id, rc
+"""
 
 
-@db_api.placement_context_manager.reader
-def ensure(ctx):
+def ensure(ctx, ttl=None):
     """Ensures that a singleton resource class cache has been created in the
-    module's scope.
+    module's scope, and returns it.
 
     :param ctx: `placement.context.RequestContext` that may be used to grab a
                 DB connection.
+    :param ttl: the number of seconds for which the cache is used before
+                checking whether it is stale. Defaults to
+                versioned_cache.DEFAULT_TTL.
     """
     global RC_CACHE
-    if RC_CACHE is not None:
-        return
-    RC_CACHE = ResourceClassCache(ctx)
-
+    if RC_CACHE is None:
+        RC_CACHE = ResourceClassCache(ctx, ttl=ttl)
+    return RC_CACHE
 
-@db_api.placement_context_manager.reader
-def _refresh_from_db(ctx, cache):
-    """Grabs all resource classes from the DB table and populates the
-    supplied cache object's internal integer and string identifier dicts.
 
-    :param cache: ResourceClassCache object to refresh.
+def bump_version(ctx):
+    """Tells the caches of every process that the resource classes have
+    changed. This must be called in the transaction that changes them.
     """
-    sel = sa.select([_RC_TBL.c.id, _RC_TBL.c.name, _RC_TBL.c.updated_at,
-                     _RC_TBL.c.created_at])
-    res = ctx.session.execute(sel).fetchall()
-    cache.id_cache = {r[1]: r[0] for r in res}
-    cache.str_cache = {r[0]: r[1] for r in res}
-    cache.all_cache = {r[1]: r for r in res}
+    versioned_cache.bump_version(ctx, VERSION_NAME)
 
 
-class ResourceClassCache(object):
-    """A  cache of integer and string lookup values for resource classes."""
+class ResourceClassCache(versioned_cache.VersionedCache):
+    """A cache of integer and string lookup values for resource classes.
 
-    def __init__(self, ctx):
-        """Initialize the cache of resource class identifiers.
+    The integer identifiers are those the database gives the RESOURCE_CLASS
+    nodes. They are only meaningful while the cache is current, since the
+    database may reuse the identifier of a deleted node.
+    """
 
-        :param ctx: `placement.context.RequestContext` from which we can grab a
-                    `SQLAlchemy.Connection` object to use for any DB lookups.
-        """
-        self.ctx = ctx
+    VERSION_NAME = VERSION_NAME
+    LOCK_NAME = 'rc_cache'
+    STATS_NAME = 'Resource class cache'
+
+    def _reset(self):
         self.id_cache = {}
         self.str_cache = {}
         self.all_cache = {}
 
-    def clear(self):
-        with lockutils.lock(_LOCKNAME):
-            self.id_cache = {}
-            self.str_cache = {}
-            self.all_cache = {}
+    def _load(self, ctx):
+        id_cache = {}
+        str_cache = {}
+        all_cache = {}
+        for rec in ctx.tx.run(_LOAD_QUERY).data():
+            rc = db.pythonize(rec["rc"])
+            name = rc["name"]
+            id_cache[name] = rec["id"]
+            str_cache[rec["id"]] = name
+            all_cache[name] = {"id": rec["id"], "name": name,
+                               "created_at": rc.get("created_at"),
+                               "updated_at": rc.get("updated_at")}
+        self.id_cache = id_cache
+        self.str_cache = str_cache
+        self.all_cache = all_cache
+
+    def _lookup(self, cache_name, key):
+        self._current()
+        value = getattr(self, cache_name).get(key)
+        if value is not None:
+            self.stats.incr("hits")
+            return value
+        # The resource class may have been created by another process since
+        # the cache was last checked.
+        self.stats.incr("misses")
+        self.refresh()
+        value = getattr(self, cache_name).get(key)
+        if value is None:
+            raise exception.ResourceClassNotFound(resource_class=key)
+        return value
 
     def id_from_string(self, rc_str):
         """Given a string representation of a resource class -- e.g. "DISK_GB"
         or "CUSTOM_IRON_SILVER" -- return the integer code for the resource
-        class by doing a DB lookup into the resource_classes table; however,
-        the results of these DB lookups are cached since the lookups are so
-        frequent.
+        class.
 
         :param rc_str: The string representation of the resource class to look
                        up a numeric identifier for.
@@ -84,16 +108,7 @@ class ResourceClassCache(object):
         :raises `exception.ResourceClassNotFound` if rc_str cannot be found in
                 the DB.
         """
-        rc_id = self.id_cache.get(rc_str)
-        if rc_id is not None:
-            return rc_id
-
-        # Otherwise, check the database table
-        with lockutils.lock(_LOCKNAME):
-            _refresh_from_db(self.ctx, self)
-            if rc_str in self.id_cache:
-                return self.id_cache[rc_str]
-            raise exception.ResourceClassNotFound(resource_class=rc_str)
+        return self._lookup("id_cache", rc_str)
 
     def all_from_string(self, rc_str):
         """Given a string representation of a resource class -- e.g. "DISK_GB"
@@ -101,28 +116,17 @@ class ResourceClassCache(object):
 
         :param rc_str: The string representation of the resource class for
                        which to look up a resource_class.
-        :returns: dict representing the resource class fields, if the
-                  resource class was found in the resource_classes database
-                  table.
+        :returns: dict of the `id`, `name`, `created_at` and `updated_at` of
+                  the resource class.
         :raises: `exception.ResourceClassNotFound` if rc_str cannot be found in
                  the DB.
         """
-        rc_id_str = self.all_cache.get(rc_str)
-        if rc_id_str is not None:
-            return rc_id_str
-
-        # Otherwise, check the database table
-        with lockutils.lock(_LOCKNAME):
-            _refresh_from_db(self.ctx, self)
-            if rc_str in self.all_cache:
-                return self.all_cache[rc_str]
-            raise exception.ResourceClassNotFound(resource_class=rc_str)
+        return self._lookup("all_cache", rc_str)
 
     def string_from_id(self, rc_id):
         """The reverse of the id_from_string() method. Given a supplied numeric
         identifier for a resource class, we look up the corresponding string
-        representation, via a DB lookup. The results of these DB lookups are
-        cached since the lookups are so frequent.
+        representation.
 
         :param rc_id: The numeric representation of the resource class to look
                       up a string identifier for.
@@ -130,13 +134,26 @@ class ResourceClassCache(object):
         :raises `exception.ResourceClassNotFound` if rc_id cannot be found in
                 the DB.
         """
-        rc_str = self.str_cache.get(rc_id)
-        if rc_str is not None:
-            return rc_str
-
-        # Otherwise, check the database table
-        with lockutils.lock(_LOCKNAME):
-            _refresh_from_db(self.ctx, self)
-            if rc_id in self.str_cache:
-                return self.str_cache[rc_id]
-            raise exception.ResourceClassNotFound(resource_class=rc_id)
+        return self._lookup("str_cache", rc_id)
+
+    def unknown_names(self, names):
+        """Returns the set of the supplied resource class names that do not
+        exist. The database is only read when the cache is older than its
+        time to live, or when some name is not in it.
+        """
+        self._current()
+        unknown = set(names) - set(self.all_cache)
+        self.stats.incr("hits", len(set(names)) - len(unknown))
+        if unknown:
+            self.stats.incr("misses", len(unknown))
+            self.refresh()
+            unknown -= set(self.all_cache)
+        return unknown
+
+    def get_all(self):
+        """Returns a list of dicts of all the resource classes, as returned by
+        all_from_string().
+        """
+        self._current()
+        self.stats.incr("hits")
+        return list(self.all_cache.values())
@@ -19,6 +19,16 @@ import copy
 GROUP_PAT = r'[1-9][0-9]*'
 GROUP_PAT_1_33 = r'[a-zA-Z0-9_-]{1,64}'
 
+# Values accepted by the ``sort`` query parameter of GET
+# /allocation_candidates. The "pack" weighers prefer candidates that leave the
+# least free capacity behind (or that land on the largest trees), and the
+# "spread" weighers prefer the opposite.
+SORT_PACK = 'pack'
+SORT_SPREAD = 'spread'
+SORT_PACK_TREE = 'pack_tree'
+SORT_SPREAD_TREE = 'spread_tree'
+SORT_OPTIONS = (SORT_PACK, SORT_SPREAD, SORT_PACK_TREE, SORT_SPREAD_TREE)
+
 
 # Represents the allowed query string parameters to the GET
 # /allocation_candidates API call
@@ -94,3 +104,44 @@ _GROUP_PAT_FMT_1_33 = "^%s(" + GROUP_PAT_1_33 + ")?$"
 GET_SCHEMA_1_33["patternProperties"] = {
     _GROUP_PAT_FMT_1_33 % group_type: {"type": "string"}
     for group_type in ('resources', 'required', 'member_of', 'in_tree')}
+
+# Microversion 1.34 adds the sort parameter to order (and, with limit, select
+# the best N of) the allocation requests on the server.
+GET_SCHEMA_1_34 = copy.deepcopy(GET_SCHEMA_1_33)
+GET_SCHEMA_1_34["properties"]["sort"] = {
+    "type": "string",
+    "enum": list(SORT_OPTIONS),
+}
+
+# The body of POST /allocation_candidates/claim, added in microversion 1.35.
+# The candidate query itself is given in the query string, validated with the
+# same schema as GET /allocation_candidates.
+POST_CLAIM_SCHEMA_1_35 = {
+    "type": "object",
+    "properties": {
+        "consumer_uuid": {
+            "type": "string",
+            "format": "uuid",
+        },
+        "project_id": {
+            "type": "string",
+            "minLength": 1,
+            "maxLength": 255,
+        },
+        "user_id": {
+            "type": "string",
+            "minLength": 1,
+            "maxLength": 255,
+        },
+        "consumer_generation": {
+            "type": ["integer", "null"],
+        },
+    },
+    "required": [
+        "consumer_uuid",
+        "project_id",
+        "user_id",
+        "consumer_generation",
+    ],
+    "additionalProperties": False,
+}
@@ -0,0 +1,28 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Placement API schemas for the change log."""
+
+# Represents the allowed query string parameters to GET /changes
+GET_CHANGES_SCHEMA_1_42 = {
+    "type": "object",
+    "properties": {
+        "since": {
+            "type": "string",
+            "pattern": "^[0-9]+$",
+        },
+        "limit": {
+            "type": "string",
+            "pattern": "^[1-9][0-9]*$",
+        },
+    },
+    "additionalProperties": False,
+}
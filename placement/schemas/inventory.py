@@ -91,3 +91,25 @@ PUT_INVENTORY_SCHEMA = {
     ],
     "additionalProperties": False
 }
+
+
+# Represents the body of the `PUT /inventories` API added in microversion
+# 1.40: the generation and full set of inventories of each of many resource
+# providers, keyed by provider UUID.
+PUT_INVENTORIES_SCHEMA_1_40 = {
+    "type": "object",
+    "properties": {
+        "resource_providers": {
+            "type": "object",
+            "minProperties": 1,
+            "patternProperties": {
+                common.UUID_PATTERN: PUT_INVENTORY_SCHEMA,
+            },
+            "additionalProperties": False,
+        },
+    },
+    "required": [
+        "resource_providers",
+    ],
+    "additionalProperties": False
+}
@@ -107,6 +107,38 @@ GET_RPS_SCHEMA_1_18['properties']['required'] = {
     "type": "string",
 }
 
+# Microversion 1.38 adds the `limit` and `marker` query parameters to the
+# `GET /resource_providers` API. Providers are returned in UUID order, and
+# only those with a UUID after `marker` are included, up to `limit` of them.
+GET_RPS_SCHEMA_1_38 = copy.deepcopy(GET_RPS_SCHEMA_1_18)
+GET_RPS_SCHEMA_1_38['properties']['limit'] = {
+    "type": "string",
+    "pattern": "^[1-9][0-9]*$",
+}
+GET_RPS_SCHEMA_1_38['properties']['marker'] = {
+    "type": "string",
+    "format": "uuid",
+}
+
+# Represents the allowed query string parameters to the
+# `GET /export/resource_providers` API added in microversion 1.37.
+GET_EXPORT_SCHEMA_1_37 = {
+    "type": "object",
+    "properties": {
+        "resource_class": {
+            "type": "string",
+        },
+        "member_of": {
+            "type": "string",
+        },
+        "in_tree": {
+            "type": "string",
+            "format": "uuid",
+        },
+    },
+    "additionalProperties": False,
+}
+
 # Creating association relationships among resource providers, used to denote
 # sharing of resources.
 POST_RPS_ASSOCIATE = {
@@ -180,3 +212,16 @@ POST_RP_TREE = {
     ],
     "additionalProperties": False,
 }
+
+# Microversion 1.39 allows a list of trees to be created by one request to the
+# `POST /resource_tree` API.
+POST_RP_TREES_1_39 = {
+    "anyOf": [
+        POST_RP_TREE,
+        {
+            "type": "array",
+            "minItems": 1,
+            "items": POST_RP_TREE,
+        },
+    ],
+}
@@ -31,3 +31,47 @@ GET_USAGES_SCHEMA_1_9 = {
     ],
     "additionalProperties": False,
 }
+
+
+# The number of resource providers returned by POST /provider_summaries
+# when the body gives no limit, and the largest limit it may give.
+PROVIDER_SUMMARIES_DEFAULT_LIMIT = 500
+PROVIDER_SUMMARIES_MAX_LIMIT = 1000
+
+# Represents the body of POST /provider_summaries
+POST_PROVIDER_SUMMARIES_SCHEMA_1_36 = {
+    "type": "object",
+    "properties": {
+        "resource_providers": {
+            "type": "array",
+            "items": {
+                "type": "string",
+                "format": "uuid",
+            },
+            "uniqueItems": True,
+        },
+        "in_tree": {
+            "type": "string",
+            "format": "uuid",
+        },
+        "member_of": {
+            "type": "array",
+            "items": {
+                "type": "string",
+                "format": "uuid",
+            },
+            "minItems": 1,
+            "uniqueItems": True,
+        },
+        "limit": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": PROVIDER_SUMMARIES_MAX_LIMIT,
+        },
+        "marker": {
+            "type": "string",
+            "format": "uuid",
+        },
+    },
+    "additionalProperties": False,
+}
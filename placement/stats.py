@@ -0,0 +1,67 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Counts of the work that the caches and the write paths of a placement
+process did or saved, such as cache hits and misses or generation conflicts.
+
+Placement reports them in its log: each set of counters is logged at INFO,
+with all of its values, when it is incremented at least STATS_LOG_INTERVAL
+seconds after it was last logged.
+"""
+
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# The number of seconds between logs of the same set of counters.
+STATS_LOG_INTERVAL = 300
+
+
+class Counters(object):
+    """A named set of counters of this process, which may be incremented
+    from any thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+        self._logged = time.time()
+
+    def incr(self, key, count=1):
+        """Adds `count` to the counter named `key`, logging all of the
+        counters if they have not been logged for STATS_LOG_INTERVAL seconds.
+        """
+        counts = None
+        with self._lock:
+            self._counts[key] += count
+            now = time.time()
+            if now - self._logged >= STATS_LOG_INTERVAL:
+                self._logged = now
+                counts = dict(self._counts)
+        if counts is not None:
+            LOG.info("%(name)s statistics: %(counts)s",
+                     {"name": self.name,
+                      "counts": ", ".join("%s=%d" % item
+                                          for item in sorted(counts.items()))})
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._counts[key]
+
+    def get(self):
+        """Returns a dict of the counters."""
+        with self._lock:
+            return dict(self._counts)
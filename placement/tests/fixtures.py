@@ -28,6 +28,7 @@ from placement import deploy
 from placement.objects import resource_class
 from placement.objects import trait
 from placement import resource_class_cache as rc_cache
+from placement import trait_cache
 
 
 class Database(test_fixtures.GeneratesSchema, test_fixtures.AdHocDbFixture):
@@ -86,5 +87,8 @@ class Database(test_fixtures.GeneratesSchema, test_fixtures.AdHocDbFixture):
 
     def cleanup(self):
         trait._TRAITS_SYNCED = False
+        trait.clear_known_names()
         resource_class._RESOURCE_CLASSES_SYNCED = False
+        resource_class.clear_known_names()
         rc_cache.RC_CACHE = None
+        trait_cache.TRAIT_CACHE = None
@@ -14,6 +14,7 @@
 import mock
 from oslo_config import cfg
 from oslo_config import fixture as config_fixture
+from oslo_serialization import jsonutils
 from oslotest import output
 import six
 import testtools
@@ -52,7 +53,10 @@ class TestCommandParsers(testtools.TestCase):
                 ('db_sync', ['db', 'sync']),
                 ('db_stamp', ['db', 'stamp', 'b4ed3a175331']),
                 ('db_online_data_migrations',
-                 ['db', 'online_data_migrations'])]:
+                 ['db', 'online_data_migrations']),
+                ('db_usage_counters', ['db', 'usage_counters']),
+                ('db_export_providers', ['db', 'export_providers']),
+                ('db_compact_changes', ['db', 'compact_changes'])]:
             with mock.patch('placement.cmd.manage.DbCommands.' +
                             command) as mock_command:
                 self.conf(args, default_config_files=[])
@@ -102,10 +106,14 @@ class TestCommandParsers(testtools.TestCase):
         self.output.stderr.seek(0)
 
         if six.PY2:
-            self.assertIn('{sync,version,stamp,online_data_migrations}',
+            self.assertIn('{sync,version,stamp,online_data_migrations,'
+                          'usage_counters,export_providers,'
+                          'compact_changes}',
                           self.output.stderr.read())
         else:
-            self.assertIn('{sync,version,stamp,online_data_migrations}',
+            self.assertIn('{sync,version,stamp,online_data_migrations,'
+                          'usage_counters,export_providers,'
+                          'compact_changes}',
                           self.output.stdout.read())
 
 
@@ -224,3 +232,78 @@ Running batches of 50 until complete
             rm.return_value = {'mig': (10, 5)}, False
             commands = self._command_setup(max_count=5)
             self.assertEqual(1, commands.db_online_data_migrations())
+
+    def _usage_command_setup(self, rebuild=False):
+        command_list = ["db", "usage_counters"]
+        if rebuild:
+            command_list.append("--rebuild")
+        self.conf(command_list,
+                  project='placement',
+                  default_config_files=None)
+        return manage.DbCommands(self.conf)
+
+    @mock.patch('placement.objects.usage.verify_usage_counters',
+                return_value=[])
+    def test_usage_counters_verified(self, mock_verify):
+        command = self._usage_command_setup()
+        self.assertEqual(0, command.db_usage_counters())
+        mock_verify.assert_called_once()
+
+    @mock.patch('placement.objects.usage.verify_usage_counters')
+    def test_usage_counters_mismatch(self, mock_verify):
+        mock_verify.return_value = [
+            {'project_uuid': 'p', 'user_uuid': None,
+             'resource_class': 'VCPU', 'counted': 6, 'actual': 4}]
+        command = self._usage_command_setup()
+        self.assertEqual(1, command.db_usage_counters())
+        self.output.stdout.seek(0)
+        self.assertIn('--rebuild', self.output.stdout.read())
+
+    @mock.patch('placement.objects.usage.verify_usage_counters')
+    @mock.patch('placement.objects.usage.rebuild_usage_counters',
+                return_value=3)
+    def test_usage_counters_rebuild(self, mock_rebuild, mock_verify):
+        command = self._usage_command_setup(rebuild=True)
+        self.assertEqual(0, command.db_usage_counters())
+        mock_rebuild.assert_called_once()
+        mock_verify.assert_not_called()
+
+    @mock.patch('placement.objects.export.iter_providers')
+    def test_export_providers(self, mock_iter):
+        def providers():
+            yield {'uuid': 'rp1', 'inventories': {}}
+            yield {'uuid': 'rp2', 'inventories': {}}
+
+        mock_iter.return_value = providers()
+        self.conf(["db", "export_providers", "--resource-class", "VCPU",
+                   "--member-of", "agg1", "--member-of", "agg2"],
+                  project='placement', default_config_files=None)
+        command = manage.DbCommands(self.conf)
+        self.assertEqual(0, command.db_export_providers())
+        mock_iter.assert_called_once_with(
+            mock.ANY, resource_class='VCPU', required_aggs=[set(['agg1']),
+                                                  set(['agg2'])],
+            in_tree=None)
+        self.output.stdout.seek(0)
+        lines = self.output.stdout.read().splitlines()
+        self.assertEqual(['rp1', 'rp2'],
+                         [jsonutils.loads(line)['uuid'] for line in lines])
+
+    @mock.patch('placement.objects.change.compact', return_value=(4, 2))
+    def test_compact_changes(self, mock_compact):
+        self.conf(["db", "compact_changes"], project='placement',
+                  default_config_files=None)
+        command = manage.DbCommands(self.conf)
+        self.assertEqual(0, command.db_compact_changes())
+        mock_compact.assert_called_once_with(mock.ANY, 86400)
+        self.output.stdout.seek(0)
+        self.assertIn('Discarded 4 superseded and 2 expired changes',
+                      self.output.stdout.read())
+
+    @mock.patch('placement.objects.change.compact', return_value=(0, 0))
+    def test_compact_changes_max_age(self, mock_compact):
+        self.conf(["db", "compact_changes", "--max-age", "60"],
+                  project='placement', default_config_files=None)
+        command = manage.DbCommands(self.conf)
+        self.assertEqual(0, command.db_compact_changes())
+        mock_compact.assert_called_once_with(mock.ANY, 60)
@@ -25,9 +25,15 @@ from placement import context
 from placement import exception
 from placement.handlers import util
 from placement import microversion
-from placement.objects import consumer as consumer_obj
-from placement.objects import project as project_obj
-from placement.objects import user as user_obj
+
+
+def _version(major, minor):
+    mv_parsed = microversion_parse.Version(major, minor)
+    mv_parsed.max_version = microversion_parse.parse_version_string(
+        microversion.max_version_string())
+    mv_parsed.min_version = microversion_parse.parse_version_string(
+        microversion.min_version_string())
+    return mv_parsed
 
 
 class TestEnsureConsumer(testtools.TestCase):
@@ -36,185 +42,200 @@ class TestEnsureConsumer(testtools.TestCase):
         self.conf = cfg.ConfigOpts()
         self.useFixture(config_fixture.Config(self.conf))
         conf.register_opts(self.conf)
-        self.mock_project_get = self.useFixture(fixtures.MockPatch(
-            'placement.objects.project.'
-            'Project.get_by_uuid')).mock
-        self.mock_user_get = self.useFixture(fixtures.MockPatch(
-            'placement.objects.user.'
-            'User.get_by_uuid')).mock
-        self.mock_consumer_get = self.useFixture(fixtures.MockPatch(
+        self.mock_ensure = self.useFixture(fixtures.MockPatch(
             'placement.objects.consumer.'
-            'Consumer.get_by_uuid')).mock
-        self.mock_project_create = self.useFixture(fixtures.MockPatch(
-            'placement.objects.project.'
-            'Project.create')).mock
-        self.mock_user_create = self.useFixture(fixtures.MockPatch(
-            'placement.objects.user.'
-            'User.create')).mock
-        self.mock_consumer_create = self.useFixture(fixtures.MockPatch(
-            'placement.objects.consumer.'
-            'Consumer.create')).mock
+            'ensure_consumers')).mock
         self.ctx = context.RequestContext(user_id='fake', project_id='fake')
         self.ctx.config = self.conf
         self.consumer_id = uuidsentinel.consumer
         self.project_id = uuidsentinel.project
         self.user_id = uuidsentinel.user
-        mv_parsed = microversion_parse.Version(1, 27)
-        mv_parsed.max_version = microversion_parse.parse_version_string(
-            microversion.max_version_string())
-        mv_parsed.min_version = microversion_parse.parse_version_string(
-            microversion.min_version_string())
-        self.before_version = mv_parsed
-        mv_parsed = microversion_parse.Version(1, 28)
-        mv_parsed.max_version = microversion_parse.parse_version_string(
-            microversion.max_version_string())
-        mv_parsed.min_version = microversion_parse.parse_version_string(
-            microversion.min_version_string())
-        self.after_version = mv_parsed
+        self.before_version = _version(1, 27)
+        self.after_version = _version(1, 28)
+
+    def _assert_ensured(self, project_id, user_id, consumer_gen,
+                        check_generations):
+        self.mock_ensure.assert_called_once_with(
+            self.ctx,
+            [{
+                'consumer_uuid': self.consumer_id,
+                'project_uuid': project_id,
+                'user_uuid': user_id,
+                'generation': consumer_gen,
+            }],
+            check_generations=check_generations)
 
     def test_no_existing_project_user_consumer_before_gen_success(self):
         """Tests that we don't require a consumer_generation=None before the
         appropriate microversion.
         """
-        self.mock_project_get.side_effect = exception.NotFound
-        self.mock_user_get.side_effect = exception.NotFound
-        self.mock_consumer_get.side_effect = exception.NotFound
+        self.mock_ensure.return_value = {self.consumer_id: (0, True)}
 
         consumer_gen = 1  # should be ignored
-        util.ensure_consumer(
+        consumer, created = util.ensure_consumer(
             self.ctx, self.consumer_id, self.project_id, self.user_id,
             consumer_gen, self.before_version)
 
-        self.mock_project_get.assert_called_once_with(
-            self.ctx, self.project_id)
-        self.mock_user_get.assert_called_once_with(
-            self.ctx, self.user_id)
-        self.mock_consumer_get.assert_called_once_with(
-            self.ctx, self.consumer_id)
-        self.mock_project_create.assert_called_once()
-        self.mock_user_create.assert_called_once()
-        self.mock_consumer_create.assert_called_once()
+        self._assert_ensured(self.project_id, self.user_id, consumer_gen,
+                             False)
+        self.assertTrue(created)
+        self.assertEqual(0, consumer.generation)
+        self.assertEqual(self.project_id, consumer.project.uuid)
+        self.assertEqual(self.user_id, consumer.user.uuid)
 
     def test_no_existing_project_user_consumer_after_gen_success(self):
         """Tests that we require a consumer_generation=None after the
         appropriate microversion.
         """
-        self.mock_project_get.side_effect = exception.NotFound
-        self.mock_user_get.side_effect = exception.NotFound
-        self.mock_consumer_get.side_effect = exception.NotFound
+        self.mock_ensure.return_value = {self.consumer_id: (0, True)}
 
         consumer_gen = None  # should NOT be ignored (and None is expected)
-        util.ensure_consumer(
+        consumer, created = util.ensure_consumer(
             self.ctx, self.consumer_id, self.project_id, self.user_id,
             consumer_gen, self.after_version)
 
-        self.mock_project_get.assert_called_once_with(
-            self.ctx, self.project_id)
-        self.mock_user_get.assert_called_once_with(
-            self.ctx, self.user_id)
-        self.mock_consumer_get.assert_called_once_with(
-            self.ctx, self.consumer_id)
-        self.mock_project_create.assert_called_once()
-        self.mock_user_create.assert_called_once()
-        self.mock_consumer_create.assert_called_once()
+        self._assert_ensured(self.project_id, self.user_id, consumer_gen,
+                             True)
+        self.assertTrue(created)
 
     def test_no_existing_project_user_consumer_after_gen_fail(self):
         """Tests that we require a consumer_generation=None after the
         appropriate microversion and that None is the expected value.
         """
-        self.mock_project_get.side_effect = exception.NotFound
-        self.mock_user_get.side_effect = exception.NotFound
-        self.mock_consumer_get.side_effect = exception.NotFound
+        self.mock_ensure.side_effect = exception.ConsumerGenerationConflict(
+            expected_gen='null', got_gen=1)
 
         consumer_gen = 1  # should NOT be ignored (and 1 is not expected)
-        self.assertRaises(
+        exc = self.assertRaises(
             webob.exc.HTTPConflict,
             util.ensure_consumer,
             self.ctx, self.consumer_id, self.project_id, self.user_id,
             consumer_gen, self.after_version)
+        self.assertIn('consumer generation conflict - '
+                      'expected null but got 1', str(exc))
 
     def test_no_existing_project_user_consumer_use_incomplete(self):
         """Verify that if the project_id arg is None, that we fall back to the
         CONF options for incomplete project and user UUID.
         """
-        self.mock_project_get.side_effect = exception.NotFound
-        self.mock_user_get.side_effect = exception.NotFound
-        self.mock_consumer_get.side_effect = exception.NotFound
+        self.mock_ensure.return_value = {self.consumer_id: (0, True)}
 
         consumer_gen = None  # should NOT be ignored (and None is expected)
         util.ensure_consumer(
             self.ctx, self.consumer_id, None, None,
             consumer_gen, self.before_version)
 
-        self.mock_project_get.assert_called_once_with(
-            self.ctx, self.conf.placement.incomplete_consumer_project_id)
-        self.mock_user_get.assert_called_once_with(
-            self.ctx, self.conf.placement.incomplete_consumer_user_id)
-        self.mock_consumer_get.assert_called_once_with(
-            self.ctx, self.consumer_id)
-        self.mock_project_create.assert_called_once()
-        self.mock_user_create.assert_called_once()
-        self.mock_consumer_create.assert_called_once()
-
-    def test_existing_project_no_existing_consumer_before_gen_success(self):
-        """Check that if we find an existing project and user, that we use
-        those found objects in creating the consumer. Do not require a consumer
-        generation before the appropriate microversion.
-        """
-        proj = project_obj.Project(self.ctx, uuid=self.project_id)
-        self.mock_project_get.return_value = proj
-        user = user_obj.User(self.ctx, uuid=self.user_id)
-        self.mock_user_get.return_value = user
-        self.mock_consumer_get.side_effect = exception.NotFound
-
-        consumer_gen = None  # should be ignored
-        util.ensure_consumer(
-            self.ctx, self.consumer_id, self.project_id, self.user_id,
-            consumer_gen, self.before_version)
-
-        self.mock_project_create.assert_not_called()
-        self.mock_user_create.assert_not_called()
-        self.mock_consumer_create.assert_called_once()
+        self._assert_ensured(
+            self.conf.placement.incomplete_consumer_project_id,
+            self.conf.placement.incomplete_consumer_user_id,
+            consumer_gen, False)
 
     def test_existing_consumer_after_gen_matches_supplied_gen(self):
         """Tests that we require a consumer_generation after the
         appropriate microversion and that when the consumer already exists,
         then we ensure a matching generation is supplied
         """
-        proj = project_obj.Project(self.ctx, uuid=self.project_id)
-        self.mock_project_get.return_value = proj
-        user = user_obj.User(self.ctx, uuid=self.user_id)
-        self.mock_user_get.return_value = user
-        consumer = consumer_obj.Consumer(
-            self.ctx, project=proj, user=user, generation=2)
-        self.mock_consumer_get.return_value = consumer
+        self.mock_ensure.return_value = {self.consumer_id: (2, False)}
 
         consumer_gen = 2  # should NOT be ignored (and 2 is expected)
-        util.ensure_consumer(
+        consumer, created = util.ensure_consumer(
             self.ctx, self.consumer_id, self.project_id, self.user_id,
             consumer_gen, self.after_version)
 
-        self.mock_project_create.assert_not_called()
-        self.mock_user_create.assert_not_called()
-        self.mock_consumer_create.assert_not_called()
+        self._assert_ensured(self.project_id, self.user_id, consumer_gen,
+                             True)
+        self.assertFalse(created)
+        self.assertEqual(2, consumer.generation)
 
     def test_existing_consumer_after_gen_fail(self):
         """Tests that we require a consumer_generation after the
         appropriate microversion and that when the consumer already exists,
-        then we raise a 400 when there is a mismatch on the existing
+        then we raise a 409 when there is a mismatch on the existing
         generation.
         """
-        proj = project_obj.Project(self.ctx, uuid=self.project_id)
-        self.mock_project_get.return_value = proj
-        user = user_obj.User(self.ctx, uuid=self.user_id)
-        self.mock_user_get.return_value = user
-        consumer = consumer_obj.Consumer(
-            self.ctx, project=proj, user=user, generation=42)
-        self.mock_consumer_get.return_value = consumer
+        self.mock_ensure.side_effect = exception.ConsumerGenerationConflict(
+            expected_gen=42, got_gen=2)
 
         consumer_gen = 2  # should NOT be ignored (and 2 is NOT expected)
-        self.assertRaises(
+        exc = self.assertRaises(
             webob.exc.HTTPConflict,
             util.ensure_consumer,
             self.ctx, self.consumer_id, self.project_id, self.user_id,
             consumer_gen, self.after_version)
+        self.assertIn('consumer generation conflict - '
+                      'expected 42 but got 2', str(exc))
+
+
+class TestEnsureConsumers(testtools.TestCase):
+    def setUp(self):
+        super(TestEnsureConsumers, self).setUp()
+        self.conf = cfg.ConfigOpts()
+        self.useFixture(config_fixture.Config(self.conf))
+        conf.register_opts(self.conf)
+        self.mock_ensure = self.useFixture(fixtures.MockPatch(
+            'placement.objects.consumer.'
+            'ensure_consumers')).mock
+        self.ctx = context.RequestContext(user_id='fake', project_id='fake')
+        self.ctx.config = self.conf
+        self.data = {
+            uuidsentinel.consumer1: {
+                'project_id': uuidsentinel.project,
+                'user_id': uuidsentinel.user,
+                'consumer_generation': None,
+            },
+            uuidsentinel.consumer2: {
+                'project_id': uuidsentinel.project,
+                'user_id': uuidsentinel.user,
+                'consumer_generation': 3,
+            },
+        }
+        self.mock_ensure.return_value = {
+            uuidsentinel.consumer1: (0, True),
+            uuidsentinel.consumer2: (3, False),
+        }
+        self.before_version = _version(1, 27)
+        self.after_version = _version(1, 28)
+
+    def test_after_gen_success(self):
+        consumers, created = util.ensure_consumers(
+            self.ctx, self.data, self.after_version)
+
+        self.mock_ensure.assert_called_once()
+        records = self.mock_ensure.call_args[0][1]
+        self.assertEqual(
+            set([uuidsentinel.consumer1, uuidsentinel.consumer2]),
+            set(rec['consumer_uuid'] for rec in records))
+        self.assertTrue(self.mock_ensure.call_args[1]['check_generations'])
+        self.assertEqual(0, consumers[uuidsentinel.consumer1].generation)
+        self.assertEqual(3, consumers[uuidsentinel.consumer2].generation)
+        self.assertEqual(uuidsentinel.project,
+                         consumers[uuidsentinel.consumer2].project.uuid)
+        self.assertEqual([uuidsentinel.consumer1], [c.uuid for c in created])
+
+    def test_after_gen_conflict(self):
+        self.mock_ensure.side_effect = exception.ConsumerGenerationConflict(
+            expected_gen=4, got_gen=3)
+
+        self.assertRaises(
+            webob.exc.HTTPConflict,
+            util.ensure_consumers,
+            self.ctx, self.data, self.after_version)
+
+    def test_before_gen_skips_generation_check(self):
+        util.ensure_consumers(self.ctx, self.data, self.before_version)
+
+        self.mock_ensure.assert_called_once()
+        self.assertFalse(self.mock_ensure.call_args[1]['check_generations'])
+
+    def test_use_incomplete(self):
+        self.data[uuidsentinel.consumer1]['project_id'] = None
+        self.data[uuidsentinel.consumer1]['user_id'] = None
+
+        consumers, _ = util.ensure_consumers(
+            self.ctx, self.data, self.before_version)
+
+        consumer = consumers[uuidsentinel.consumer1]
+        self.assertEqual(self.conf.placement.incomplete_consumer_project_id,
+                         consumer.project.uuid)
+        self.assertEqual(self.conf.placement.incomplete_consumer_user_id,
+                         consumer.user.uuid)
@@ -20,8 +20,9 @@ from placement import context
 from placement import resource_class_cache as rc_cache
 
 
-def fake_ensure_cache(ctxt):
+def fake_ensure_cache(ctxt, ttl=None):
     rc_cache.RC_CACHE = mock.MagicMock()
+    return rc_cache.RC_CACHE
 
 
 class TestCase(testtools.TestCase):
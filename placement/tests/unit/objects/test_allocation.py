@@ -16,8 +16,11 @@ from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import timeutils
 import six
 
+from placement import exception
 from placement.objects import allocation as alloc_obj
+from placement.objects import change as change_obj
 from placement.objects import resource_provider as rp_obj
+from placement.objects import usage as usage_obj
 from placement.tests.unit.objects import base
 
 
@@ -104,3 +107,316 @@ class TestAllocationListNoDB(base.TestCase):
                          allocations[0].created_at)
         self.assertEqual(_ALLOCATION_BY_CONSUMER_DB['updated_at'],
                          allocations[0].updated_at)
+
+    @mock.patch('placement.objects.allocation.'
+                '_get_allocations_by_consumer_uuids')
+    def test_get_all_by_consumer_ids(self, mock_get_allocations_from_db):
+        other = dict(_ALLOCATION_BY_CONSUMER_DB,
+                     consumer_uuid=uuids.other_consumer,
+                     resource_class_name='OTHER')
+        mock_get_allocations_from_db.return_value = [
+            _ALLOCATION_BY_CONSUMER_DB, _ALLOCATION_BY_CONSUMER_DB, other]
+        consumer_ids = [uuids.consumer, uuids.other_consumer, uuids.none]
+
+        allocations = alloc_obj.get_all_by_consumer_ids(
+            self.context, consumer_ids)
+
+        mock_get_allocations_from_db.assert_called_once_with(
+            self.context, consumer_ids)
+        self.assertEqual(set([uuids.consumer, uuids.other_consumer]),
+                         set(allocations))
+        self.assertEqual(2, len(allocations[uuids.consumer]))
+        # Allocations of the same consumer share one Consumer object.
+        self.assertIs(allocations[uuids.consumer][0].consumer,
+                      allocations[uuids.consumer][1].consumer)
+        self.assertEqual('OTHER',
+                         allocations[uuids.other_consumer][0].resource_class)
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations')
+    def test_claim_first_available(self, mock_set, mock_reload):
+        first = [mock.sentinel.first]
+        second = [mock.sentinel.second]
+        mock_set.side_effect = [
+            exception.InvalidAllocationCapacityExceeded(
+                resource_class='VCPU', resource_provider=uuids.rp1),
+            None,
+        ]
+        claimed = alloc_obj.claim_first_available(
+            self.context, [first, second])
+
+        self.assertEqual(second, claimed)
+        mock_set.assert_has_calls([
+            mock.call(self.context, first),
+            mock.call(self.context, second)])
+        self.assertEqual(2, mock_reload.call_count)
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations',
+                side_effect=exception.ResourceProviderConcurrentUpdateDetected)
+    def test_claim_first_available_exhausted(self, mock_set, mock_reload):
+        candidates = [[mock.sentinel.alloc]] * (
+            alloc_obj.CLAIM_ATTEMPT_COUNT + 5)
+        self.assertRaises(
+            exception.ResourceProviderConcurrentUpdateDetected,
+            alloc_obj.claim_first_available, self.context, candidates)
+        self.assertEqual(alloc_obj.CLAIM_ATTEMPT_COUNT, mock_set.call_count)
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations',
+                side_effect=exception.ConcurrentUpdateDetected)
+    def test_claim_first_available_consumer_conflict(self, mock_set,
+                                                     mock_reload):
+        # A consumer generation conflict affects every candidate equally, so
+        # it is raised at once rather than trying the next candidate.
+        self.assertRaises(
+            exception.ConcurrentUpdateDetected,
+            alloc_obj.claim_first_available, self.context,
+            [[mock.sentinel.first], [mock.sentinel.second]])
+        self.assertEqual(1, mock_set.call_count)
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestSetAllocationsNoDB(base.TestCase):
+
+    def setUp(self):
+        super(TestSetAllocationsNoDB, self).setUp()
+        self.context.tx = mock.Mock()
+        self.rp = rp_obj.ResourceProvider(
+            self.context, uuid=uuids.rp, generation=3)
+        self.consumer = mock.Mock(uuid=uuids.consumer, generation=1,
+                                  project=mock.Mock(uuid=uuids.project),
+                                  user=mock.Mock(uuid=uuids.user))
+        self.allocs = [
+            alloc_obj.Allocation(resource_provider=self.rp,
+                                 consumer=self.consumer,
+                                 resource_class=rc, used=used)
+            for rc, used in (('VCPU', 2), ('MEMORY_MB', 1024), ('DISK_GB', 0))
+        ]
+
+    def _set_result(self, num_rps=1, num_consumers=1, num_created=2):
+        self.context.tx.run.return_value.data.return_value = [{
+            'released': [{'project_uuid': uuids.project,
+                          'user_uuid': uuids.user,
+                          'resource_class': 'VCPU',
+                          'used': 1,
+                          'rp_uuid': uuids.old_rp}],
+            'num_created': num_created,
+            'num_rps': num_rps,
+            'num_consumers': num_consumers,
+        }]
+
+    @mock.patch('placement.objects.allocation._check_capacity_exceeded')
+    def test_single_write_statement(self, mock_check, mock_active):
+        mock_check.return_value = {self.rp.uuid: self.rp}
+        self._set_result()
+        alloc_obj._set_allocations(self.context, self.allocs)
+
+        # Every allocation is written by the one statement, followed by one
+        # statement to update the usage counters and one to record the
+        # changes.
+        self.assertEqual(3, self.context.tx.run.call_count)
+        self.context.tx.run.assert_any_call(
+            alloc_obj._WRITE_ALLOCATIONS_QUERY,
+            consumer_uuids=[uuids.consumer],
+            allocs=[
+                {'rp_uuid': uuids.rp, 'rc_name': 'VCPU',
+                 'consumer_uuid': uuids.consumer,
+                 'project_uuid': uuids.project, 'user_uuid': uuids.user,
+                 'used': 2},
+                {'rp_uuid': uuids.rp, 'rc_name': 'MEMORY_MB',
+                 'consumer_uuid': uuids.consumer,
+                 'project_uuid': uuids.project, 'user_uuid': uuids.user,
+                 'used': 1024},
+            ],
+            rps=[{'uuid': uuids.rp, 'generation': 3}],
+            consumers=[{'uuid': uuids.consumer, 'generation': 1}])
+        # The released VCPU is netted against the new claim.
+        self.context.tx.run.assert_any_call(
+            usage_obj._ADJUST_USAGES_QUERY,
+            deltas=[
+                {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+                 'resource_class': 'MEMORY_MB', 'used': 1024},
+                {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+                 'resource_class': 'VCPU', 'used': 1},
+            ])
+        self.assertEqual(4, self.rp.generation)
+        self.assertEqual(2, self.consumer.generation)
+        # The provider that only lost allocations has no new generation.
+        self.context.tx.run.assert_called_with(
+            change_obj._RECORD_CHANGES_QUERY,
+            changes=[
+                {'resource_type': 'resource_provider', 'uuid': uuid,
+                 'event': 'allocations', 'generation': generation}
+                for uuid, generation in sorted([(uuids.rp, 4),
+                                                (uuids.old_rp, None)])
+            ] + [
+                {'resource_type': 'consumer', 'uuid': uuids.consumer,
+                 'event': 'allocations', 'generation': 2},
+            ])
+
+    @mock.patch('placement.objects.allocation._check_capacity_exceeded')
+    def test_provider_generation_conflict(self, mock_check, mock_active):
+        mock_check.return_value = {self.rp.uuid: self.rp}
+        self._set_result(num_rps=0)
+        self.assertRaises(exception.ResourceProviderConcurrentUpdateDetected,
+                          alloc_obj._set_allocations, self.context,
+                          self.allocs)
+        self.assertEqual(3, self.rp.generation)
+
+    @mock.patch('placement.objects.allocation._check_capacity_exceeded')
+    def test_consumer_generation_conflict(self, mock_check, mock_active):
+        mock_check.return_value = {self.rp.uuid: self.rp}
+        self._set_result(num_consumers=0)
+        exc = self.assertRaises(exception.ConcurrentUpdateDetected,
+                                alloc_obj._set_allocations, self.context,
+                                self.allocs)
+        self.assertNotIsInstance(
+            exc, exception.ResourceProviderConcurrentUpdateDetected)
+
+    @mock.patch('placement.objects.allocation._check_capacity_exceeded')
+    def test_allocation_not_created(self, mock_check, mock_active):
+        # The inventory or consumer of an allocation went away after the
+        # capacity check, so the usage counters are left alone.
+        mock_check.return_value = {self.rp.uuid: self.rp}
+        self._set_result(num_created=1)
+        self.assertRaises(exception.ConcurrentUpdateDetected,
+                          alloc_obj._set_allocations, self.context,
+                          self.allocs)
+        self.assertEqual(1, self.context.tx.run.call_count)
+        self.assertEqual(3, self.rp.generation)
+
+
+class TestClaimCoordinator(base.TestCase):
+
+    def setUp(self):
+        super(TestClaimCoordinator, self).setUp()
+        self.coordinator = alloc_obj.ClaimCoordinator()
+
+    @staticmethod
+    def _allocs(consumer_uuid):
+        return [alloc_obj.Allocation(
+            resource_provider=mock.Mock(uuid=uuids.rp),
+            consumer=mock.Mock(uuid=consumer_uuid),
+            resource_class='DISK_GB', used=10)]
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations')
+    def test_submit_combines_queued_writes(self, mock_set, mock_reload):
+        first = self._allocs(uuids.consumer1)
+        second = self._allocs(uuids.consumer2)
+        # Simulate a write queued by another thread while this one was
+        # arriving.
+        queued = alloc_obj._ClaimRequest(self.context, first)
+        self.coordinator._pending.append(queued)
+
+        self.coordinator.submit(self.context, second)
+
+        mock_set.assert_called_once_with(self.context, first + second)
+        self.assertTrue(queued.done.is_set())
+        self.assertIsNone(queued.exc)
+        stats = self.coordinator.stats.get()
+        self.assertEqual(1, stats['batches'])
+        self.assertEqual(2, stats['combined'])
+        self.assertFalse(self.coordinator._combining)
+
+    @mock.patch('placement.objects.allocation._replace_all')
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations',
+                side_effect=exception.InvalidAllocationCapacityExceeded(
+                    resource_class='DISK_GB', resource_provider=uuids.rp))
+    def test_failed_combined_write_is_split(self, mock_set, mock_reload,
+                                            mock_replace):
+        first = self._allocs(uuids.consumer1)
+        second = self._allocs(uuids.consumer2)
+        exc = exception.InvalidAllocationCapacityExceeded(
+            resource_class='DISK_GB', resource_provider=uuids.rp)
+        mock_replace.side_effect = [None, exc]
+        queued = alloc_obj._ClaimRequest(self.context, first)
+        self.coordinator._pending.append(queued)
+
+        # Only the second write fails once they are written separately.
+        raised = self.assertRaises(
+            exception.InvalidAllocationCapacityExceeded,
+            self.coordinator.submit, self.context, second)
+        self.assertIs(exc, raised)
+        self.assertIsNone(queued.exc)
+        mock_replace.assert_has_calls([
+            mock.call(self.context, first), mock.call(self.context, second)])
+        self.assertEqual(1, self.coordinator.stats.get()['combine_failures'])
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations')
+    def test_combiner_stops_after_own_write(self, mock_set, mock_reload):
+        self.conf_fixture.config(allocation_write_batch_size=1,
+                                 group='placement')
+        queued = alloc_obj._ClaimRequest(
+            self.context, self._allocs(uuids.consumer1))
+        later = alloc_obj._ClaimRequest(
+            self.context, self._allocs(uuids.consumer3))
+        self.coordinator._pending.append(queued)
+
+        def arrive(context, allocs):
+            # Another write is queued while the combiner is busy.
+            if later not in self.coordinator._pending:
+                self.coordinator._pending.append(later)
+
+        mock_set.side_effect = arrive
+        self.coordinator.submit(self.context, self._allocs(uuids.consumer2))
+
+        self.assertTrue(queued.done.is_set())
+        # The later write is handed over to its own caller.
+        self.assertFalse(later.done.is_set())
+        self.assertTrue(later.wakeup.is_set())
+        self.assertEqual([later], self.coordinator._pending)
+        self.assertFalse(self.coordinator._combining)
+
+    @mock.patch('placement.objects.allocation._reload_providers')
+    @mock.patch('placement.objects.allocation._set_allocations')
+    def test_killed_combiner_requeues(self, mock_set, mock_reload):
+        class Killed(BaseException):
+            pass
+
+        mock_set.side_effect = Killed
+        queued = alloc_obj._ClaimRequest(
+            self.context, self._allocs(uuids.consumer1))
+        self.coordinator._pending.append(queued)
+
+        self.assertRaises(Killed, self.coordinator.submit, self.context,
+                          self._allocs(uuids.consumer2))
+
+        self.assertFalse(self.coordinator._combining)
+        self.assertEqual([queued], self.coordinator._pending)
+        self.assertFalse(queued.done.is_set())
+        self.assertTrue(queued.wakeup.is_set())
+
+    @mock.patch.object(alloc_obj, 'CLAIM_WAIT_TIMEOUT', 0)
+    @mock.patch('placement.objects.allocation._replace_all')
+    def test_write_withdrawn_from_stuck_combiner(self, mock_replace):
+        # Another caller is combining, but does not take this write in time.
+        self.coordinator._combining = True
+        allocs = self._allocs(uuids.consumer1)
+
+        self.coordinator.submit(self.context, allocs)
+
+        mock_replace.assert_called_once_with(self.context, allocs)
+        self.assertEqual([], self.coordinator._pending)
+        self.assertEqual(1, self.coordinator.stats.get()['withdrawn'])
+
+    def test_group_keeps_same_consumer_apart(self):
+        reqs = [alloc_obj._ClaimRequest(self.context, self._allocs(consumer))
+                for consumer in (uuids.consumer1, uuids.consumer1,
+                                 uuids.consumer2)]
+        groups = self.coordinator._group(reqs)
+        self.assertEqual([[reqs[0], reqs[2]], [reqs[1]]], groups)
+
+    @mock.patch('placement.objects.allocation._replace_all')
+    @mock.patch.object(alloc_obj._CLAIM_COORDINATOR, 'submit')
+    def test_replace_all_uses_coordinator(self, mock_submit, mock_replace):
+        self.conf_fixture.config(combine_allocation_writes=True,
+                                 group='placement')
+        allocs = self._allocs(uuids.consumer1)
+        alloc_obj.replace_all(self.context, allocs)
+        mock_submit.assert_called_once_with(self.context, allocs)
+        self.assertFalse(mock_replace.called)
@@ -45,3 +45,48 @@ class TestAllocationCandidatesNoDB(base.TestCase):
             self.context, aro_in, sum_in, 2)
         self.assertEqual(aro_in[:2], aro)
         self.assertEqual(set([sum1, sum0, sum4, sum8, sum5]), set(sum))
+
+    def _sort_fixtures(self):
+        # Three single-provider candidates for one VCPU, on providers with
+        # differing amounts of free capacity.
+        rps = [mock.Mock(uuid=uuid) for uuid in ('rp1', 'rp2', 'rp3')]
+        sum_in = []
+        for rp, used in zip(rps, (2, 7, 4)):
+            psr = allocation_candidate.ProviderSummaryResource(
+                resource_class='VCPU', capacity=8, used=used, max_unit=8)
+            sum_in.append(allocation_candidate.ProviderSummary(
+                resource_provider=rp, resources=[psr]))
+        aro_in = [
+            allocation_candidate.AllocationRequest(
+                anchor_root_provider_uuid=rp.uuid,
+                resource_requests=[
+                    allocation_candidate.AllocationRequestResource(
+                        resource_provider=rp, resource_class='VCPU',
+                        amount=1)])
+            for rp in rps]
+        return aro_in, sum_in
+
+    def test_limit_results_sort_pack(self):
+        aro_in, sum_in = self._sort_fixtures()
+        aro, sum = allocation_candidate.AllocationCandidates._limit_results(
+            self.context, aro_in, sum_in, None, sort='pack')
+        self.assertEqual([aro_in[1], aro_in[2], aro_in[0]], aro)
+        self.assertEqual(sum_in, sum)
+
+    def test_limit_results_sort_spread_with_limit(self):
+        aro_in, sum_in = self._sort_fixtures()
+        aro, sum = allocation_candidate.AllocationCandidates._limit_results(
+            self.context, aro_in, sum_in, 2, sort='spread')
+        self.assertEqual([aro_in[0], aro_in[2]], aro)
+        self.assertEqual([sum_in[0], sum_in[2]], sum)
+
+    @mock.patch.object(allocation_candidate, '_get_tree_sizes',
+                       return_value={'rp1': 1, 'rp2': 1, 'rp3': 3})
+    def test_limit_results_sort_pack_tree(self, mock_sizes):
+        aro_in, sum_in = self._sort_fixtures()
+        aro, sum = allocation_candidate.AllocationCandidates._limit_results(
+            self.context, aro_in, sum_in, 2, sort='pack_tree')
+        # The largest tree first, then ties broken by least free capacity.
+        self.assertEqual([aro_in[2], aro_in[1]], aro)
+        mock_sizes.assert_called_once_with(
+            self.context, set(['rp1', 'rp2', 'rp3']))
@@ -0,0 +1,84 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from placement.objects import catalogue
+from placement.objects import resource_class
+from placement.objects import trait
+from placement.tests.unit.objects import base
+
+NAMES = ['HW_CPU_X86_AVX', 'HW_CPU_X86_SSE']
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestCatalogueSync(base.TestCase):
+
+    def setUp(self):
+        super(TestCatalogueSync, self).setUp()
+        self.context.tx = mock.Mock()
+        self.data = self.context.tx.run.return_value.data
+
+    def test_stamp(self, mock_active):
+        self.assertEqual(catalogue.stamp(NAMES),
+                         catalogue.stamp(reversed(NAMES)))
+        self.assertNotEqual(catalogue.stamp(NAMES),
+                            catalogue.stamp(NAMES[:1]))
+
+    def test_unchanged(self, mock_active):
+        self.data.return_value = [{'stamp': catalogue.stamp(NAMES)}]
+        self.assertEqual(0, catalogue.sync(self.context, 'os_traits',
+                                           'TRAIT', NAMES))
+        # Only the stamp was read; no lock was taken.
+        self.context.tx.run.assert_called_once_with(
+            catalogue._STAMP_QUERY, name='os_traits')
+
+    def test_synced_by_another_process(self, mock_active):
+        self.data.side_effect = [[{'stamp': None}],
+                                 [{'stamp': catalogue.stamp(NAMES)}]]
+        self.assertEqual(0, catalogue.sync(self.context, 'os_traits',
+                                           'TRAIT', NAMES))
+        self.assertEqual(2, self.context.tx.run.call_count)
+        self.context.tx.run.assert_called_with(
+            catalogue._LOCK_QUERY, name='os_traits')
+
+    def test_sync(self, mock_active):
+        self.data.side_effect = [[{'stamp': 'old'}], [{'stamp': 'old'}],
+                                 [{'existing': 1}], []]
+        self.assertEqual(1, catalogue.sync(self.context, 'os_traits',
+                                           'TRAIT', NAMES))
+        calls = self.context.tx.run.call_args_list
+        self.assertEqual(4, len(calls))
+        self.assertIn('MERGE (node:TRAIT {name: name})', calls[2][0][0])
+        self.assertEqual(NAMES, calls[2][1]['names'])
+        self.assertEqual(mock.call(catalogue._SET_STAMP_QUERY,
+                                   name='os_traits',
+                                   stamp=catalogue.stamp(NAMES)), calls[3])
+
+    @mock.patch('placement.trait_cache.bump_version')
+    @mock.patch('placement.objects.catalogue.sync', return_value=3)
+    def test_trait_sync(self, mock_sync, mock_bump, mock_active):
+        trait._trait_sync(self.context)
+        mock_sync.assert_called_once_with(self.context, 'os_traits', 'TRAIT',
+                                          mock.ANY)
+        mock_bump.assert_called_once_with(self.context)
+
+    @mock.patch('placement.resource_class_cache.bump_version')
+    @mock.patch('placement.objects.catalogue.sync', return_value=0)
+    def test_resource_classes_sync_unchanged(self, mock_sync, mock_bump,
+                                             mock_active):
+        resource_class._resource_classes_sync(self.context)
+        mock_sync.assert_called_once_with(
+            self.context, 'os_resource_classes', 'RESOURCE_CLASS', mock.ANY)
+        mock_bump.assert_not_called()
@@ -0,0 +1,133 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+
+from placement import exception
+from placement.objects import change as change_obj
+from placement.tests.unit.objects import base
+
+
+def _change(sequence, uuid, event=change_obj.TRAITS, generation=None):
+    return {"change": {"sequence": sequence,
+                       "resource_type": change_obj.RESOURCE_PROVIDER,
+                       "uuid": uuid, "event": event,
+                       "generation": generation, "created_at": 12345}}
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestChanges(base.TestCase):
+
+    def setUp(self):
+        super(TestChanges, self).setUp()
+        self.context.tx = mock.Mock()
+
+    def test_record(self, mock_active):
+        change_obj.record(self.context, [
+            (change_obj.RESOURCE_PROVIDER, uuids.rp, change_obj.CREATED, 0),
+            (change_obj.CONSUMER, uuids.cs, change_obj.DELETED, None)])
+        self.context.tx.run.assert_called_once_with(
+            change_obj._RECORD_CHANGES_QUERY, changes=[
+                {"resource_type": "resource_provider", "uuid": uuids.rp,
+                 "event": "created", "generation": 0},
+                {"resource_type": "consumer", "uuid": uuids.cs,
+                 "event": "deleted", "generation": None}])
+
+    def test_record_before_commit(self, mock_active):
+        self.context.before_commit_callbacks = []
+        change_obj.record(self.context, [
+            (change_obj.CONSUMER, uuids.cs, change_obj.DELETED, None)])
+        # The changes wait for the end of the transaction.
+        self.context.tx.run.assert_not_called()
+        self.context.before_commit_callbacks.pop()()
+        self.context.tx.run.assert_called_once_with(
+            change_obj._RECORD_CHANGES_QUERY, changes=[
+                {"resource_type": "consumer", "uuid": uuids.cs,
+                 "event": "deleted", "generation": None}])
+
+    @mock.patch('placement.db.graph_db.ensure_index')
+    @mock.patch('placement.db.graph_db.ensure_uniqueness_constraint')
+    def test_ensure_sequence(self, mock_constraint, mock_index, mock_active):
+        change_obj.ensure_sequence(self.context)
+        self.assertEqual([mock.call("CHANGE_SEQUENCE", "name"),
+                          mock.call("CHANGE", "sequence")],
+                         mock_constraint.call_args_list)
+        mock_index.assert_called_once_with("CHANGE", "created_at")
+        self.context.tx.run.assert_called_once_with(
+            change_obj._CREATE_SEQUENCE_QUERY)
+
+    def test_record_nothing(self, mock_active):
+        change_obj.record(self.context, [])
+        self.context.tx.run.assert_not_called()
+
+    def test_get_since_none(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {"last": 42, "horizon": 0}]
+        self.assertEqual(([], 42), change_obj.get_since(self.context))
+        self.context.tx.run.assert_called_once_with(
+            change_obj._SEQUENCE_QUERY)
+
+    def test_get_since(self, mock_active):
+        self.context.tx.run.return_value.data.side_effect = [
+            [{"last": 42, "horizon": 10}],
+            [_change(12, uuids.rp1, generation=4), _change(40, uuids.rp2)]]
+        changes, last = change_obj.get_since(self.context, since=10)
+        self.assertEqual(42, last)
+        self.assertEqual([
+            {"sequence": 12, "resource_type": "resource_provider",
+             "uuid": uuids.rp1, "event": "traits", "generation": 4},
+            {"sequence": 40, "resource_type": "resource_provider",
+             "uuid": uuids.rp2, "event": "traits", "generation": None},
+        ], changes)
+        query = self.context.tx.run.call_args[0][0]
+        self.assertNotIn("LIMIT", query)
+        self.assertEqual(42, self.context.tx.run.call_args[1]["last"])
+
+    def test_get_since_limit(self, mock_active):
+        self.context.tx.run.return_value.data.side_effect = [
+            [{"last": 42, "horizon": 0}],
+            [_change(12, uuids.rp1), _change(20, uuids.rp2)]]
+        changes, last = change_obj.get_since(self.context, since=10, limit=2)
+        # The client continues after the last change it was given, not after
+        # the latest sequence number.
+        self.assertEqual(20, last)
+        self.assertEqual(2, len(changes))
+        self.assertIn("LIMIT {limit}", self.context.tx.run.call_args[0][0])
+
+    def test_get_since_limit_not_reached(self, mock_active):
+        self.context.tx.run.return_value.data.side_effect = [
+            [{"last": 42, "horizon": 0}], [_change(12, uuids.rp1)]]
+        changes, last = change_obj.get_since(self.context, since=10, limit=2)
+        self.assertEqual(42, last)
+        self.assertEqual(1, len(changes))
+
+    def test_get_since_expired(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {"last": 42, "horizon": 30}]
+        self.assertRaises(exception.ChangesExpired,
+                          change_obj.get_since, self.context, since=29)
+        self.assertEqual(1, self.context.tx.run.call_count)
+
+    def test_compact(self, mock_active):
+        self.context.tx.run.return_value.data.side_effect = [
+            [{"deleted": 5}], [{"deleted": 2}]]
+        self.assertEqual((5, 2), change_obj.compact(self.context, 60))
+        self.assertEqual(
+            60000, self.context.tx.run.call_args_list[1][1]["max_age"])
+
+    def test_compact_no_sequence(self, mock_active):
+        self.context.tx.run.return_value.data.side_effect = [
+            [{"deleted": 0}], []]
+        self.assertEqual((0, 0), change_obj.compact(self.context, 60))
@@ -0,0 +1,84 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import fixtures
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+
+from placement.objects import inventory as inv_obj
+from placement.objects import resource_provider as rp_obj
+from placement.objects import trait as trait_obj
+from placement import stats
+from placement.tests.unit.objects import base
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestConditionalWrites(base.TestCase):
+
+    def setUp(self):
+        super(TestConditionalWrites, self).setUp()
+        self.context.tx = mock.Mock()
+        self.rp = rp_obj.ResourceProvider(self.context, uuid=uuids.rp,
+                                          generation=3)
+        self.useFixture(fixtures.MockPatchObject(
+            rp_obj, 'SKIPPED_WRITES', stats.Counters('Skipped write')))
+
+    @mock.patch('placement.objects.resource_class.unknown_names',
+                return_value=set())
+    def test_set_inventory_unchanged(self, mock_names, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {'uuid': uuids.rp, 'generation': 3, 'inventories': [
+                {'resource_class': 'VCPU', 'used': 2,
+                 'inventory': {'total': 8, 'reserved': 0, 'min_unit': 1,
+                               'max_unit': 8, 'step_size': 1,
+                               'allocation_ratio': 1.0,
+                               'updated_at': 12345}}]}]
+        inv = inv_obj.Inventory(
+            resource_provider=self.rp, resource_class='VCPU', total=8,
+            reserved=0, min_unit=1, max_unit=8, step_size=1,
+            allocation_ratio=1.0)
+        self.assertEqual([], rp_obj._set_inventory(self.context, self.rp,
+                                                    [inv]))
+        # Only the current inventory was read.
+        self.context.tx.run.assert_called_once_with(
+            rp_obj._INVENTORY_STATE_QUERY, uuids=[uuids.rp])
+        self.assertEqual(3, self.rp.generation)
+        self.assertEqual(1, rp_obj.SKIPPED_WRITES['inventory'])
+
+    @mock.patch('placement.objects.resource_provider.'
+                '_get_aggregates_by_provider')
+    def test_set_aggregates_unchanged(self, mock_get, mock_active):
+        mock_get.return_value = [uuids.agg1, uuids.agg2]
+        with mock.patch.object(self.rp, 'increment_generation') as mock_inc:
+            rp_obj._set_aggregates(self.context, self.rp,
+                                   [uuids.agg2, uuids.agg1],
+                                   increment_generation=True)
+        mock_inc.assert_not_called()
+        self.context.tx.run.assert_not_called()
+        self.assertEqual(1, rp_obj.SKIPPED_WRITES['aggregates'])
+
+    @mock.patch('placement.objects.trait._traits_from_props',
+                return_value=['HW_CPU_X86_AVX2'])
+    def test_set_traits_unchanged(self, mock_traits, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {'props': ['uuid', 'name', 'generation', 'HW_CPU_X86_AVX2']}]
+        traits = [trait_obj.Trait(self.context, name='HW_CPU_X86_AVX2')]
+        with mock.patch.object(self.rp, 'increment_generation') as mock_inc:
+            rp_obj._set_traits(self.context, self.rp, traits)
+        mock_inc.assert_not_called()
+        # Only the existing traits were read.
+        self.assertEqual(1, self.context.tx.run.call_count)
+        mock_traits.assert_called_once_with(
+            self.context, ['uuid', 'name', 'generation', 'HW_CPU_X86_AVX2'])
+        self.assertEqual(1, rp_obj.SKIPPED_WRITES['traits'])
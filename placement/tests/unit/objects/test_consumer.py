@@ -0,0 +1,89 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+
+from placement import exception
+from placement.objects import consumer as consumer_obj
+from placement.tests.unit.objects import base
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestEnsureConsumersNoDB(base.TestCase):
+
+    def setUp(self):
+        super(TestEnsureConsumersNoDB, self).setUp()
+        self.context.tx = mock.Mock()
+
+    def _set_result(self, generation, created):
+        self.context.tx.run.return_value.data.return_value = [{
+            'uuid': uuids.consumer,
+            'generation': generation,
+            'created': created,
+        }]
+
+    def test_single_statement(self, mock_active):
+        self._set_result(0, True)
+        result = consumer_obj.ensure_consumer(
+            self.context, uuids.consumer, uuids.project, uuids.user,
+            check_generation=True)
+
+        self.assertEqual((0, True), result)
+        self.context.tx.run.assert_called_once_with(
+            consumer_obj._ENSURE_CONSUMERS_QUERY,
+            records=[{
+                'consumer_uuid': uuids.consumer,
+                'project_uuid': uuids.project,
+                'user_uuid': uuids.user,
+                'generation': None,
+            }])
+
+    def test_existing_consumer_generation_matches(self, mock_active):
+        self._set_result(4, False)
+        result = consumer_obj.ensure_consumer(
+            self.context, uuids.consumer, uuids.project, uuids.user,
+            generation=4, check_generation=True)
+
+        self.assertEqual((4, False), result)
+
+    def test_existing_consumer_generation_conflict(self, mock_active):
+        self._set_result(4, False)
+        exc = self.assertRaises(
+            exception.ConsumerGenerationConflict,
+            consumer_obj.ensure_consumer,
+            self.context, uuids.consumer, uuids.project, uuids.user,
+            generation=3, check_generation=True)
+        self.assertEqual(
+            'consumer generation conflict - expected 4 but got 3',
+            exc.format_message())
+
+    def test_new_consumer_expects_null(self, mock_active):
+        self._set_result(0, True)
+        exc = self.assertRaises(
+            exception.ConsumerGenerationConflict,
+            consumer_obj.ensure_consumer,
+            self.context, uuids.consumer, uuids.project, uuids.user,
+            generation=0, check_generation=True)
+        self.assertEqual(
+            'consumer generation conflict - expected null but got 0',
+            exc.format_message())
+
+    def test_generation_not_checked(self, mock_active):
+        self._set_result(4, False)
+        result = consumer_obj.ensure_consumer(
+            self.context, uuids.consumer, uuids.project, uuids.user,
+            generation=1)
+
+        self.assertEqual((4, False), result)
@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import fixtures
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+import testtools
+
+from placement.objects import export as export_obj
+from placement.tests.unit.objects import base
+
+
+def _record(**kwargs):
+    record = {
+        'rp': {'uuid': uuids.rp, 'name': 'rp', 'generation': 3,
+               'HW_CPU_X86_AVX2': True, 'created_at': 12345},
+        'parent_uuid': None,
+        'root_uuid': None,
+        'inventories': [
+            {'resource_class': 'VCPU', 'used': 2,
+             'inventory': {'total': 8, 'reserved': 0, 'min_unit': 1,
+                           'max_unit': 8, 'step_size': 1,
+                           'allocation_ratio': 16.0, 'updated_at': 12345}},
+        ],
+        'aggregates': [uuids.agg2, uuids.agg1],
+    }
+    record.update(kwargs)
+    return record
+
+
+class TestExportRecord(testtools.TestCase):
+
+    def test_export_record(self):
+        result = export_obj._export_record(_record(), ['HW_CPU_X86_AVX2'])
+        self.assertEqual({
+            'uuid': uuids.rp,
+            'name': 'rp',
+            'generation': 3,
+            'parent_provider_uuid': None,
+            'root_provider_uuid': uuids.rp,
+            'inventories': {
+                'VCPU': {'total': 8, 'reserved': 0, 'min_unit': 1,
+                         'max_unit': 8, 'step_size': 1,
+                         'allocation_ratio': 16.0},
+            },
+            'usages': {'VCPU': 2},
+            'traits': ['HW_CPU_X86_AVX2'],
+            'aggregates': sorted([uuids.agg1, uuids.agg2]),
+        }, result)
+
+    def test_export_record_child(self):
+        result = export_obj._export_record(
+            _record(parent_uuid=uuids.parent, root_uuid=uuids.root,
+                    inventories=[], aggregates=[]), [])
+        self.assertEqual(uuids.parent, result['parent_provider_uuid'])
+        self.assertEqual(uuids.root, result['root_provider_uuid'])
+        self.assertEqual({}, result['inventories'])
+        self.assertEqual([], result['traits'])
+
+
+class TestExportQuery(testtools.TestCase):
+
+    def test_no_filters(self):
+        query = export_obj._export_query()
+        self.assertNotIn('WHERE ANY', query)
+        self.assertNotIn('{in_tree}', query)
+
+    def test_filters(self):
+        query = export_obj._export_query(
+            resource_class='VCPU', required_aggs=[set([uuids.agg1])],
+            forbidden_aggs=set([uuids.agg2]), in_tree=uuids.rp)
+        self.assertIn('{in_tree}', query)
+        self.assertIn('{resource_class}', query)
+        self.assertIn('{required_aggs}', query)
+        self.assertIn('{forbidden_aggs}', query)
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestIterProviders(base.TestCase):
+
+    def setUp(self):
+        super(TestIterProviders, self).setUp()
+        self.context.tx = mock.Mock()
+        self.trait_cache = self.useFixture(fixtures.MockPatch(
+            'placement.trait_cache.ensure')).mock.return_value
+        self.trait_cache.traits_from_props.side_effect = (
+            lambda props: [prop for prop in props if prop.isupper()])
+
+    def _set_pages(self, *pages):
+        self.context.tx.run.return_value.data.side_effect = [
+            [_record(rp={'uuid': rp_uuid, 'HW_CPU_X86_AVX2': True})
+             for rp_uuid in page]
+            for page in pages]
+
+    def test_pages(self, mock_active):
+        self._set_pages([uuids.rp1, uuids.rp2], [uuids.rp3])
+        result = list(export_obj.iter_providers(
+            self.context, required_aggs=[set([uuids.agg1])], page_size=2))
+
+        self.assertEqual([uuids.rp1, uuids.rp2, uuids.rp3],
+                         [provider['uuid'] for provider in result])
+        self.assertEqual([['HW_CPU_X86_AVX2']] * 3,
+                         [provider['traits'] for provider in result])
+        self.assertEqual(2, self.context.tx.run.call_count)
+        first, second = self.context.tx.run.call_args_list
+        self.assertNotIn('{marker}', first[0][0])
+        self.assertIsNone(first[1]['marker'])
+        self.assertIn('rp.uuid > {marker}', second[0][0])
+        self.assertEqual(uuids.rp2, second[1]['marker'])
+        self.assertEqual(2, second[1]['limit'])
+        self.assertEqual([[uuids.agg1]], second[1]['required_aggs'])
+
+    def test_full_last_page(self, mock_active):
+        # A page as long as page_size may not be the last.
+        self._set_pages([uuids.rp1, uuids.rp2], [])
+        result = list(export_obj.iter_providers(self.context, page_size=2))
+        self.assertEqual(2, len(result))
+        self.assertEqual(2, self.context.tx.run.call_count)
+
+    def test_close_early(self, mock_active):
+        self._set_pages([uuids.rp1, uuids.rp2], [uuids.rp3])
+        providers = export_obj.iter_providers(self.context, page_size=2)
+        next(providers)
+        providers.close()
+        # The next page is never read.
+        self.assertEqual(1, self.context.tx.run.call_count)
+
+    @mock.patch('placement.db.graph_db.get_connection')
+    def test_pages_read_in_one_transaction(self, mock_cxn, mock_active):
+        # The export begins the transaction, and each page joins it.
+        mock_active.side_effect = [False, True, True]
+        tx = mock_cxn.return_value.begin.return_value
+        tx.finished.return_value = False
+        tx.run.return_value.data.side_effect = [
+            [_record(rp={'uuid': uuids.rp1}), _record(rp={'uuid': uuids.rp2})],
+            [_record(rp={'uuid': uuids.rp3})]]
+
+        result = list(export_obj.iter_providers(self.context, page_size=2))
+
+        self.assertEqual(3, len(result))
+        mock_cxn.return_value.begin.assert_called_once_with()
+        self.assertEqual(2, tx.run.call_count)
+        tx.rollback.assert_called_once_with()
@@ -10,13 +10,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
 import mock
 import os_resource_classes as orc
 from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import timeutils
 
+from placement import exception
+from placement.objects import change as change_obj
 from placement.objects import inventory
 from placement.objects import resource_provider
+from placement import stats
 from placement.tests.unit.objects import base
 
 
@@ -130,3 +134,159 @@ class TestListOfInventory(base.TestCase):
 
         # Use an invalid string...
         self.assertIsNone(inventory.find(inv_list, 'HOUSE'))
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+@mock.patch('placement.objects.resource_class.unknown_names',
+            return_value=set())
+class TestSetInventoriesNoDB(base.TestCase):
+
+    def setUp(self):
+        super(TestSetInventoriesNoDB, self).setUp()
+        self.context.tx = mock.Mock()
+        self.rp1 = resource_provider.ResourceProvider(self.context,
+                                                      uuid=uuids.rp1)
+        self.rp2 = resource_provider.ResourceProvider(self.context,
+                                                      uuid=uuids.rp2)
+
+    def _inv(self, rp, resource_class, total):
+        return inventory.Inventory(
+            resource_provider=rp, resource_class=resource_class,
+            total=total, reserved=0, min_unit=1, max_unit=total,
+            step_size=1, allocation_ratio=1.0)
+
+    def _state(self, uuid, generation, inventories):
+        return {
+            'uuid': uuid,
+            'generation': generation,
+            'inventories': [
+                {'resource_class': rc,
+                 'inventory': {'total': total, 'reserved': 0, 'min_unit': 1,
+                               'max_unit': total, 'step_size': 1,
+                               'allocation_ratio': 1.0},
+                 'used': used}
+                for rc, total, used in inventories],
+        }
+
+    def _run_results(self, state, incremented=None):
+        state_result = mock.Mock()
+        state_result.data.return_value = state
+        other_result = mock.Mock()
+        other_result.data.return_value = [{'uuid': uuid}
+                                          for uuid in incremented or []]
+        self.context.tx.run.side_effect = (
+            lambda query, **kw: state_result
+            if query == resource_provider._INVENTORY_STATE_QUERY
+            else other_result)
+
+    def _queries(self):
+        return [call[0][0] for call in self.context.tx.run.call_args_list]
+
+    def test_unchanged_providers_skipped(self, mock_names, mock_active):
+        self._run_results([
+            self._state(uuids.rp1, 3, [('VCPU', 8, 0), ('DISK_GB', 100, 0)]),
+            self._state(uuids.rp2, 5, [('VCPU', 8, 2)]),
+        ])
+        generations = resource_provider.set_inventories(self.context, {
+            uuids.rp1: (3, [self._inv(self.rp1, 'VCPU', 8),
+                            self._inv(self.rp1, 'DISK_GB', 100)]),
+            uuids.rp2: (5, [self._inv(self.rp2, 'VCPU', 8)]),
+        })
+        self.assertEqual({uuids.rp1: 3, uuids.rp2: 5}, generations)
+        # Only the read was needed.
+        self.assertEqual([resource_provider._INVENTORY_STATE_QUERY],
+                         self._queries())
+
+    def test_changes_batched(self, mock_names, mock_active):
+        self._run_results([
+            self._state(uuids.rp1, 3, [('VCPU', 8, 0), ('DISK_GB', 100, 0)]),
+            self._state(uuids.rp2, 5, [('VCPU', 8, 2)]),
+        ], incremented=[uuids.rp1, uuids.rp2])
+        generations = resource_provider.set_inventories(self.context, {
+            uuids.rp1: (3, [self._inv(self.rp1, 'VCPU', 16),
+                            self._inv(self.rp1, 'MEMORY_MB', 1024)]),
+            uuids.rp2: (5, [self._inv(self.rp2, 'VCPU', 16),
+                            self._inv(self.rp2, 'MEMORY_MB', 2048)]),
+        })
+        self.assertEqual({uuids.rp1: 4, uuids.rp2: 6}, generations)
+        queries = self._queries()
+        self.assertEqual(6, len(queries))
+        self.assertEqual([resource_provider._INVENTORY_STATE_QUERY,
+                          resource_provider._DELETE_INVENTORIES_QUERY,
+                          resource_provider._UPDATE_INVENTORIES_QUERY],
+                         queries[:3])
+        self.assertIn(':`MEMORY_MB`', queries[3])
+        self.assertEqual([resource_provider._INCREMENT_GENERATIONS_QUERY,
+                          change_obj._RECORD_CHANGES_QUERY],
+                         queries[4:])
+        calls = self.context.tx.run.call_args_list
+        self.assertEqual([{'uuid': uuids.rp1, 'resource_class': 'DISK_GB'}],
+                         calls[1][1]['rows'])
+        self.assertEqual(2, len(calls[2][1]['rows']))
+        self.assertEqual(2, len(calls[3][1]['rows']))
+        self.assertEqual(
+            sorted([(uuids.rp1, 4), (uuids.rp2, 6)]),
+            sorted((change['uuid'], change['generation'])
+                   for change in calls[5][1]['changes']))
+
+    def test_generation_conflict(self, mock_names, mock_active):
+        self._run_results([self._state(uuids.rp1, 4, [('VCPU', 8, 0)])])
+        self.assertRaises(
+            exception.ResourceProviderConcurrentUpdateDetected,
+            resource_provider.set_inventories, self.context,
+            {uuids.rp1: (3, [self._inv(self.rp1, 'VCPU', 16)])})
+        self.assertEqual(1, self.context.tx.run.call_count)
+
+    def test_concurrent_update(self, mock_names, mock_active):
+        self._run_results([self._state(uuids.rp1, 3, [('VCPU', 8, 0)])],
+                          incremented=[])
+        self.assertRaises(
+            exception.ResourceProviderConcurrentUpdateDetected,
+            resource_provider.set_inventories, self.context,
+            {uuids.rp1: (3, [self._inv(self.rp1, 'VCPU', 16)])})
+
+    def test_missing_provider(self, mock_names, mock_active):
+        self._run_results([self._state(uuids.rp1, 3, [])])
+        self.assertRaises(
+            exception.ResourceProviderNotFound,
+            resource_provider.set_inventories, self.context,
+            {uuids.rp1: (3, []),
+             uuids.rp2: (0, [self._inv(self.rp2, 'VCPU', 8)])})
+
+    def test_label_escaped(self, mock_names, mock_active):
+        self._run_results([self._state(uuids.rp1, 3, [])],
+                          incremented=[uuids.rp1])
+        resource_provider.set_inventories(self.context, {
+            uuids.rp1: (3, [self._inv(self.rp1, 'CUSTOM_A`B', 8)])})
+        self.assertIn(':`CUSTOM_A``B`)', self._queries()[1])
+
+    def test_delete_in_use(self, mock_names, mock_active):
+        self._run_results([self._state(uuids.rp1, 3, [('VCPU', 8, 2)])])
+        self.assertRaises(
+            exception.InventoryInUse,
+            resource_provider.set_inventories, self.context,
+            {uuids.rp1: (3, [])})
+        self.assertEqual(1, self.context.tx.run.call_count)
+
+    def test_unknown_resource_class(self, mock_names, mock_active):
+        mock_names.return_value = set(['CUSTOM_PONY'])
+        self.assertRaises(
+            exception.ResourceClassNotFound,
+            resource_provider.set_inventories, self.context,
+            {uuids.rp1: (3, [self._inv(self.rp1, 'CUSTOM_PONY', 8)])})
+        self.context.tx.run.assert_not_called()
+
+    def test_unchanged_providers_counted(self, mock_names, mock_active):
+        self.useFixture(fixtures.MockPatchObject(
+            resource_provider, 'SKIPPED_WRITES',
+            stats.Counters('Skipped write')))
+        self._run_results([
+            self._state(uuids.rp1, 3, [('VCPU', 8, 0)]),
+            self._state(uuids.rp2, 5, [('VCPU', 8, 0)]),
+        ], incremented=[uuids.rp2])
+        resource_provider.set_inventories(self.context, {
+            uuids.rp1: (3, [self._inv(self.rp1, 'VCPU', 8)]),
+            uuids.rp2: (5, [self._inv(self.rp2, 'VCPU', 16)]),
+        })
+        self.assertEqual(1, resource_provider.SKIPPED_WRITES['inventory'])
@@ -10,8 +10,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
+import mock
+
 from placement import exception
 from placement.objects import resource_class
+from placement import resource_class_cache as rc_cache
 from placement.tests.unit.objects import base
 
 
@@ -27,3 +31,57 @@ class TestResourceClass(base.TestCase):
         rc = resource_class.ResourceClass(self.context)
         exc = self.assertRaises(exception.ObjectActionError, rc.create)
         self.assertIn('name is required', str(exc))
+
+
+class TestUnknownNames(base.TestCase):
+
+    def setUp(self):
+        super(TestUnknownNames, self).setUp()
+        rc_cache.RC_CACHE = None
+        self.addCleanup(setattr, rc_cache, 'RC_CACHE', None)
+        self.useFixture(fixtures.MockPatch(
+            'placement.versioned_cache.get_version', return_value=1))
+
+    def _load(self, names):
+        def load(ctx, cache):
+            cache.all_cache = {name: {'name': name, 'created_at': None,
+                                      'updated_at': None}
+                               for name in names}
+            cache.version = 1
+        return load
+
+    @mock.patch('placement.versioned_cache._refresh_from_db')
+    def test_unknown_names(self, mock_load):
+        mock_load.side_effect = self._load(['VCPU', 'DISK_GB'])
+        self.assertEqual(set(), resource_class.unknown_names(
+            self.context, ['VCPU']))
+        self.assertEqual(set(['CUSTOM_GOLD']), resource_class.unknown_names(
+            self.context, ['CUSTOM_GOLD', 'DISK_GB']))
+        self.assertEqual(set(), resource_class.unknown_names(
+            self.context, ['DISK_GB', 'VCPU']))
+        # The request with a name that was not known only checked whether
+        # the resource classes had changed, which they had not.
+        self.assertEqual(1, mock_load.call_count)
+
+    @mock.patch('placement.objects.resource_class.ResourceClass._destroy')
+    @mock.patch('placement.versioned_cache._refresh_from_db')
+    def test_destroy_forgets_names(self, mock_load, mock_destroy):
+        mock_load.side_effect = self._load(['CUSTOM_GOLD'])
+        resource_class.unknown_names(self.context, ['CUSTOM_GOLD'])
+        resource_class.ResourceClass(self.context,
+                                     name='CUSTOM_GOLD').destroy()
+        mock_load.side_effect = self._load([])
+        self.assertEqual(set(['CUSTOM_GOLD']), resource_class.unknown_names(
+            self.context, ['CUSTOM_GOLD']))
+
+    @mock.patch('placement.versioned_cache._refresh_from_db')
+    def test_get_all(self, mock_load):
+        mock_load.side_effect = self._load(['VCPU', 'DISK_GB'])
+        self.assertEqual(['DISK_GB', 'VCPU'], [
+            rc.name for rc in resource_class.get_all(self.context)])
+        self.assertEqual('VCPU', resource_class.ResourceClass.get_by_name(
+            self.context, 'VCPU').name)
+        self.assertRaises(exception.ResourceClassNotFound,
+                          resource_class.ResourceClass.get_by_name,
+                          self.context, 'CUSTOM_GOLD')
+        self.assertEqual(1, mock_load.call_count)
@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+
+from placement.objects import change as change_obj
+from placement.objects import resource_provider as rp_obj
+from placement.tests.unit.objects import base
+
+
+def _vf(total):
+    return {"name": "SRIOV_NET_VF", "total": total}
+
+
+def _host(uuid, pf_uuids):
+    return {
+        "name": "host-%s" % uuid,
+        "uuid": uuid,
+        "type": "ComputeNode",
+        "resources": [{"name": "VCPU", "total": 8, "allocation_ratio": 16}],
+        "traits": ["HW_CPU_X86_AVX2"],
+        "children": [{
+            "name": "numa-%s" % uuid,
+            "resources": [],
+            "traits": [],
+            "children": [{"name": "pf-%s" % pf_uuid, "uuid": pf_uuid,
+                          "resources": [_vf(8)], "traits": []}
+                         for pf_uuid in pf_uuids],
+        }],
+    }
+
+
+class TestFlattenTrees(base.TestCase):
+
+    def test_flatten(self):
+        levels = rp_obj._flatten_trees([
+            _host(uuids.host1, [uuids.pf1, uuids.pf2]),
+            _host(uuids.host2, [uuids.pf3]),
+        ])
+        self.assertEqual(3, len(levels))
+        roots, numas, pfs = levels
+        self.assertEqual([uuids.host1, uuids.host2],
+                         [row["uuid"] for row in roots])
+        self.assertEqual([None, None],
+                         [row["parent_uuid"] for row in roots])
+        self.assertEqual({"uuid": uuids.host1, "generation": 0,
+                          "name": "host-%s" % uuids.host1,
+                          "provider_type": "ComputeNode",
+                          "HW_CPU_X86_AVX2": True}, roots[0]["props"])
+        self.assertEqual([{"resource_class": "VCPU",
+                           "inventory": {"total": 8, "reserved": 0,
+                                         "min_unit": 1, "max_unit": 8,
+                                         "step_size": 1,
+                                         "allocation_ratio": 16}}],
+                         roots[0]["inventories"])
+        # The NUMA nodes have no UUID, so one is generated.
+        self.assertEqual([uuids.host1, uuids.host2],
+                         [row["parent_uuid"] for row in numas])
+        self.assertTrue(all(row["uuid"] for row in numas))
+        self.assertEqual([numas[0]["uuid"], numas[0]["uuid"],
+                          numas[1]["uuid"]],
+                         [row["parent_uuid"] for row in pfs])
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestCreateTrees(base.TestCase):
+
+    def setUp(self):
+        super(TestCreateTrees, self).setUp()
+        self.context.tx = mock.Mock()
+
+    def test_statements_per_level(self, mock_active):
+        hosts = [_host(getattr(uuids, "host%d" % i),
+                       [getattr(uuids, "pf%d" % i)]) for i in range(50)]
+        root_uuids = [host["uuid"] for host in hosts]
+        self.context.tx.run.return_value.data.return_value = [
+            {"rp": {"uuid": uuid}} for uuid in reversed(root_uuids)]
+
+        roots = rp_obj._create_trees(self.context, hosts)
+
+        # Three levels of providers and two resource classes, however many
+        # hosts there are, plus recording the changes and reading back the
+        # roots.
+        self.assertEqual(7, self.context.tx.run.call_count)
+        calls = self.context.tx.run.call_args_list
+        self.assertEqual(rp_obj._CREATE_ROOTS_QUERY, calls[0][0][0])
+        self.assertEqual(50, len(calls[0][1]["rows"]))
+        self.assertEqual(rp_obj._CREATE_CHILDREN_QUERY, calls[1][0][0])
+        self.assertEqual(rp_obj._CREATE_CHILDREN_QUERY, calls[2][0][0])
+        self.assertIn(":`SRIOV_NET_VF`", calls[3][0][0])
+        self.assertIn(":`VCPU`", calls[4][0][0])
+        self.assertEqual(50, len(calls[4][1]["rows"]))
+        self.assertEqual(change_obj._RECORD_CHANGES_QUERY, calls[5][0][0])
+        self.assertEqual(sum(len(calls[i][1]["rows"]) for i in range(3)),
+                         len(calls[5][1]["changes"]))
+        # The roots are returned in the order of the trees.
+        self.assertEqual(root_uuids, [rp["uuid"] for rp in roots])
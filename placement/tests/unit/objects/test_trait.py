@@ -10,9 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
 import mock
 
 from placement.objects import trait
+from placement import trait_cache
 from placement.tests.unit.objects import base
 
 
@@ -26,3 +28,72 @@ class TestTraits(base.TestCase):
         trait.ensure_sync(self.context)
         synced = trait._TRAITS_SYNCED
         self.assertTrue(synced)
+
+
+class TestUnknownNames(base.TestCase):
+
+    def setUp(self):
+        super(TestUnknownNames, self).setUp()
+        trait_cache.TRAIT_CACHE = None
+        self.addCleanup(setattr, trait_cache, 'TRAIT_CACHE', None)
+        self.useFixture(fixtures.MockPatch(
+            'placement.versioned_cache.get_version', return_value=1))
+        self.names = []
+        self.mock_load = self.useFixture(fixtures.MockPatch(
+            'placement.versioned_cache._refresh_from_db',
+            side_effect=self._load)).mock
+
+    def _load(self, ctx, cache):
+        cache.all_cache = {name: {'name': name, 'created_at': None,
+                                  'updated_at': None}
+                           for name in self.names}
+        cache.names = frozenset(self.names)
+        cache.version = 1
+
+    def test_known_names_not_reloaded(self):
+        self.names = ['HW_CPU_X86_AVX', 'CUSTOM_GOLD']
+        self.assertEqual(set(), trait.unknown_names(
+            self.context, ['HW_CPU_X86_AVX']))
+        self.assertEqual(set(), trait.unknown_names(
+            self.context, ['CUSTOM_GOLD', 'HW_CPU_X86_AVX']))
+        self.assertEqual(1, self.mock_load.call_count)
+
+    def test_unknown_name_not_reloaded_unless_changed(self):
+        self.names = ['HW_CPU_X86_AVX']
+        self.assertEqual(set(['CUSTOM_GOLD']), trait.unknown_names(
+            self.context, ['CUSTOM_GOLD', 'HW_CPU_X86_AVX']))
+        self.assertEqual(1, self.mock_load.call_count)
+
+    @mock.patch('placement.objects.trait.Trait._destroy_in_db')
+    def test_destroy_forgets_names(self, mock_destroy):
+        self.names = ['CUSTOM_GOLD']
+        trait.unknown_names(self.context, ['CUSTOM_GOLD'])
+        trait.Trait(self.context, name='CUSTOM_GOLD').destroy()
+        self.names = []
+        self.assertEqual(set(['CUSTOM_GOLD']), trait.unknown_names(
+            self.context, ['CUSTOM_GOLD']))
+
+    def test_get_all(self):
+        self.names = ['HW_CPU_X86_AVX', 'CUSTOM_GOLD', 'CUSTOM_SILVER']
+        self.assertEqual(
+            ['CUSTOM_GOLD', 'CUSTOM_SILVER', 'HW_CPU_X86_AVX'],
+            [t.name for t in trait.get_all(self.context)])
+        filters = {'prefix': 'CUSTOM_',
+                   'name_in': ['CUSTOM_SILVER', 'HW_CPU_X86_AVX']}
+        self.assertEqual(['CUSTOM_SILVER'], [
+            t.name for t in trait.get_all(self.context, filters)])
+        self.assertEqual('CUSTOM_GOLD', trait.Trait.get_by_name(
+            self.context, 'CUSTOM_GOLD').name)
+        self.assertEqual(1, self.mock_load.call_count)
+
+    @mock.patch('placement.objects.trait._get_all_from_db', return_value=[])
+    def test_get_all_associated(self, mock_get):
+        trait.get_all(self.context, {'associated': True})
+        mock_get.assert_called_once_with(self.context, {'associated': True})
+        self.mock_load.assert_not_called()
+
+    def test_traits_from_props(self):
+        self.names = ['HW_CPU_X86_AVX']
+        self.assertEqual(['HW_CPU_X86_AVX'], trait._traits_from_props(
+            self.context, ['uuid', 'HW_CPU_X86_AVX', 'generation']))
+        self.assertEqual(1, self.mock_load.call_count)
@@ -12,10 +12,14 @@
 
 import decimal
 
+import mock
 import os_resource_classes as orc
+from oslo_utils.fixture import uuidsentinel as uuids
 import testtools
 
+from placement.objects import change as change_obj
 from placement.objects import usage
+from placement.tests.unit.objects import base
 
 
 class TestUsageNoDB(testtools.TestCase):
@@ -24,3 +28,189 @@ class TestUsageNoDB(testtools.TestCase):
         usage_obj = usage.Usage(resource_class=orc.VCPU, usage=dmal)
         # Type must come second in assertIsInstance.
         self.assertIsInstance(usage_obj.usage, int)
+
+    def test_usage_deltas(self):
+        released = [
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.VCPU, 'used': 2},
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.DISK_GB, 'used': 10},
+            # Allocations of an unowned consumer cannot be counted.
+            {'project_uuid': None, 'user_uuid': None,
+             'resource_class': orc.VCPU, 'used': 8},
+        ]
+        claimed = [
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.VCPU, 'used': 4},
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.DISK_GB, 'used': 10},
+        ]
+        deltas = usage.usage_deltas(released, claimed)
+        # The unchanged DISK_GB usage cancels out.
+        self.assertEqual(
+            [{'project_uuid': uuids.project, 'user_uuid': uuids.user,
+              'resource_class': orc.VCPU, 'used': 2}],
+            deltas)
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestUsageCountersNoDB(base.TestCase):
+
+    def setUp(self):
+        super(TestUsageCountersNoDB, self).setUp()
+        self.context.tx = mock.Mock()
+
+    def test_adjust_usages_nothing_to_do(self, mock_active):
+        usage.adjust_usages(self.context, [], [])
+        self.context.tx.run.assert_not_called()
+
+    def test_get_all_by_project_user_reads_counters(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {'rcname': orc.VCPU, 'used': 4}]
+        usages = usage.get_all_by_project_user(
+            self.context, uuids.project, user_id=uuids.user)
+
+        self.assertEqual(1, self.context.tx.run.call_count)
+        query = self.context.tx.run.call_args[0][0]
+        self.assertIn('USER_USAGE', query)
+        self.assertIn('u.key STARTS WITH {prefix}', query)
+        self.assertEqual('%s:%s:' % (uuids.project, uuids.user),
+                         self.context.tx.run.call_args[1]['prefix'])
+        self.assertEqual(orc.VCPU, usages[0].resource_class)
+        self.assertEqual(4, usages[0].usage)
+
+    def test_get_all_by_project_reads_counters_by_key(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = []
+        usage.get_all_by_project_user(self.context, uuids.project)
+
+        query = self.context.tx.run.call_args[0][0]
+        self.assertIn('PROJECT_USAGE', query)
+        self.assertIn('u.key STARTS WITH {prefix}', query)
+        self.assertEqual('%s:' % uuids.project,
+                         self.context.tx.run.call_args[1]['prefix'])
+
+    def test_verify_usage_counters(self, mock_active):
+        calculated = [
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.VCPU, 'used': 4},
+        ]
+        counted = [
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user,
+             'resource_class': orc.VCPU, 'used': 4},
+            {'project_uuid': uuids.project, 'user_uuid': None,
+             'resource_class': orc.VCPU, 'used': 6},
+        ]
+        self.context.tx.run.return_value.data.side_effect = [
+            calculated, counted]
+
+        mismatches = usage.verify_usage_counters(self.context)
+
+        self.assertEqual(
+            [{'project_uuid': uuids.project, 'user_uuid': None,
+              'resource_class': orc.VCPU, 'counted': 6, 'actual': 4}],
+            mismatches)
+
+    def test_rebuild_usage_counters(self, mock_active):
+        calculated = [
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user1,
+             'resource_class': orc.VCPU, 'used': 4},
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user2,
+             'resource_class': orc.VCPU, 'used': 2},
+            {'project_uuid': uuids.project, 'user_uuid': uuids.user2,
+             'resource_class': orc.DISK_GB, 'used': 0},
+        ]
+        self.context.tx.run.return_value.data.return_value = calculated
+
+        self.assertEqual(2, usage.rebuild_usage_counters(self.context))
+
+        # The counters are set rather than adjusted, so that rebuilding them
+        # twice at once does not count the allocations twice.
+        self.context.tx.run.assert_called_with(
+            usage._SET_USAGES_QUERY,
+            projects=[{'project_uuid': uuids.project,
+                       'resource_class': orc.VCPU, 'used': 6}],
+            users=sorted(calculated[:2],
+                         key=lambda u: (u['user_uuid'], u['resource_class'])))
+
+    def test_release_allocations_records_released(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {'usage': {'consumer_uuid': uuids.consumer1,
+                       'project_uuid': uuids.project, 'user_uuid': uuids.user,
+                       'resource_class': orc.VCPU, 'used': 2,
+                       'rp_uuid': uuids.rp}}]
+
+        usage.release_allocations(self.context,
+                                  [uuids.consumer1, uuids.consumer2])
+
+        # The consumer that had nothing to release has not changed.
+        self.context.tx.run.assert_called_with(
+            change_obj._RECORD_CHANGES_QUERY, changes=[
+                {'resource_type': 'resource_provider', 'uuid': uuids.rp,
+                 'event': 'allocations', 'generation': None},
+                {'resource_type': 'consumer', 'uuid': uuids.consumer1,
+                 'event': 'allocations', 'generation': None}])
+
+    def _ensure(self, counters, unkeyed, allocated):
+        self.context.tx.run.return_value.data.return_value = [
+            {'counters': counters, 'unkeyed': unkeyed,
+             'allocated': allocated}]
+        with mock.patch.object(usage, 'rebuild_usage_counters') as rebuild:
+            with mock.patch('placement.db.graph_db.'
+                            'ensure_uniqueness_constraint') as constrain:
+                usage.ensure_usage_counters(self.context)
+        constrain.assert_has_calls([mock.call('PROJECT_USAGE', 'key'),
+                                    mock.call('USER_USAGE', 'key')])
+        return rebuild.call_count
+
+    def test_ensure_usage_counters_builds_missing(self, mock_active):
+        self.assertEqual(1, self._ensure(0, 0, True))
+
+    def test_ensure_usage_counters_nothing_allocated(self, mock_active):
+        self.assertEqual(0, self._ensure(0, 0, False))
+
+    def test_ensure_usage_counters_present(self, mock_active):
+        self.assertEqual(0, self._ensure(5, 0, True))
+
+    def test_ensure_usage_counters_rebuilds_unkeyed(self, mock_active):
+        self.assertEqual(1, self._ensure(5, 2, True))
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestProviderSummariesNoDB(base.TestCase):
+
+    def setUp(self):
+        super(TestProviderSummariesNoDB, self).setUp()
+        self.context.tx = mock.Mock()
+
+    def test_get_provider_summaries(self, mock_active):
+        self.context.tx.run.return_value.data.return_value = [
+            {'uuid': uuids.cn1, 'generation': 3, 'inventories': [
+                {'resource_class': orc.VCPU, 'used': 2,
+                 'inventory': {'total': 8, 'reserved': 0, 'min_unit': 1,
+                               'max_unit': 8, 'step_size': 1,
+                               'allocation_ratio': 16.0,
+                               'created_at': 12345}}]},
+            {'uuid': uuids.cn2, 'generation': 0, 'inventories': []},
+        ]
+        summaries = usage.get_provider_summaries(
+            self.context, uuids=[uuids.cn1, uuids.cn2], marker=uuids.cn0,
+            limit=2)
+
+        self.context.tx.run.assert_called_once()
+        query = self.context.tx.run.call_args[0][0]
+        self.assertIn('rp.uuid IN {uuids}', query)
+        self.assertIn('rp.uuid > {marker}', query)
+        self.assertIn('LIMIT {limit}', query)
+        self.assertNotIn('ASSOCIATED', query)
+        self.assertEqual(2, len(summaries))
+        self.assertEqual(
+            {'uuid': uuids.cn1, 'generation': 3,
+             'inventories': {orc.VCPU: {'total': 8, 'reserved': 0,
+                                        'min_unit': 1, 'max_unit': 8,
+                                        'step_size': 1,
+                                        'allocation_ratio': 16.0}},
+             'usages': {orc.VCPU: 2}},
+            summaries[0])
+        self.assertEqual({}, summaries[1]['inventories'])
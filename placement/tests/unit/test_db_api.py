@@ -50,3 +50,120 @@ class DbApiTests(testtools.TestCase):
         # db_api.configure and the second invocation should not
         # have called it again
         configure_mock.assert_called_once()
+
+    def test_in_transaction(self):
+        self.assertFalse(db_api.in_transaction(mock.Mock(spec=[])))
+        with mock.patch.object(db_api.TransactionContext,
+                               '_context_tx_active', return_value=True):
+            self.assertTrue(db_api.in_transaction(mock.Mock(spec=[])))
+
+    @mock.patch('placement.db.graph_db.get_connection')
+    def test_before_commit(self, mock_cxn):
+        tx = mock_cxn.return_value.begin.return_value.__enter__.return_value
+        ctx = mock.Mock(spec=[])
+        calls = []
+
+        @db_api.placement_context_manager.writer
+        def write(ctx):
+            db_api.before_commit(ctx, lambda: calls.append('first'))
+            db_api.before_commit(ctx, lambda: calls.append('second'))
+            tx.run("CREATE")
+            calls.append('work')
+
+        write(ctx)
+        self.assertEqual(['work', 'first', 'second'], calls)
+        self.assertIsNone(ctx.before_commit_callbacks)
+
+    @mock.patch('placement.db.graph_db.get_connection')
+    def test_read_transaction(self, mock_cxn):
+        tx = mock_cxn.return_value.begin.return_value
+        tx.finished.return_value = False
+        ctx = mock.Mock(spec=[])
+
+        def read():
+            with db_api.read_transaction(ctx):
+                self.assertIs(tx, ctx.tx)
+                yield 1
+                yield 2
+
+        reader = read()
+        self.assertEqual(1, next(reader))
+        tx.rollback.assert_not_called()
+        # Closing the generator early rolls the transaction back.
+        reader.close()
+        tx.rollback.assert_called_once_with()
+        tx.commit.assert_not_called()
+
+    @mock.patch('placement.db.graph_db.get_connection')
+    def test_read_transaction_joins(self, mock_cxn):
+        ctx = mock.Mock(spec=['tx'])
+        with mock.patch.object(db_api.TransactionContext,
+                               '_context_tx_active', return_value=True):
+            with db_api.read_transaction(ctx):
+                pass
+        mock_cxn.assert_not_called()
+        ctx.tx.rollback.assert_not_called()
+
+    def test_before_commit_outside_transaction(self):
+        callback = mock.Mock()
+        db_api.before_commit(mock.Mock(spec=[]), callback)
+        callback.assert_called_once_with()
+
+
+class QueryCacheTests(testtools.TestCase):
+
+    def setUp(self):
+        super(QueryCacheTests, self).setUp()
+        self.ctx = mock.Mock()
+        self.ctx.query_cache = db_api.QueryCache()
+        self.ctx.tx.run.return_value.data.return_value = [{"uuid": "a"}]
+
+    def test_run_cached(self):
+        for _ in range(2):
+            self.assertEqual(
+                [{"uuid": "a"}],
+                db_api.run_cached(self.ctx, "MATCH", uuids=["a", "b"]))
+        db_api.run_cached(self.ctx, "MATCH", uuids=["b", "a"])
+        db_api.run_cached(self.ctx, "MATCH ALL")
+        self.assertEqual(3, self.ctx.tx.run.call_count)
+        self.assertEqual(1, self.ctx.query_cache.hits)
+        self.assertEqual(3, self.ctx.query_cache.misses)
+
+    def test_run_cached_unhashable(self):
+        db_api.run_cached(self.ctx, "MATCH", rp=mock.MagicMock(__hash__=None))
+        db_api.run_cached(self.ctx, "MATCH", rp=mock.MagicMock(__hash__=None))
+        self.assertEqual(2, self.ctx.tx.run.call_count)
+        self.assertEqual(0, self.ctx.query_cache.hits)
+
+    def test_run_cached_without_cache(self):
+        ctx = mock.Mock(spec=["tx"])
+        db_api.run_cached(ctx, "MATCH")
+        db_api.run_cached(ctx, "MATCH")
+        self.assertEqual(2, ctx.tx.run.call_count)
+
+    @mock.patch('placement.db_api.TransactionContext._context_tx_active',
+                return_value=True)
+    def test_writer_clears_and_bypasses(self, mock_active):
+        @db_api.placement_context_manager.writer
+        def write(ctx):
+            self.assertFalse(ctx.query_cache.active)
+            self.assertEqual({}, ctx.query_cache.results)
+            db_api.run_cached(ctx, "MATCH")
+
+        db_api.run_cached(self.ctx, "MATCH")
+        write(self.ctx)
+        self.assertTrue(self.ctx.query_cache.active)
+        db_api.run_cached(self.ctx, "MATCH")
+        self.assertEqual(3, self.ctx.tx.run.call_count)
+        self.assertEqual(0, self.ctx.query_cache.hits)
+
+    @mock.patch('placement.db_api.TransactionContext._context_tx_active',
+                return_value=True)
+    def test_reader_keeps_results(self, mock_active):
+        @db_api.placement_context_manager.reader
+        def read(ctx):
+            return db_api.run_cached(ctx, "MATCH")
+
+        read(self.ctx)
+        read(self.ctx)
+        self.assertEqual(1, self.ctx.tx.run.call_count)
@@ -123,6 +123,47 @@ class MapperTest(testtools.TestCase):
         self.assertEqual(str, type(allow_header))
 
 
+class RouteMapTest(testtools.TestCase):
+
+    def setUp(self):
+        super(RouteMapTest, self).setUp()
+        self.mapper = handler.make_map({
+            '': {'GET': 'root'},
+            '/things': {'GET': 'list', 'POST': 'create'},
+            '/things/{id}': {'GET': 'show'},
+            '/things/{id}/parts/{part}': {'PUT': 'update'},
+            '/things/special': {'GET': 'special'},
+        })
+
+    def _match(self, path, method='GET'):
+        return self.mapper.match(environ=_environ(path=path, method=method))
+
+    def test_params(self):
+        self.assertEqual({'action': 'update', 'id': 'a', 'part': 'b'},
+                         self._match('/things/a/parts/b', 'PUT'))
+
+    def test_literal_preferred(self):
+        self.assertEqual({'action': 'special'}, self._match('/things/special'))
+        self.assertEqual({'action': handler.handle_405, 'id': 'special',
+                          'part': 'b', '_methods': 'PUT'},
+                         self._match('/things/special/parts/b'))
+
+    def test_no_match(self):
+        for path in ('/', '/things/', '//things', 'things',
+                     '/things//parts/b', '/things/a/parts', '/things/a/b/c/d'):
+            self.assertIsNone(self._match(path), path)
+        self.assertEqual({'action': 'root'}, self._match(''))
+
+    def test_405_methods(self):
+        self.assertEqual(
+            {'action': handler.handle_405, '_methods': 'GET, POST'},
+            self._match('/things', 'DELETE'))
+
+    def test_conflicting_params(self):
+        self.assertRaises(ValueError, self.mapper.connect,
+                          '/things/{name}/other', {'GET': 'other'})
+
+
 class PlacementLoggingTest(testtools.TestCase):
 
     @mock.patch("placement.handler.LOG")
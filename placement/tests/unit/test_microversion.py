@@ -17,13 +17,16 @@ import operator
 import testtools
 import webob
 
+import fixtures
 import microversion_parse
 import mock
 
-# import the handlers to load up handler decorators
-import placement.handler  # noqa
+from placement import handler as placement_handler
 from placement import microversion
 
+# import the handlers to load up handler decorators
+placement_handler.import_handlers()
+
 
 def handler():
     return True
@@ -39,6 +42,48 @@ class TestMicroversionFindMethod(testtools.TestCase):
                           microversion._find_method, handler, '1.1', 404)
 
 
+class TestMicroversionResolvedMethods(testtools.TestCase):
+
+    def setUp(self):
+        super(TestMicroversionResolvedMethods, self).setUp()
+        self.useFixture(fixtures.MockPatch(
+            'placement.microversion.VERSIONED_METHODS',
+            new=collections.defaultdict(list)))
+        self.useFixture(fixtures.MockPatch(
+            'placement.microversion.RESOLVED_METHODS', new={}))
+
+    def test_resolved_once(self):
+        def req_handler(req):
+            return True
+
+        decorated = microversion.version_handler('1.1', '1.10')(req_handler)
+        req = mock.Mock()
+        req.environ = {microversion.MICROVERSION_ENVIRON:
+                       microversion_parse.Version(1, 2)}
+        self.assertTrue(decorated(req))
+        qualified_name = microversion._fully_qualified_name(req_handler)
+        self.assertEqual(
+            {(qualified_name, microversion_parse.Version(1, 2)): req_handler},
+            microversion.RESOLVED_METHODS)
+        # Later calls do not search VERSIONED_METHODS.
+        microversion.VERSIONED_METHODS.clear()
+        self.assertTrue(decorated(req))
+
+    def test_registration_clears(self):
+        microversion.version_handler('1.1', '1.10')(handler)
+        microversion._find_method(handler, microversion_parse.Version(1, 2),
+                                  404)
+        self.assertEqual(1, len(microversion.RESOLVED_METHODS))
+        microversion.version_handler('1.11')(handler)
+        self.assertEqual({}, microversion.RESOLVED_METHODS)
+
+    def test_not_found_not_resolved(self):
+        microversion.version_handler('1.1', '1.10')(handler)
+        self.assertRaises(webob.exc.HTTPNotFound, microversion._find_method,
+                          handler, microversion_parse.Version(1, 11), 404)
+        self.assertEqual({}, microversion.RESOLVED_METHODS)
+
+
 class TestMicroversionDecoration(testtools.TestCase):
 
     @mock.patch('placement.microversion.VERSIONED_METHODS',
@@ -88,7 +133,7 @@ class TestMicroversionIntersection(testtools.TestCase):
     # if you add two different versions of method 'foobar' the
     # number only goes up by one if no other version foobar yet
     # exists. This operates as a simple sanity check.
-    TOTAL_VERSIONED_METHODS = 20
+    TOTAL_VERSIONED_METHODS = 25
 
     def test_methods_versioned(self):
         methods_data = microversion.VERSIONED_METHODS
@@ -13,6 +13,7 @@
 import os
 
 import fixtures
+import mock
 from oslo_config import cfg
 from oslo_config import fixture as config_fixture
 from oslo_policy import policy as oslo_policy
@@ -82,3 +83,67 @@ class PlacementPolicyTestCase(testtools.TestCase):
         self.assertFalse(
             policy.authorize(
                 self.ctxt, 'placement', self.target, do_raise=False))
+
+    def test_decisions_cached(self):
+        fixture = self.useFixture(
+            policy_fixture.PolicyFixture(self.conf_fixture))
+        fixture.set_rules({'placement': 'role:admin'})
+        admin = context.RequestContext(user_id='fake', project_id='fake',
+                                       roles=['member', 'admin'])
+        enforcer = policy._get_enforcer(self.conf_fixture.conf)
+        with mock.patch.object(enforcer, 'authorize',
+                               wraps=enforcer.authorize) as authorize:
+            for _ in range(2):
+                self.assertTrue(
+                    policy.authorize(admin, 'placement', self.target))
+                self.assertRaises(exception.PolicyNotAuthorized,
+                                  policy.authorize, self.ctxt, 'placement',
+                                  self.target)
+            # The order of the roles does not matter.
+            admin.roles = ['admin', 'member']
+            self.assertTrue(policy.authorize(admin, 'placement', self.target))
+        self.assertEqual(2, authorize.call_count)
+        stats = policy._DECISIONS.stats.get()
+        self.assertEqual(3, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(2, len(policy._DECISIONS))
+
+    def test_set_rules_clears_decisions(self):
+        fixture = self.useFixture(
+            policy_fixture.PolicyFixture(self.conf_fixture))
+        fixture.set_rules({'placement': '@'})
+        self.assertTrue(policy.authorize(self.ctxt, 'placement', self.target))
+        fixture.set_rules({'placement': '!'})
+        self.assertEqual(0, len(policy._DECISIONS))
+        self.assertFalse(policy.authorize(self.ctxt, 'placement', self.target,
+                                          do_raise=False))
+
+    def test_rules_checked_once_per_interval(self):
+        fixture = self.useFixture(
+            policy_fixture.PolicyFixture(self.conf_fixture))
+        fixture.set_rules({'placement': '@'})
+        enforcer = policy._get_enforcer(self.conf_fixture.conf)
+        with mock.patch.object(enforcer, 'load_rules') as load_rules, \
+                mock.patch('placement.policy.time.time') as now:
+            now.return_value = 1000
+            policy.authorize(self.ctxt, 'placement', self.target)
+            load_rules.reset_mock()
+            # Decisions from the cache do not look at the policy file.
+            for _ in range(3):
+                policy.authorize(self.ctxt, 'placement', self.target)
+            load_rules.assert_not_called()
+            now.return_value += policy.RULES_CHECK_INTERVAL
+            policy.authorize(self.ctxt, 'placement', self.target)
+            load_rules.assert_called_once_with()
+
+    def test_decision_cache_bounded(self):
+        self.conf_fixture.config(group='placement',
+                                 policy_decision_cache_size=2)
+        fixture = self.useFixture(
+            policy_fixture.PolicyFixture(self.conf_fixture))
+        fixture.set_rules({'placement': '@'})
+        for project_id in ('a', 'b', 'c'):
+            policy.authorize(self.ctxt, 'placement',
+                             {'project_id': project_id})
+        self.assertEqual(2, len(policy._DECISIONS))
+        self.assertEqual(1, policy._DECISIONS.stats['evictions'])
@@ -72,3 +72,15 @@ class TestRequestLog(testtools.TestCase):
              'REQUEST_METHOD': 'GET',
              'REMOTE_ADDR': '127.0.0.1',
              'bytes': '0'})
+
+    @mock.patch("placement.requestlog.LOG")
+    def test_middleware_logs_query_cache_hits(self, mocked_log):
+        context = mock.Mock()
+        context.query_cache.hits = 3
+        context.query_cache.misses = 5
+        self.environ['placement.context'] = context
+        app = requestlog.RequestLog(self.application)
+        app(self.environ, mock.MagicMock())
+        mocked_log.debug.assert_called_with(
+            '%(hits)d of %(total)d read statements were answered '
+            'from the query cache of the request', {'hits': 3, 'total': 8})
@@ -0,0 +1,140 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import mock
+import testtools
+
+from placement import exception
+from placement import resource_class_cache as rc_cache
+from placement import versioned_cache
+
+
+class FakeGraph(object):
+    """Answers the statements of the resource class cache from a list of
+    resource class names and a version, and counts them.
+    """
+
+    def __init__(self, names, version=1):
+        self.names = names
+        self.version = version
+        self.loads = 0
+        self.version_reads = 0
+
+    def run(self, query, **kwargs):
+        result = mock.Mock()
+        if query == versioned_cache._VERSION_QUERY:
+            self.version_reads += 1
+            result.data.return_value = [{"version": self.version}]
+        elif query == rc_cache._LOAD_QUERY:
+            self.loads += 1
+            result.data.return_value = [
+                {"id": idx, "rc": {"name": name, "created_at": None,
+                                   "updated_at": None}}
+                for idx, name in enumerate(self.names)]
+        else:
+            self.version += 1
+        return result
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestResourceClassCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestResourceClassCache, self).setUp()
+        self.graph = FakeGraph(['VCPU', 'DISK_GB'])
+        self.cache = rc_cache.ResourceClassCache(None, ttl=60)
+        self.cache.ctx.tx = self.graph
+        self.now = 1000.0
+        self.useFixture(fixtures.MockPatch(
+            'placement.versioned_cache.time.time',
+            new=lambda: self.now))
+
+    def test_lookups(self, mock_active):
+        self.assertEqual(0, self.cache.id_from_string('VCPU'))
+        self.assertEqual('DISK_GB', self.cache.string_from_id(1))
+        rc = self.cache.all_from_string('DISK_GB')
+        self.assertEqual({'id': 1, 'name': 'DISK_GB', 'created_at': None,
+                          'updated_at': None}, rc)
+        self.assertEqual(1, self.graph.loads)
+        self.assertEqual(3, self.cache.stats['hits'])
+        self.assertEqual(0, self.cache.stats['misses'])
+
+    def test_not_found(self, mock_active):
+        self.assertRaises(exception.ResourceClassNotFound,
+                          self.cache.id_from_string, 'CUSTOM_GOLD')
+        self.assertRaises(exception.ResourceClassNotFound,
+                          self.cache.string_from_id, 99)
+        # The misses only read the version, which had not changed.
+        self.assertEqual(1, self.graph.loads)
+        self.assertEqual(2, self.cache.stats['misses'])
+
+    def test_miss_reloads_when_changed(self, mock_active):
+        self.assertEqual(set(['CUSTOM_GOLD']),
+                         self.cache.unknown_names(['VCPU', 'CUSTOM_GOLD']))
+        # Another process creates the resource class.
+        self.graph.names.append('CUSTOM_GOLD')
+        self.graph.version += 1
+        self.assertEqual(set(), self.cache.unknown_names(['CUSTOM_GOLD']))
+        self.assertEqual(2, self.graph.loads)
+        self.assertEqual(2, self.cache.stats['refreshes'])
+
+    def test_ttl(self, mock_active):
+        self.cache.id_from_string('VCPU')
+        self.graph.names.remove('VCPU')
+        self.graph.version += 1
+        # Until the time to live has passed, the cache is used as it is.
+        self.now += 59
+        self.assertEqual(0, self.cache.id_from_string('VCPU'))
+        self.assertEqual(1, self.graph.version_reads)
+        self.now += 1
+        self.assertRaises(exception.ResourceClassNotFound,
+                          self.cache.id_from_string, 'VCPU')
+        self.assertEqual(2, self.graph.loads)
+
+    def test_ttl_unchanged(self, mock_active):
+        self.cache.get_all()
+        self.now += 60
+        self.assertEqual(2, len(self.cache.get_all()))
+        self.assertEqual(2, self.graph.version_reads)
+        self.assertEqual(1, self.graph.loads)
+
+    def test_clear(self, mock_active):
+        self.cache.get_all()
+        self.cache.clear()
+        self.cache.get_all()
+        self.assertEqual(2, self.graph.loads)
+
+    def test_bump_version(self, mock_active):
+        ctx = mock.Mock()
+        ctx.tx = self.graph
+        rc_cache.bump_version(ctx)
+        self.assertEqual(2, self.graph.version)
+
+
+class TestEnsure(testtools.TestCase):
+
+    def setUp(self):
+        super(TestEnsure, self).setUp()
+        rc_cache.RC_CACHE = None
+        self.addCleanup(setattr, rc_cache, 'RC_CACHE', None)
+
+    def test_ensure(self):
+        cache = rc_cache.ensure(mock.sentinel.ctx, ttl=5)
+        self.assertEqual(5, cache.ttl)
+        self.assertIs(cache, rc_cache.ensure(mock.sentinel.ctx))
+        self.assertIs(cache, rc_cache.RC_CACHE)
+
+    def test_ensure_default_ttl(self):
+        self.assertEqual(versioned_cache.DEFAULT_TTL,
+                         rc_cache.ensure(mock.sentinel.ctx).ttl)
@@ -0,0 +1,45 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import testtools
+
+from placement import stats
+
+
+class CountersTest(testtools.TestCase):
+
+    def test_incr(self):
+        counters = stats.Counters('Test')
+        counters.incr('hits')
+        counters.incr('hits', 2)
+        counters.incr('misses')
+
+        self.assertEqual(3, counters['hits'])
+        self.assertEqual(0, counters['evictions'])
+        self.assertEqual({'hits': 3, 'misses': 1}, counters.get())
+
+    @mock.patch.object(stats, 'LOG')
+    def test_incr_logs_counters(self, mock_log):
+        counters = stats.Counters('Test')
+        counters.incr('writes')
+        self.assertFalse(mock_log.info.called)
+
+        with mock.patch.object(stats, 'STATS_LOG_INTERVAL', 0):
+            counters.incr('rp_conflicts')
+        mock_log.info.assert_called_once_with(
+            "%(name)s statistics: %(counts)s",
+            {"name": "Test", "counts": "rp_conflicts=1, writes=1"})
+
+        # Not again until the interval has passed once more.
+        counters.incr('writes')
+        self.assertEqual(1, mock_log.info.call_count)
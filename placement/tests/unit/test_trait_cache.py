@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import mock
+import testtools
+
+from placement import exception
+from placement import trait_cache
+from placement import versioned_cache
+
+
+class FakeGraph(object):
+    """Answers the statements of the trait cache from a list of trait names
+    and a version, and counts them.
+    """
+
+    def __init__(self, names, version=1):
+        self.names = names
+        self.version = version
+        self.loads = 0
+        self.version_reads = 0
+
+    def run(self, query, **kwargs):
+        result = mock.Mock()
+        if query == versioned_cache._VERSION_QUERY:
+            self.version_reads += 1
+            result.data.return_value = [{"version": self.version}]
+        elif query == trait_cache._LOAD_QUERY:
+            self.loads += 1
+            result.data.return_value = [
+                {"t": {"name": name, "created_at": None, "updated_at": None}}
+                for name in self.names]
+        else:
+            self.version += 1
+        return result
+
+
+@mock.patch('placement.db_api.TransactionContext._context_tx_active',
+            return_value=True)
+class TestTraitCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestTraitCache, self).setUp()
+        self.graph = FakeGraph(['HW_CPU_X86_AVX', 'CUSTOM_GOLD'])
+        self.cache = trait_cache.TraitCache(None, ttl=60)
+        self.cache.ctx.tx = self.graph
+        self.now = 1000.0
+        self.useFixture(fixtures.MockPatch(
+            'placement.versioned_cache.time.time', new=lambda: self.now))
+
+    def test_get(self, mock_active):
+        self.assertEqual({'name': 'CUSTOM_GOLD', 'created_at': None,
+                          'updated_at': None},
+                         self.cache.get('CUSTOM_GOLD'))
+        self.assertEqual(frozenset(['HW_CPU_X86_AVX', 'CUSTOM_GOLD']),
+                         self.cache.get_all_names())
+        self.assertEqual(1, self.graph.loads)
+        self.assertEqual(2, self.cache.stats['hits'])
+
+    def test_get_not_found(self, mock_active):
+        self.assertRaises(exception.TraitNotFound,
+                          self.cache.get, 'CUSTOM_SILVER')
+        # The miss only read the version, which had not changed.
+        self.assertEqual(1, self.graph.loads)
+        self.assertEqual(2, self.graph.version_reads)
+        self.assertEqual(1, self.cache.stats['misses'])
+
+    def test_miss_reloads_when_changed(self, mock_active):
+        self.cache.get_all()
+        # Another process creates a trait.
+        self.graph.names.append('CUSTOM_SILVER')
+        self.graph.version += 1
+        self.assertEqual(set(), self.cache.unknown_names(['CUSTOM_SILVER']))
+        self.assertEqual(2, self.graph.loads)
+
+    def test_ttl(self, mock_active):
+        self.cache.get_all()
+        self.graph.names.remove('CUSTOM_GOLD')
+        self.graph.version += 1
+        self.now += 59
+        self.assertEqual(2, len(self.cache.get_all()))
+        self.now += 1
+        self.assertEqual(1, len(self.cache.get_all()))
+        self.assertEqual(2, self.graph.loads)
+
+    def test_traits_from_props(self, mock_active):
+        self.assertEqual(['CUSTOM_GOLD'], self.cache.traits_from_props(
+            ['uuid', 'name', 'CUSTOM_GOLD', 'generation']))
+        self.assertEqual(1, self.graph.version_reads)
+
+    def test_traits_from_props_new_trait(self, mock_active):
+        self.cache.get_all()
+        self.graph.names.append('CUSTOM_SILVER')
+        self.graph.version += 1
+        # A property named like a trait that is not known makes the cache
+        # check for new traits.
+        self.assertEqual(['CUSTOM_GOLD', 'CUSTOM_SILVER'],
+                         self.cache.traits_from_props(
+                             ['uuid', 'CUSTOM_GOLD', 'CUSTOM_SILVER']))
+        self.assertEqual(2, self.graph.loads)
+
+    def test_clear(self, mock_active):
+        self.cache.get_all()
+        self.cache.clear()
+        self.cache.get_all()
+        self.assertEqual(2, self.graph.loads)
+
+    def test_bump_version(self, mock_active):
+        ctx = mock.Mock()
+        ctx.tx = self.graph
+        trait_cache.bump_version(ctx)
+        self.assertEqual(2, self.graph.version)
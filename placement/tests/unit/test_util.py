@@ -16,6 +16,7 @@
 import datetime
 
 import fixtures
+import jsonschema
 import microversion_parse
 import mock
 from oslo_middleware import request_id
@@ -165,6 +166,27 @@ class QueryParamsSchemaTestCase(testtools.TestCase):
         self.assertIn('Invalid query string parameters', six.text_type(error))
 
 
+class TestSchemaValidator(testtools.TestCase):
+
+    schema = {"type": "string", "format": "uuid"}
+
+    def test_validator_is_reused(self):
+        validator = util.schema_validator(self.schema)
+        self.assertIs(validator, util.schema_validator(self.schema))
+        self.assertIsNot(validator,
+                         util.schema_validator(dict(self.schema)))
+
+    def test_format_checker(self):
+        validator = util.schema_validator(self.schema)
+        validator.validate(uuidsentinel.rp_uuid)
+        self.assertRaises(jsonschema.ValidationError,
+                          validator.validate, 'not a uuid')
+
+    def test_invalid_schema(self):
+        self.assertRaises(jsonschema.SchemaError,
+                          util.schema_validator, {"type": "pony"})
+
+
 class TestJSONErrorFormatter(testtools.TestCase):
 
     def setUp(self):
@@ -343,6 +365,80 @@ class TestPlacementURLs(testtools.TestCase):
             environ, self.resource_class))
 
 
+class TestNextPageURL(testtools.TestCase):
+
+    def test_next_page_url(self):
+        req = webob.Request.blank(
+            '/resource_providers?limit=2&marker=%s&name=foo'
+            % uuidsentinel.marker)
+        expected_url = ('/resource_providers?limit=2&name=foo&marker=%s'
+                        % uuidsentinel.next)
+        self.assertEqual(expected_url, util.next_page_url(
+            req, uuidsentinel.next))
+
+    def test_next_page_url_prefix(self):
+        req = webob.Request.blank('/resource_providers?limit=2',
+                                  base_url='http://localhost/placement')
+        expected_url = ('/placement/resource_providers?limit=2&marker=%s'
+                        % uuidsentinel.next)
+        self.assertEqual(expected_url, util.next_page_url(
+            req, uuidsentinel.next))
+
+
+class TestETag(testtools.TestCase):
+
+    def _req(self, version=(1, 41), **headers):
+        req = webob.Request.blank('/resource_providers/%s' % uuidsentinel.rp,
+                                  headers=headers)
+        req.environ[microversion.MICROVERSION_ENVIRON] = (
+            microversion_parse.Version(*version))
+        req.response = webob.Response()
+        return req
+
+    def test_no_resource(self):
+        req = self._req()
+        self.assertFalse(util.etag_matches(req, None))
+        self.assertIsNone(req.response.etag)
+
+    def test_sets_etag(self):
+        req = self._req()
+        self.assertFalse(util.etag_matches(req, [3, 12345]))
+        etag = req.response.etag
+        self.assertIsNotNone(etag)
+        self.assertEqual('no-cache', req.response.headers['cache-control'])
+        # The tag is stable for the same version of the resource.
+        other = self._req()
+        util.etag_matches(other, [3, 12345])
+        self.assertEqual(etag, other.response.etag)
+
+    def test_etag_differs(self):
+        req = self._req()
+        util.etag_matches(req, [3, 12345])
+        changed = self._req()
+        util.etag_matches(changed, [4, 12345])
+        self.assertNotEqual(req.response.etag, changed.response.etag)
+        other_version = self._req(version=(1, 42))
+        util.etag_matches(other_version, [3, 12345])
+        self.assertNotEqual(req.response.etag, other_version.response.etag)
+
+    def test_if_none_match(self):
+        req = self._req()
+        util.etag_matches(req, [3, 12345])
+        etag = req.response.etag
+        req = self._req(**{'If-None-Match': '"other", "%s"' % etag})
+        self.assertTrue(util.etag_matches(req, [3, 12345]))
+        response = util.not_modified(req)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response.etag)
+        self.assertEqual(b'', response.body)
+
+    def test_if_none_match_stale(self):
+        req = self._req()
+        util.etag_matches(req, [3, 12345])
+        req = self._req(**{'If-None-Match': '"%s"' % req.response.etag})
+        self.assertFalse(util.etag_matches(req, [4, 12345]))
+
+
 class TestNormalizeResourceQsParam(testtools.TestCase):
 
     def test_success(self):
@@ -0,0 +1,151 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import mock
+from oslo_config import cfg
+from oslo_config import fixture as config_fixture
+import testtools
+
+from placement import conf
+from placement.db import graph_db as db
+from placement import handler
+from placement.schemas import resource_provider as rp_schema
+from placement.schemas import trait as trait_schema
+from placement import trait_cache
+from placement import util
+from placement import warmup
+
+
+class WarmupTest(testtools.TestCase):
+
+    def setUp(self):
+        super(WarmupTest, self).setUp()
+        config = cfg.ConfigOpts()
+        self.conf_fixture = self.useFixture(config_fixture.Config(config))
+        conf.register_opts(config)
+        self.graph = mock.Mock()
+        self.useFixture(fixtures.MockPatch(
+            'placement.db.graph_db.get_connection', return_value=self.graph))
+        self.useFixture(fixtures.MockPatchObject(
+            warmup, '_FORK_CONNECTIONS', 0))
+        self.register_at_fork = self.useFixture(fixtures.MockPatch(
+            'placement.warmup.os.register_at_fork')).mock
+        self.useFixture(fixtures.MockPatchObject(
+            warmup, '_FORK_HOOK_REGISTERED', False))
+        self.rc_ensure = self.useFixture(fixtures.MockPatch(
+            'placement.resource_class_cache.ensure')).mock
+        self.trait_ensure = self.useFixture(fixtures.MockPatch(
+            'placement.trait_cache.ensure')).mock
+
+    def test_warmup(self):
+        with mock.patch.object(handler, 'import_handlers') as import_handlers:
+            warmup.warmup(self.conf_fixture.conf)
+
+        import_handlers.assert_called_once_with()
+        self.rc_ensure.return_value.get_all.assert_called_once_with()
+        self.trait_ensure.return_value.get_all.assert_called_once_with()
+        self.assertEqual(2, self.graph.begin.call_count)
+        self.assertEqual(2, self.graph.begin.return_value.rollback.call_count)
+        self.register_at_fork.assert_called_once_with(
+            after_in_child=warmup._after_fork_in_child)
+        self.assertEqual(2, warmup._FORK_CONNECTIONS)
+
+    def test_warmup_explain(self):
+        self.conf_fixture.config(warmup_connections=0,
+                                 warmup_explain_queries=True,
+                                 group='placement')
+        with mock.patch.object(handler, 'import_handlers'):
+            warmup.warmup(self.conf_fixture.conf)
+
+        tx = self.graph.begin.return_value
+        expected = [mock.call("EXPLAIN " + statement)
+                    for statement in warmup.statements()]
+        self.assertEqual(expected, tx.run.call_args_list)
+        self.assertEqual(len(expected), tx.rollback.call_count)
+
+    def test_fork_hook_registered_once(self):
+        with mock.patch.object(handler, 'import_handlers'):
+            warmup.warmup(self.conf_fixture.conf)
+            self.conf_fixture.config(warmup_connections=3, group='placement')
+            warmup.warmup(self.conf_fixture.conf)
+
+        self.assertEqual(1, self.register_at_fork.call_count)
+        self.assertEqual(3, warmup._FORK_CONNECTIONS)
+
+    def test_reset_after_fork(self):
+        with mock.patch.object(handler, 'import_handlers') as import_handlers:
+            warmup.reset_after_fork()
+
+        import_handlers.assert_not_called()
+        self.graph.begin.assert_not_called()
+        self.register_at_fork.assert_called_once_with(
+            after_in_child=warmup._after_fork_in_child)
+        self.assertEqual(0, warmup._FORK_CONNECTIONS)
+
+    def test_build_validators(self):
+        util._VALIDATORS.clear()
+        self.assertGreater(warmup.build_validators(), 0)
+        self.assertIn(id(trait_schema.SET_TRAITS_FOR_RP_SCHEMA),
+                      util._VALIDATORS)
+        # A schema with only alternatives at its top level.
+        self.assertIn(id(rp_schema.POST_RP_TREES_1_39), util._VALIDATORS)
+
+    def test_statements(self):
+        statements = warmup.statements()
+        self.assertIn(trait_cache._LOAD_QUERY, statements)
+        for statement in statements:
+            self.assertNotIn('%(', statement)
+        self.assertEqual(sorted(set(statements)), statements)
+
+    def test_open_connections_rolls_back_on_error(self):
+        tx = self.graph.begin.return_value
+        tx.run.side_effect = [None, db.DatabaseError(
+            'down', 'Neo.DatabaseError.General.UnknownError')]
+
+        self.assertRaises(db.DatabaseError, warmup.open_connections, 3)
+        self.assertEqual(2, tx.rollback.call_count)
+
+    def test_explain_statements_skips_failures(self):
+        tx = self.graph.begin.return_value
+        statements = warmup.statements()
+        error = db.ClientError(
+            'bad', 'Neo.ClientError.Statement.ParameterMissing')
+        tx.run.side_effect = [error] + [None] * (len(statements) - 1)
+
+        self.assertEqual(len(statements) - 1, warmup.explain_statements())
+        self.assertEqual(len(statements), tx.rollback.call_count)
+
+    @mock.patch('placement.db.graph_db.reset_connection')
+    def test_after_fork_in_child(self, reset_connection):
+        warmup._FORK_CONNECTIONS = 2
+        warmup._after_fork_in_child()
+
+        reset_connection.assert_called_once_with()
+        self.assertEqual(2, self.graph.begin.call_count)
+
+    @mock.patch('placement.db.graph_db.reset_connection')
+    def test_after_fork_in_child_database_down(self, reset_connection):
+        warmup._FORK_CONNECTIONS = 2
+        self.graph.begin.side_effect = db.DatabaseError(
+            'down', 'Neo.DatabaseError.General.UnknownError')
+
+        warmup._after_fork_in_child()
+
+        reset_connection.assert_called_once_with()
+
+    @mock.patch('placement.db.graph_db.reset_connection')
+    def test_after_fork_in_child_no_connections(self, reset_connection):
+        warmup._after_fork_in_child()
+
+        reset_connection.assert_called_once_with()
+        self.graph.begin.assert_not_called()
@@ -0,0 +1,58 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Tests of the modules imported when a placement WSGI process starts.
+
+The time and memory that takes are checked against their budgets by
+tools/import-benchmark.py, which `tox -e import-budget` runs.
+"""
+
+import json
+import subprocess
+import sys
+
+import testtools
+
+# Run in a new interpreter, so that nothing has been imported already.
+_IMPORT_SCRIPT = """
+import json
+import sys
+
+import placement.wsgi
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class ImportTest(testtools.TestCase):
+    """Every WSGI worker imports placement.wsgi when it starts, so modules
+    that serving requests does not need, or that only some requests need,
+    are kept out of it.
+    """
+
+    # Modules that only the database migration and upgrade check commands
+    # need.
+    UNWANTED_MODULES = ('alembic', 'sqlalchemy', 'oslo_db.sqlalchemy')
+
+    @classmethod
+    def setUpClass(cls):
+        super(ImportTest, cls).setUpClass()
+        output = subprocess.check_output(
+            [sys.executable, '-c', _IMPORT_SCRIPT])
+        cls.modules = json.loads(output.decode('utf-8').splitlines()[-1])
+
+    def test_no_sqlalchemy(self):
+        for module in self.UNWANTED_MODULES:
+            self.assertNotIn(module, self.modules)
+
+    def test_handlers_not_imported(self):
+        handlers = [module for module in self.modules
+                    if module.startswith('placement.handlers.')]
+        self.assertEqual([], handlers)
@@ -0,0 +1,140 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""A process-wide cache of the traits.
+
+Traits are stored as properties of the resource provider nodes that are named
+for the trait, so telling the traits of a provider from its other properties,
+and validating the traits of a request, needs the names of all the traits,
+of which there are thousands. They are loaded at once and kept current as
+described in placement.versioned_cache.
+"""
+
+from placement.db import graph_db as db
+from placement import exception
+from placement import versioned_cache
+
+TRAIT_CACHE = None
+VERSION_NAME = 'traits'
+
+_LOAD_QUERY = """
+        MATCH (t:TRAIT)
+        RETURN t
+"""
+
+
+def ensure(ctx, ttl=None):
+    """Ensures that a singleton trait cache has been created in the module's
+    scope, and returns it.
+
+    :param ctx: `placement.context.RequestContext` that may be used to grab a
+                DB connection.
+    :param ttl: the number of seconds for which the cache is used before
+                checking whether it is stale. Defaults to
+                versioned_cache.DEFAULT_TTL.
+    """
+    global TRAIT_CACHE
+    if TRAIT_CACHE is None:
+        TRAIT_CACHE = TraitCache(ctx, ttl=ttl)
+    return TRAIT_CACHE
+
+
+def bump_version(ctx):
+    """Tells the caches of every process that the traits have changed. This
+    must be called in the transaction that changes them.
+    """
+    versioned_cache.bump_version(ctx, VERSION_NAME)
+
+
+class TraitCache(versioned_cache.VersionedCache):
+    """A cache of the names and details of all the traits."""
+
+    VERSION_NAME = VERSION_NAME
+    LOCK_NAME = 'trait_cache'
+    STATS_NAME = 'Trait cache'
+
+    def _reset(self):
+        self.names = frozenset()
+        self.all_cache = {}
+
+    def _load(self, ctx):
+        all_cache = {}
+        for rec in ctx.tx.run(_LOAD_QUERY).data():
+            trait = db.pythonize(rec["t"])
+            all_cache[trait["name"]] = {"name": trait["name"],
+                                        "created_at": trait.get("created_at"),
+                                        "updated_at": trait.get("updated_at")}
+        self.all_cache = all_cache
+        self.names = frozenset(all_cache)
+
+    def get(self, name):
+        """Returns a dict of the `name`, `created_at` and `updated_at` of the
+        named trait.
+
+        :raises: `exception.TraitNotFound` if there is no such trait.
+        """
+        self._current()
+        trait = self.all_cache.get(name)
+        if trait is None:
+            # The trait may have been created by another process since the
+            # cache was last checked.
+            self.stats.incr("misses")
+            self.refresh()
+            trait = self.all_cache.get(name)
+            if trait is None:
+                raise exception.TraitNotFound(names=name)
+        else:
+            self.stats.incr("hits")
+        return trait
+
+    def get_all(self):
+        """Returns a list of dicts of all the traits, as returned by get()."""
+        self._current()
+        self.stats.incr("hits")
+        return list(self.all_cache.values())
+
+    def get_all_names(self):
+        """Returns a frozenset of the names of all the traits."""
+        self._current()
+        self.stats.incr("hits")
+        return self.names
+
+    def unknown_names(self, names):
+        """Returns the set of the supplied trait names that do not exist. The
+        database is only read when the cache is older than its time to live,
+        or when some name is not in it.
+        """
+        self._current()
+        names = set(names)
+        unknown = names - self.names
+        self.stats.incr("hits", len(names) - len(unknown))
+        if unknown:
+            self.stats.incr("misses", len(unknown))
+            self.refresh()
+            unknown -= self.names
+        return unknown
+
+    def traits_from_props(self, props):
+        """Returns the names of the traits among the supplied property names
+        of a resource provider node, in the order they were supplied.
+        """
+        self._current()
+        traits = [prop for prop in props if prop in self.names]
+        # The other properties of a provider are named in lower case, so an
+        # upper case one that is not known is a trait created by another
+        # process since the cache was last checked.
+        if any(prop.isupper() and prop not in self.names for prop in props):
+            self.stats.incr("misses")
+            self.refresh()
+            traits = [prop for prop in props if prop in self.names]
+        else:
+            self.stats.incr("hits")
+        return traits
@@ -12,7 +12,9 @@
 """Utility methods for placement API."""
 
 import functools
+import hashlib
 import six
+from six.moves.urllib import parse as urlparse
 
 import jsonschema
 from oslo_log import log as logging
@@ -43,6 +45,35 @@ def _validate_uuid_format(instance):
     return uuidutils.is_uuid_like(instance)
 
 
+# NOTE: This must be created after the checks above are registered, since a
+# FormatChecker copies the registered checks when it is created.
+_FORMAT_CHECKER = jsonschema.FormatChecker()
+# Validators, keyed by the id of their schema, along with the schema.
+_VALIDATORS = {}
+
+
+def schema_validator(schema):
+    """Returns a validator, with a format checker, for the supplied schema.
+
+    Checking a schema and building a validator for it costs more than most
+    validations, so it is only done the first time a schema is used, and the
+    validator is kept for later requests. Schemas must not be changed once
+    they have been used.
+    """
+    try:
+        cached_schema, validator = _VALIDATORS[id(schema)]
+        if cached_schema is schema:
+            return validator
+    except KeyError:
+        pass
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema, format_checker=_FORMAT_CHECKER)
+    # The schema is kept so that its id is not reused by another.
+    _VALIDATORS[id(schema)] = (schema, validator)
+    return validator
+
+
 def check_accept(*types):
     """If accept is set explicitly, try to follow it.
 
@@ -67,6 +98,43 @@ def check_accept(*types):
     return decorator
 
 
+def etag_matches(req, version):
+    """Set a strong entity tag on the response for the representation of a
+    resource whose current state is identified by version, and return True if
+    it matches the If-None-Match header of the request.
+
+    This lets a handler respond with 304 Not Modified before the resource
+    is loaded or serialized. The version must be read before the resource is
+    loaded, so that a concurrent change can only make the tag older than the
+    body, which costs the client a full response later but never hides a
+    change from it.
+
+    :param version: a JSON-serializable value that changes whenever the
+                    representation of the resource does, or None if the
+                    resource does not exist, in which case no tag is set and
+                    False is returned.
+    """
+    if version is None:
+        return False
+    want_version = req.environ[placement.microversion.MICROVERSION_ENVIRON]
+    # The representation differs between microversions, so the tag does too.
+    tag = hashlib.sha256(jsonutils.dumps(
+        [str(want_version), version]).encode('utf-8')).hexdigest()
+    req.response.etag = tag
+    req.response.cache_control = 'no-cache'
+    return tag in req.if_none_match
+
+
+def not_modified(req):
+    """Return a 304 Not Modified response, with the entity tag already set on
+    the response by etag_matches().
+    """
+    response = req.response
+    response.status = 304
+    response.content_type = None
+    return response
+
+
 def extract_json(body, schema):
     """Extract JSON from a body and validate with the provided schema."""
     try:
@@ -76,8 +144,7 @@ def extract_json(body, schema):
             'Malformed JSON: %(error)s' % {'error': exc},
             json_formatter=json_error_formatter)
     try:
-        jsonschema.validate(data, schema,
-                            format_checker=jsonschema.FormatChecker())
+        schema_validator(schema).validate(data)
     except jsonschema.ValidationError as exc:
         raise webob.exc.HTTPBadRequest(
             'JSON does not validate: %(error)s' % {'error': exc},
@@ -195,6 +262,17 @@ def resource_provider_url(environ, resource_provider):
     return '%s/resource_providers/%s' % (prefix, resource_provider.uuid)
 
 
+def next_page_url(req, marker):
+    """Produce the URL for the next page of a paged collection: the URL of the
+    request with its ``marker`` query parameter replaced by the given marker.
+    """
+    params = [(key, value) for key, value in req.GET.items()
+              if key != 'marker']
+    params.append(('marker', marker))
+    prefix = req.environ.get('SCRIPT_NAME', '')
+    return '%s%s?%s' % (prefix, req.path_info, urlparse.urlencode(params))
+
+
 def trait_url(environ, trait):
     """Produce the URL for a trait.
 
@@ -209,8 +287,7 @@ def validate_query_params(req, schema):
     try:
         # NOTE(Kevin_Zheng): The webob package throws UnicodeError when
         # param cannot be decoded. Catch this and raise HTTP 400.
-        jsonschema.validate(dict(req.GET), schema,
-                            format_checker=jsonschema.FormatChecker())
+        schema_validator(schema).validate(dict(req.GET))
     except (jsonschema.ValidationError, UnicodeDecodeError) as exc:
         raise webob.exc.HTTPBadRequest(
             'Invalid query string parameters: %(exc)s' %
@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""The base of the process-wide caches of things that nearly every request
+reads and that are written rarely, such as the resource classes and traits.
+
+All of them are loaded at once and kept. Every change to them increments the
+version held by a CACHE_VERSION node named for the cache, in the same
+transaction. A cache that is older than its time to live, or that is asked
+for something it does not hold, reads that version, and only reloads if it
+has changed. That way the changes made by other processes are seen within
+the time to live, and the changes made by this process are seen at once,
+since it clears its own cache.
+"""
+
+import time
+
+from oslo_concurrency import lockutils
+
+from placement import db_api
+from placement import stats
+
+# The number of seconds for which a cache is used before checking whether
+# what it holds has been changed by another process.
+DEFAULT_TTL = 10
+
+_VERSION_QUERY = """
+        OPTIONAL MATCH (v:CACHE_VERSION {name: {name}})
+        RETURN coalesce(v.value, 0) AS version
+"""
+
+_BUMP_VERSION_QUERY = """
+        MERGE (v:CACHE_VERSION {name: {name}})
+        ON CREATE SET v.value = 0
+        SET v.value = v.value + 1
+"""
+
+
+@db_api.placement_context_manager.writer
+def bump_version(ctx, name):
+    """Tells the caches of every process that use the version called `name`
+    that what they hold has changed. This must be called in the transaction
+    that changes it.
+    """
+    ctx.tx.run(_BUMP_VERSION_QUERY, name=name)
+
+
+@db_api.placement_context_manager.reader
+def get_version(ctx, name):
+    return ctx.tx.run(_VERSION_QUERY, name=name).data()[0]["version"]
+
+
+@db_api.placement_context_manager.reader
+def _refresh_from_db(ctx, cache):
+    # The version is read first, so that a change committed while the cache
+    # is loaded makes it look stale rather than fresh.
+    version = get_version(ctx, cache.VERSION_NAME)
+    cache._load(ctx)
+    cache.version = version
+
+
+class VersionedCache(object):
+    """A cache of everything of one kind, kept current by the version named
+    VERSION_NAME.
+
+    Subclasses load what they hold in _load() and forget it in _reset(), and
+    call _current() before each lookup. `stats` counts the lookups answered
+    from the cache (`hits`), those that were not (`misses`) and the number of
+    times the cache was loaded (`refreshes`).
+    """
+
+    VERSION_NAME = None
+    # The name of the lock that serializes the loads of the cache.
+    LOCK_NAME = None
+    # The name under which the statistics of the cache are logged.
+    STATS_NAME = None
+
+    def __init__(self, ctx, ttl=None):
+        """Initialize the cache.
+
+        :param ctx: `placement.context.RequestContext`. Lookups may come from
+                    any thread, so the cache uses a context of its own for
+                    them rather than holding on to this one.
+        :param ttl: the number of seconds for which the cache is used before
+                    checking whether it is stale. Defaults to DEFAULT_TTL.
+        """
+        self.ctx = db_api.DbContext()
+        self.ttl = DEFAULT_TTL if ttl is None else ttl
+        self.version = None
+        self.checked_at = None
+        self.stats = stats.Counters(self.STATS_NAME)
+        self._reset()
+
+    def _reset(self):
+        """Empties the cache."""
+        raise NotImplementedError()
+
+    def _load(self, ctx):
+        """Replaces what the cache holds with what is read in the transaction
+        of `ctx`.
+        """
+        raise NotImplementedError()
+
+    def clear(self):
+        """Forgets what the cache holds, so that it is loaded again by the
+        next lookup. This is called by the process that changed it.
+        """
+        with lockutils.lock(self.LOCK_NAME):
+            self.version = None
+            self.checked_at = None
+            self._reset()
+
+    def refresh(self, force=False):
+        """Reloads the cache if another process has changed what it holds
+        since it was loaded, or if `force` is True.
+        """
+        with lockutils.lock(self.LOCK_NAME):
+            if (force or self.version is None or
+                    get_version(self.ctx, self.VERSION_NAME) != self.version):
+                _refresh_from_db(self.ctx, self)
+                self.stats.incr("refreshes")
+            self.checked_at = time.time()
+
+    def _current(self):
+        if (self.checked_at is None or
+                time.time() - self.checked_at >= self.ttl):
+            self.refresh()
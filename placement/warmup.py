@@ -0,0 +1,175 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Preparing a placement process to serve requests before it serves the
+first one.
+
+Otherwise the first requests served by each new process would pay for
+importing the API handlers, building the JSON schema validators, loading the
+resource class and trait caches and connecting to the database, making them
+much slower than the rest.
+
+The application is often loaded by a master process that then forks its
+workers, as uWSGI does unless lazy-apps is set, and gunicorn does with
+--preload. Everything but the database connections is then done once, before
+the fork, and shared by the workers. Sockets cannot be shared between
+processes, so each worker forgets the connections of the master when it is
+forked, and opens its own before it accepts a request.
+"""
+
+import os
+import sys
+import time
+
+from oslo_log import log as logging
+
+from placement.db import graph_db as db
+from placement import db_api
+from placement import handler
+from placement import resource_class_cache as rc_cache
+from placement import trait_cache
+from placement import util
+
+LOG = logging.getLogger(__name__)
+
+# The number of connections that a forked process opens.
+_FORK_CONNECTIONS = 0
+_FORK_HOOK_REGISTERED = False
+
+
+def warmup(conf):
+    """Does everything that the first requests served by this process would
+    otherwise have to do, as configured by the `warmup_connections` and
+    `warmup_explain_queries` options. This is called by deploy.loadapp()
+    when the `warmup` option is set, after the policy has been loaded and
+    the database updated.
+    """
+    start = time.time()
+    handler.import_handlers()
+    validators = build_validators()
+    ctx = db_api.DbContext()
+    rc_cache.ensure(ctx, ttl=conf.placement.resource_class_cache_ttl).get_all()
+    trait_cache.ensure(ctx, ttl=conf.placement.trait_cache_ttl).get_all()
+    connections = conf.placement.warmup_connections
+    open_connections(connections)
+    planned = 0
+    if conf.placement.warmup_explain_queries:
+        planned = explain_statements()
+    _register_fork_hook(connections)
+    LOG.info("Warmed up in %(seconds).2f seconds, building %(validators)d "
+             "schema validators, opening %(connections)d database "
+             "connections and planning %(planned)d statements",
+             {"seconds": time.time() - start, "validators": validators,
+              "connections": connections, "planned": planned})
+
+
+def reset_after_fork():
+    """Has the processes forked from this one forget its database
+    connections, which they cannot share, without warming up. This is called
+    by deploy.loadapp() when the `warmup` option is not set.
+    """
+    _register_fork_hook(0)
+
+
+def _placement_modules(prefix):
+    return [module for name, module in sorted(sys.modules.items())
+            if name.startswith(prefix) and module is not None]
+
+
+def build_validators():
+    """Builds the validators of all the JSON schemas in the imported
+    placement.schemas modules, and returns their number.
+    """
+    count = 0
+    for module in _placement_modules('placement.schemas.'):
+        for name, value in sorted(vars(module).items()):
+            # Some schemas, such as those accepting either one item or a list
+            # of them, have no type of their own, only alternatives.
+            if (name.isupper() and isinstance(value, dict) and
+                    ('type' in value or 'anyOf' in value)):
+                util.schema_validator(value)
+                count += 1
+    return count
+
+
+def statements():
+    """Returns the Cypher statements that the imported placement modules run
+    with parameters, which are the module level strings named like
+    ``_CHANGES_QUERY``. Those completed with % formatting are left out,
+    since their text differs from one run to the next.
+    """
+    found = set()
+    for module in _placement_modules('placement.'):
+        for name, value in vars(module).items():
+            if (name.endswith('_QUERY') and isinstance(value, str) and
+                    '%(' not in value and '%s' not in value):
+                found.add(value)
+    return sorted(found)
+
+
+def open_connections(count):
+    """Makes sure that the connection pool holds at least `count` open
+    connections to the database, by running a statement in that many
+    transactions at once.
+    """
+    graph = db.get_connection()
+    txs = []
+    try:
+        for _ in range(count):
+            tx = graph.begin()
+            txs.append(tx)
+            tx.run("RETURN 1")
+    finally:
+        for tx in txs:
+            tx.rollback()
+
+
+def explain_statements():
+    """Has the database plan each of the statements(), without running
+    them, and returns the number it planned.
+    """
+    graph = db.get_connection()
+    planned = 0
+    for statement in statements():
+        tx = graph.begin()
+        try:
+            tx.run("EXPLAIN " + statement)
+            planned += 1
+        except (db.ClientError, db.DatabaseError) as exc:
+            LOG.debug("Could not plan statement %(statement)s: %(exc)s",
+                      {"statement": statement, "exc": exc})
+        finally:
+            tx.rollback()
+    return planned
+
+
+def _after_fork_in_child():
+    db.reset_connection()
+    if not _FORK_CONNECTIONS:
+        return
+    try:
+        open_connections(_FORK_CONNECTIONS)
+    except Exception as exc:
+        # The process can still serve requests, connecting when the first
+        # one needs it.
+        LOG.warning("Could not open database connections after fork: %s",
+                    exc)
+
+
+def _register_fork_hook(connections):
+    global _FORK_CONNECTIONS, _FORK_HOOK_REGISTERED
+    _FORK_CONNECTIONS = connections
+    # Python 2 cannot run code after a fork, so a child process there
+    # shares its connections with its parent, as it always did.
+    if _FORK_HOOK_REGISTERED or not hasattr(os, 'register_at_fork'):
+        return
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+    _FORK_HOOK_REGISTERED = True
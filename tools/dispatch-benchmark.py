@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Measures the cost of finding the handler for a request: matching the path
+against ROUTE_DECLARATIONS, with the RouteMap placement uses and with the
+Routes.Mapper it replaced, and choosing the method for the microversion, by
+searching VERSIONED_METHODS and from RESOLVED_METHODS.
+
+Usage: python tools/dispatch-benchmark.py [ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+import uuid
+
+import microversion_parse
+import routes
+
+from placement import handler
+from placement import microversion
+
+
+def _routes_mapper(declarations):
+    mapper = routes.Mapper()
+    for route, targets in declarations.items():
+        for method in targets:
+            mapper.connect(route, action=targets[method],
+                           conditions=dict(method=[method]))
+        mapper.connect(route, action=handler.handle_405,
+                       _methods=', '.join(targets))
+    return mapper
+
+
+def _environs():
+    rp_uuid = str(uuid.uuid4())
+    return [
+        {'PATH_INFO': path, 'REQUEST_METHOD': method}
+        for path, method in [
+            ('/', 'GET'),
+            ('/resource_providers', 'GET'),
+            ('/resource_providers/%s/inventories/VCPU' % rp_uuid, 'PUT'),
+            ('/allocations/%s' % uuid.uuid4(), 'PUT'),
+            ('/allocation_candidates', 'GET'),
+            ('/changes', 'GET'),
+            ('/nothing/here', 'GET'),
+        ]
+    ]
+
+
+def main(iterations):
+    handler.import_handlers()
+    environs = _environs()
+    print("microseconds per request")
+    for name, mapper in [
+            ("Routes.Mapper", _routes_mapper(handler.ROUTE_DECLARATIONS)),
+            ("RouteMap", handler.make_map(handler.ROUTE_DECLARATIONS))]:
+        def match():
+            for environ in environs:
+                mapper.match(environ=environ)
+
+        cost = min(timeit.repeat(match, number=iterations, repeat=3))
+        print("%-40s %12.2f" % ("route " + name,
+                                cost / iterations / len(environs) * 1e6))
+
+    version = microversion_parse.Version(1, 42)
+    qualified_names = [
+        name for name, methods in microversion.VERSIONED_METHODS.items()
+        if methods[0][0] <= version <= methods[0][1]]
+    funcs = [microversion.VERSIONED_METHODS[name][0][2]
+             for name in qualified_names]
+
+    def search():
+        # As every request did before RESOLVED_METHODS.
+        for f in funcs:
+            name = microversion._fully_qualified_name(f)
+            for min_version, max_version, func in (
+                    microversion.VERSIONED_METHODS[name]):
+                if min_version <= version <= max_version:
+                    break
+
+    def resolve():
+        for name in qualified_names:
+            microversion._resolve_method(name, version, 404)
+
+    for name, func in [("microversion search", search),
+                       ("microversion resolved", resolve)]:
+        cost = min(timeit.repeat(func, number=iterations, repeat=3))
+        print("%-40s %12.2f" % (name, cost / iterations /
+                                len(qualified_names) * 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Measures the time and memory that a WSGI worker spends importing
+placement.wsgi when it starts, in a new interpreter, and exits with status 1
+if either is over its budget. The default budgets are loose enough for a busy
+test node; if a change exceeds one, look for a module that could be imported
+when it is first needed instead.
+
+The maximum resident set size is only reported in kilobytes on Linux.
+
+Usage: python tools/import-benchmark.py [SECONDS [MAXRSS_KB]]
+   or: tox -e import-budget [-- SECONDS [MAXRSS_KB]]
+"""
+
+from __future__ import print_function
+
+import json
+import subprocess
+import sys
+
+SECONDS = 3.0
+MAXRSS_KB = 200 * 1024
+
+_IMPORT_SCRIPT = """
+import json
+import resource
+import sys
+import time
+
+start = time.time()
+import placement.wsgi
+print(json.dumps({
+    "seconds": time.time() - start,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def main(seconds, maxrss_kb):
+    output = subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT])
+    result = json.loads(output.decode('utf-8').splitlines()[-1])
+    print("%-20s %12s %12s" % ("", "measured", "budget"))
+    print("%-20s %12.2f %12.2f" % ("seconds", result['seconds'], seconds))
+    print("%-20s %12d %12d" % ("maxrss kB", result['maxrss_kb'], maxrss_kb))
+    print("%-20s %12d" % ("modules", result['modules']))
+    if result['seconds'] >= seconds or result['maxrss_kb'] >= maxrss_kb:
+        print("Over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else SECONDS,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else MAXRSS_KB))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Compares the cost of validating request bodies and query strings against
+the largest placement schemas by building a validator for each validation,
+as jsonschema.validate() does, with the cost of using the validators that
+placement.util keeps.
+
+Usage: python tools/schema-validation-benchmark.py [ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+import uuid
+
+import jsonschema
+
+from placement.schemas import allocation
+from placement.schemas import allocation_candidate
+from placement import util
+
+
+def _allocations(providers):
+    return {str(uuid.uuid4()): {"resources": {"VCPU": 2, "MEMORY_MB": 2048,
+                                              "DISK_GB": 20}}
+            for _ in range(providers)}
+
+
+def _cases():
+    put_allocations = {
+        "allocations": _allocations(3),
+        "project_id": "project",
+        "user_id": "user",
+        "consumer_generation": None,
+    }
+    post_allocations = {
+        str(uuid.uuid4()): dict(put_allocations, allocations=_allocations(3))
+        for _ in range(50)
+    }
+    candidates_query = {
+        "resources": "VCPU:2,MEMORY_MB:2048,DISK_GB:20",
+        "required": "HW_CPU_X86_AVX2,!CUSTOM_MAGIC",
+        "member_of": "in:%s,%s" % (uuid.uuid4(), uuid.uuid4()),
+        "resources_ACCEL": "FPGA:1",
+        "required_ACCEL": "CUSTOM_FPGA_INTEL",
+        "in_tree": str(uuid.uuid4()),
+        "group_policy": "isolate",
+        "limit": "100",
+        "sort": "spread",
+    }
+    claim = {
+        "consumer_uuid": str(uuid.uuid4()),
+        "project_id": "project",
+        "user_id": "user",
+        "consumer_generation": None,
+    }
+    return [
+        ("PUT /allocations/{consumer_uuid} 1.28",
+         allocation.ALLOCATION_SCHEMA_V1_28, put_allocations),
+        ("POST /allocations 1.28, 50 consumers",
+         allocation.POST_ALLOCATIONS_V1_28, post_allocations),
+        ("GET /allocation_candidates 1.34",
+         allocation_candidate.GET_SCHEMA_1_34, candidates_query),
+        ("POST /allocation_candidates/claim 1.35",
+         allocation_candidate.POST_CLAIM_SCHEMA_1_35, claim),
+    ]
+
+
+def main(iterations):
+    print("%-40s %12s %12s" % ("microseconds per validation", "uncached",
+                               "cached"))
+    for name, schema, data in _cases():
+        def uncached():
+            jsonschema.validate(data, schema,
+                                format_checker=jsonschema.FormatChecker())
+
+        def cached():
+            util.schema_validator(schema).validate(data)
+
+        results = [min(timeit.repeat(func, number=iterations, repeat=3))
+                   / iterations * 1e6 for func in (uncached, cached)]
+        print("%-40s %12.1f %12.1f" % (name, results[0], results[1]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)